@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Company, Employee, Attendance, Leave
+from .models import Company, Employee, Attendance, Leave, EmailOutbox
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
@@ -23,3 +23,9 @@ class LeaveAdmin(admin.ModelAdmin):
     list_display = ['employee', 'leave_type', 'start_date', 'end_date', 'status', 'created_at']
     list_filter = ['status', 'leave_type', 'employee__company']
     search_fields = ['employee__employee_id', 'employee__full_name']
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to_email', 'idempotency_key']
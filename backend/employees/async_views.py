@@ -0,0 +1,214 @@
+"""
+Async versions of the endpoints that mostly wait on Brevo or the database
+
+forgot_password, send_invitation and verify_invitation answer exactly like
+their views.py counterparts, but use the async ORM and an httpx client for
+Brevo, so under ASGI a single worker keeps serving while hundreds of requests
+wait on a slow provider. DRF's @api_view is sync-only, so these are plain
+Django async views: they parse JSON themselves and answer with JsonResponse.
+
+They are routed instead of the sync views when ASYNC_VIEWS is True; serve
+the project with an ASGI server then, e.g.
+
+    ASYNC_VIEWS=True uvicorn hrms_lite.asgi:application --workers 2
+
+Under WSGI they would still work, but each request would hold a thread for
+its whole duration, which is what the sync views already do.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .authentication import EmployeeJWTAuthentication
+from .email_outbox import outbox_enabled, enqueue_email
+from .email_service import (
+    asend_otp_email, asend_invitation_email, build_otp_email,
+    build_invitation_email, build_invitation_link
+)
+from .login_service import accounts_for_email, create_reset_otps
+from .models import Employee, InvitedEmployee
+from .serializers import InvitedEmployeeSerializer
+from .throttling import acheck_rate, throttled_reply
+
+
+def _request_data(request):
+    """JSON (or form) body as a dict, or None if it can't be parsed"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+async def _throttled(request, scope, email):
+    """429 response when the request is over its rate, else None"""
+    if not getattr(settings, 'THROTTLE_ENABLED', True):
+        return None
+    wait = await acheck_rate(request, scope, email if isinstance(email, str) else None)
+    if wait is None:
+        return None
+    body, headers = throttled_reply(wait)
+    return JsonResponse(body, status=429, headers=headers)
+
+
+@csrf_exempt
+@require_POST
+async def forgot_password(request):
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    email = data.get('email')
+
+    throttled = await _throttled(request, 'password_reset', email)
+    if throttled:
+        return throttled
+
+    if not email:
+        return JsonResponse({'error': 'Email is required'}, status=400)
+
+    company_id = data.get('company')
+    if company_id in (None, ''):
+        company_id = None
+    else:
+        try:
+            company_id = int(company_id)
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'company must be a company id'}, status=400)
+
+    accounts = [employee async for employee in accounts_for_email(email, company_id)]
+    if not accounts:
+        # Don't reveal if email exists or not (security)
+        return JsonResponse({
+            'message': 'If this email exists, an OTP has been sent',
+            'email': email
+        })
+
+    # One OTP per account, as in views.forgot_password
+    for employee, otp_record in await sync_to_async(create_reset_otps)(accounts):
+        company_name = employee.company.name if len(accounts) > 1 else None
+
+        if outbox_enabled():
+            # Queue the email; the outbox worker delivers it
+            subject, html_content = build_otp_email(otp_record.otp, employee.full_name, company_name)
+            await sync_to_async(enqueue_email)(
+                f'otp:{otp_record.pk}', employee.email, subject, html_content, employee.full_name
+            )
+            continue
+
+        success, message = await asend_otp_email(employee.email, otp_record.otp, employee.full_name, company_name)
+        if not success:
+            return JsonResponse({'error': message}, status=500)
+    return JsonResponse({'message': 'OTP sent to your email', 'email': email})
+
+
+def _save_and_enqueue_invitation(serializer, inviter):
+    """Create the invitation and queue its email in one transaction"""
+    with transaction.atomic():
+        invitation = serializer.save()
+        subject, html_content = build_invitation_email(
+            invitation_link=build_invitation_link(invitation.invitation_token),
+            company_name=inviter.company.name,
+            inviter_name=inviter.full_name
+        )
+        enqueue_email(f'invitation:{invitation.pk}', invitation.email, subject, html_content)
+    return serializer.data
+
+
+@csrf_exempt
+@require_POST
+async def send_invitation(request):
+    """Admin can send invitation to join company"""
+    auth = await sync_to_async(EmployeeJWTAuthentication().authenticate)(request)
+    if auth is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=401, headers={'WWW-Authenticate': 'Bearer'}
+        )
+    inviter = auth[0].employee
+
+    if not inviter.is_admin:
+        return JsonResponse({'error': 'Only admins can send invitations'}, status=403)
+
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    email = data.get('email')
+
+    if not email:
+        return JsonResponse({'error': 'Email is required'}, status=400)
+
+    # Check if email already exists in company
+    if await Employee.objects.filter(company_id=inviter.company_id, email=email).aexists():
+        return JsonResponse({'error': 'Employee with this email already exists'}, status=400)
+
+    # Check if invitation already sent; an expired one is reissued below
+    existing_invitation = await InvitedEmployee.objects.filter(
+        email=email, company_id=inviter.company_id, is_accepted=False
+    ).afirst()
+    if existing_invitation and not existing_invitation.is_expired:
+        return JsonResponse({'error': 'Invitation already sent to this email'}, status=400)
+
+    try:
+        serializer = InvitedEmployeeSerializer(existing_invitation, data={
+            'email': email,
+            'company': inviter.company_id,
+            'invited_by': inviter.id
+        })
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        if outbox_enabled():
+            invitation_data = await sync_to_async(_save_and_enqueue_invitation)(serializer, inviter)
+            return JsonResponse({
+                'message': 'Invitation sent successfully',
+                'invitation': invitation_data
+            }, status=201)
+
+        invitation = await sync_to_async(serializer.save)()
+        success, message = await asend_invitation_email(
+            to_email=email,
+            invitation_link=build_invitation_link(invitation.invitation_token),
+            company_name=inviter.company.name,
+            inviter_name=inviter.full_name
+        )
+        if success:
+            return JsonResponse({
+                'message': 'Invitation sent successfully',
+                'invitation': await sync_to_async(lambda: serializer.data)()
+            }, status=201)
+        # Delete invitation if email failed
+        await invitation.adelete()
+        return JsonResponse({'error': f'Failed to send email: {message}'}, status=500)
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_GET
+async def verify_invitation(request):
+    """Verify invitation token"""
+    token = request.GET.get('token')
+
+    if not token:
+        return JsonResponse({'error': 'Token is required'}, status=400)
+
+    try:
+        invitation = await InvitedEmployee.objects.select_related('company', 'invited_by').aget(
+            invitation_token=token, is_accepted=False, is_expired=False
+        )
+    except InvitedEmployee.DoesNotExist:
+        return JsonResponse({'valid': False, 'error': 'Invalid or expired invitation'}, status=404)
+
+    return JsonResponse({
+        'valid': True,
+        'email': invitation.email,
+        'company_name': invitation.company.name,
+        'invited_by': invitation.invited_by.full_name
+    })
@@ -0,0 +1,488 @@
+"""
+Attendance aggregation helpers
+Builds monthly attendance grids in memory from a fixed number of queries,
+independent of how many employees a company has.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Company, Employee, Attendance, MonthlyAttendanceSummary
+from .data_versions import ATTENDANCE, bump_version
+
+ATTENDANCE_STATUSES = {choice for choice, _ in Attendance.STATUS_CHOICES}
+
+# One character per day in the compact grid format
+COMPACT_STATUS_CODES = {'Present': 'P', 'Absent': 'A'}
+COMPACT_NO_RECORD = '-'
+
+
+def month_bounds(year, month):
+    """
+    Get the first and last day of a month
+
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+
+    Returns:
+        tuple: (first_day: date, last_day: date)
+    """
+    num_days = monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, num_days)
+
+
+def build_daily_data(year, month, records):
+    """
+    Build the per-day attendance grid for one employee
+
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        records: dict mapping day of month -> (status, notes)
+
+    Returns:
+        dict: month summary with present/absent/no-record totals and daily_data
+    """
+    first_day, last_day = month_bounds(year, month)
+    num_days = last_day.day
+
+    daily_data = []
+    present_count = 0
+    absent_count = 0
+    for day in range(1, num_days + 1):
+        date_obj = first_day + timedelta(days=day - 1)
+        record = records.get(day)
+        if record is not None:
+            record_status, notes = record
+            if record_status == 'Present':
+                present_count += 1
+            elif record_status == 'Absent':
+                absent_count += 1
+            daily_data.append({
+                "date": date_obj,
+                "day": day,
+                "status": record_status,
+                "notes": notes,
+                "has_record": True
+            })
+        else:
+            daily_data.append({
+                "date": date_obj,
+                "day": day,
+                "status": "No Record",
+                "notes": "",
+                "has_record": False
+            })
+
+    return {
+        "total_days": num_days,
+        "present_days": present_count,
+        "absent_days": absent_count,
+        "no_record_days": num_days - len(records),
+        "daily_data": daily_data
+    }
+
+
+def build_compact_data(num_days, records):
+    """
+    Build the compact attendance grid for one employee
+
+    The month is a fixed-width string with one status code per day (see
+    COMPACT_STATUS_CODES, COMPACT_NO_RECORD for days without a record) and
+    notes go in a sparse map keyed by day of month.
+
+    Args:
+        num_days: Days in the month
+        records: dict mapping day of month -> (status, notes)
+
+    Returns:
+        dict: present/absent/no-record totals, 'days' string and 'notes' map
+    """
+    codes = [COMPACT_NO_RECORD] * num_days
+    notes_by_day = {}
+    present_count = 0
+    absent_count = 0
+    for day, (record_status, notes) in records.items():
+        codes[day - 1] = COMPACT_STATUS_CODES.get(record_status, COMPACT_NO_RECORD)
+        if record_status == 'Present':
+            present_count += 1
+        elif record_status == 'Absent':
+            absent_count += 1
+        if notes:
+            notes_by_day[str(day)] = notes
+
+    return {
+        "present_days": present_count,
+        "absent_days": absent_count,
+        "no_record_days": num_days - len(records),
+        "days": ''.join(codes),
+        "notes": notes_by_day
+    }
+
+
+def employee_month_attendance(employee, year, month):
+    """
+    Get the monthly attendance grid for a single employee (one query)
+
+    Returns:
+        dict: month summary as built by build_daily_data
+    """
+    first_day, last_day = month_bounds(year, month)
+    rows = Attendance.objects.filter(
+        employee=employee,
+        date__range=(first_day, last_day)
+    ).values_list('date', 'status', 'notes')
+
+    records = {row_date.day: (row_status, notes) for row_date, row_status, notes in rows}
+    return build_daily_data(year, month, records)
+
+
+def company_month_totals(company, year, month):
+    """
+    Get present/absent/no-record totals for every employee of a company
+
+    Reads the MonthlyAttendanceSummary rollup instead of raw attendance rows.
+
+    Returns:
+        list: one dict per employee with identity fields and totals
+    """
+    num_days = monthrange(year, month)[1]
+    employees = list(
+        Employee.objects.filter(company=company)
+        .values_list('id', 'employee_id', 'full_name', 'department')
+    )
+    totals = {
+        emp_pk: (present, absent)
+        for emp_pk, present, absent in MonthlyAttendanceSummary.objects.filter(
+            employee__company=company, year=year, month=month
+        ).values_list('employee', 'present_days', 'absent_days')
+    }
+
+    response_data = []
+    for emp_pk, employee_id, full_name, department in employees:
+        present, absent = totals.get(emp_pk, (0, 0))
+        response_data.append({
+            "employee_id": employee_id,
+            "employee_name": full_name,
+            "department": department,
+            "total_days": num_days,
+            "present_days": present,
+            "absent_days": absent,
+            "no_record_days": num_days - present - absent
+        })
+    return response_data
+
+
+def employee_month_totals(employee, year, month):
+    """Get present/absent/no-record totals for one employee from the rollup"""
+    num_days = monthrange(year, month)[1]
+    summary = MonthlyAttendanceSummary.objects.filter(
+        employee=employee, year=year, month=month
+    ).values_list('present_days', 'absent_days').first()
+    present, absent = summary or (0, 0)
+    return {
+        "total_days": num_days,
+        "present_days": present,
+        "absent_days": absent,
+        "no_record_days": num_days - present - absent
+    }
+
+
+def refresh_monthly_summaries(employee_pks, year, month, create=True):
+    """
+    Recompute the rollup rows for some employees in one month
+
+    One aggregate query over the month's raw rows, then one upsert.
+
+    Args:
+        employee_pks: iterable of Employee primary keys
+        year: Calendar year
+        month: Calendar month (1-12)
+        create: insert missing rollup rows; pass False from delete paths,
+            where the employee itself may be in the middle of being deleted
+    """
+    employee_pks = list(employee_pks)
+    if not employee_pks:
+        return
+    first_day, last_day = month_bounds(year, month)
+    counts = {
+        row['employee']: (row['present'], row['absent'])
+        for row in Attendance.objects.filter(
+            employee_id__in=employee_pks, date__range=(first_day, last_day)
+        ).values('employee').annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent'))
+        )
+    }
+
+    if create:
+        now = timezone.now()
+        MonthlyAttendanceSummary.objects.bulk_create(
+            [
+                MonthlyAttendanceSummary(
+                    employee_id=emp_pk, year=year, month=month,
+                    present_days=counts.get(emp_pk, (0, 0))[0],
+                    absent_days=counts.get(emp_pk, (0, 0))[1],
+                    updated_at=now
+                )
+                for emp_pk in employee_pks
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=['present_days', 'absent_days', 'updated_at'],
+        )
+    else:
+        for emp_pk in employee_pks:
+            present, absent = counts.get(emp_pk, (0, 0))
+            MonthlyAttendanceSummary.objects.filter(
+                employee_id=emp_pk, year=year, month=month
+            ).update(present_days=present, absent_days=absent, updated_at=timezone.now())
+
+
+def rebuild_monthly_summaries(company=None, batch_size=2000):
+    """
+    Rebuild the rollup from raw attendance with one GROUP BY query
+
+    Args:
+        company: optional Company (instance or pk) to limit the rebuild to
+
+    Bumps the ATTENDANCE version of every company rebuilt.
+
+    Returns:
+        int: number of rollup rows written
+    """
+    attendance = Attendance.objects.all()
+    summaries = MonthlyAttendanceSummary.objects.all()
+    if company is not None:
+        attendance = attendance.filter(employee__company=company)
+        summaries = summaries.filter(employee__company=company)
+
+    grouped = (
+        attendance
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('employee', 'year', 'month')
+        .annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent'))
+        )
+        .order_by()
+    )
+
+    written = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(MonthlyAttendanceSummary(
+                employee_id=row['employee'], year=row['year'], month=row['month'],
+                present_days=row['present'], absent_days=row['absent']
+            ))
+            if len(batch) >= batch_size:
+                MonthlyAttendanceSummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            MonthlyAttendanceSummary.objects.bulk_create(batch)
+            written += len(batch)
+
+        # Cached month views and ETags read the rollup; bulk_create sends no signals
+        company_ids = [getattr(company, 'pk', company)] if company is not None else (
+            Company.objects.values_list('pk', flat=True)
+        )
+        for company_id in company_ids:
+            bump_version(company_id, ATTENDANCE)
+    return written
+
+
+def employee_month_attendance_compact(employee, year, month):
+    """Get the compact monthly grid for a single employee (one query)"""
+    first_day, last_day = month_bounds(year, month)
+    rows = Attendance.objects.filter(
+        employee=employee,
+        date__range=(first_day, last_day)
+    ).values_list('date', 'status', 'notes')
+
+    records = {row_date.day: (row_status, notes) for row_date, row_status, notes in rows}
+    return {"total_days": last_day.day, **build_compact_data(last_day.day, records)}
+
+
+def company_month_attendance_compact(company, year, month):
+    """
+    Get the compact monthly grid for every employee of a company
+
+    Same two queries as company_month_attendance, but each employee-month is
+    a status string plus sparse notes instead of one dict per day.
+
+    Returns:
+        list: one dict per employee with identity fields and compact summary
+    """
+    first_day, last_day = month_bounds(year, month)
+    num_days = last_day.day
+
+    employees = list(
+        Employee.objects.filter(company=company)
+        .values_list('id', 'employee_id', 'full_name', 'department')
+    )
+
+    rows = Attendance.objects.filter(
+        employee__company=company,
+        date__range=(first_day, last_day)
+    ).values_list('employee', 'date', 'status', 'notes')
+
+    records_by_employee = {}
+    for emp_pk, row_date, row_status, notes in rows:
+        records_by_employee.setdefault(emp_pk, {})[row_date.day] = (row_status, notes)
+
+    return [
+        {
+            "employee_id": employee_id,
+            "employee_name": full_name,
+            "department": department,
+            **build_compact_data(num_days, records_by_employee.get(emp_pk, {}))
+        }
+        for emp_pk, employee_id, full_name, department in employees
+    ]
+
+
+def company_month_attendance(company, year, month):
+    """
+    Get the monthly attendance grid for every employee of a company
+
+    Runs exactly two queries (employees, then the month's attendance rows for
+    the whole company) and assembles the grids in memory.
+
+    Args:
+        company: Company instance or primary key
+        year: Calendar year
+        month: Calendar month (1-12)
+
+    Returns:
+        list: one dict per employee with identity fields and month summary
+    """
+    first_day, last_day = month_bounds(year, month)
+
+    employees = list(
+        Employee.objects.filter(company=company)
+        .values_list('id', 'employee_id', 'full_name', 'department')
+    )
+
+    rows = Attendance.objects.filter(
+        employee__company=company,
+        date__range=(first_day, last_day)
+    ).values_list('employee', 'date', 'status', 'notes')
+
+    records_by_employee = {}
+    for emp_pk, row_date, row_status, notes in rows:
+        records_by_employee.setdefault(emp_pk, {})[row_date.day] = (row_status, notes)
+
+    response_data = []
+    for emp_pk, employee_id, full_name, department in employees:
+        summary = build_daily_data(year, month, records_by_employee.get(emp_pk, {}))
+        response_data.append({
+            "employee_id": employee_id,
+            "employee_name": full_name,
+            "department": department,
+            **summary
+        })
+
+    return response_data
+
+
+def bulk_mark_attendance(company, attendance_date, records, batch_size=1000):
+    """
+    Create or update attendance for many employees on one date
+
+    Each record identifies the employee by primary key ('employee') or by
+    company employee code ('employee_id') and carries a 'status' and optional
+    'notes'. Ownership of every employee is checked against the company in a
+    single query, existing rows are detected in a second, and the rest is an
+    upsert on (employee, date) in batches.
+
+    Args:
+        company: Company instance the caller administers
+        attendance_date: date to mark
+        records: iterable of dicts
+        batch_size: rows per INSERT ... ON CONFLICT statement
+
+    Returns:
+        tuple: (results: list of per-row dicts, counts: dict)
+    """
+    records = list(records)
+    pks, codes = set(), set()
+    for record in records:
+        if record.get('employee') not in (None, ''):
+            pks.add(str(record['employee']))
+        elif record.get('employee_id'):
+            codes.add(str(record['employee_id']))
+
+    by_pk, by_code = {}, {}
+    int_pks = [int(pk) for pk in pks if pk.isdigit()]
+    if int_pks or codes:
+        owned = Employee.objects.filter(company=company).filter(
+            Q(pk__in=int_pks) | Q(employee_id__in=codes)
+        ).values_list('pk', 'employee_id')
+        for emp_pk, employee_code in owned:
+            by_pk[str(emp_pk)] = emp_pk
+            by_code[employee_code] = emp_pk
+
+    results = []
+    to_write = {}
+    for index, record in enumerate(records):
+        if record.get('employee') not in (None, ''):
+            reference = str(record['employee'])
+            emp_pk = by_pk.get(reference)
+        else:
+            reference = str(record.get('employee_id') or '')
+            emp_pk = by_code.get(reference)
+        record_status = record.get('status')
+        result = {'row': index, 'employee': reference}
+
+        if not reference:
+            result.update(result='error', error='employee or employee_id is required')
+        elif emp_pk is None:
+            result.update(result='error', error='Employee not found in your company')
+        elif record_status not in ATTENDANCE_STATUSES:
+            result.update(result='error', error=f'Invalid status: {record_status}')
+        elif emp_pk in to_write:
+            result.update(result='error', error='Duplicate row for this employee')
+        else:
+            to_write[emp_pk] = (index, Attendance(
+                employee_id=emp_pk,
+                date=attendance_date,
+                status=record_status,
+                notes=record.get('notes') or ''
+            ))
+        results.append(result)
+
+    existing = set()
+    if to_write:
+        with transaction.atomic():
+            existing = set(Attendance.objects.filter(
+                employee_id__in=to_write.keys(), date=attendance_date
+            ).values_list('employee_id', flat=True))
+
+            Attendance.objects.bulk_create(
+                [obj for _, obj in to_write.values()],
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=['status', 'notes'],
+            )
+            # bulk_create sends no signals, so refresh the rollup and version here
+            refresh_monthly_summaries(to_write.keys(), attendance_date.year, attendance_date.month)
+            bump_version(company.pk, ATTENDANCE)
+
+    counts = {'created': 0, 'updated': 0, 'failed': 0}
+    for emp_pk, (index, _) in to_write.items():
+        outcome = 'updated' if emp_pk in existing else 'created'
+        results[index]['result'] = outcome
+        counts[outcome] += 1
+    counts['failed'] = len(records) - len(to_write)
+
+    return results, counts
@@ -0,0 +1,255 @@
+"""
+JWT authentication for the Employee model
+
+The employee behind a token is resolved at most once per request and shared
+between DRF authentication and the permission checks. An optional in-process
+LRU (EMPLOYEE_AUTH_CACHE_TTL > 0) keeps short-lived token -> employee
+snapshots so repeat requests skip the database entirely. Entries are dropped
+when the employee is saved or deleted in this process; the TTL bounds
+staleness for writes made by other processes.
+
+Tokens minted by EmployeeRefreshToken also carry the employee's company_id,
+is_admin and auth_version ('ver'). With JWT_CLAIMS_FAST_PATH on, GET, HEAD
+and OPTIONS requests build the employee from those claims instead of
+loading it, as long as 'ver' matches the employee's current auth_version.
+That version is read once and then cached in JWT_CLAIMS_CACHE_ALIAS for
+JWT_CLAIMS_VERSION_TTL seconds. Writes in this process update the cache;
+the TTL bounds staleness for writes from other processes unless the cache
+is shared. Writes, tokens without the claims and stale versions load the
+employee as before.
+
+Tokens revoked by logout are refused through the Bloom-filtered revocation
+list in token_revocation, checked before either cache.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class EmployeeUserWrapper:
+    """A wrapper class that makes Employee model compatible with Django's authentication system"""
+    def __init__(self, employee):
+        self.employee = employee
+        self.id = employee.id
+        self.pk = employee.id
+        self.is_active = True
+
+    def __getattr__(self, attr):
+        # Delegate attribute access to the underlying employee
+        return getattr(self.employee, attr)
+
+    def has_perm(self, perm):
+        return True  # For simplicity, grant all permissions
+
+    def is_anonymous(self):
+        return False
+
+    def is_authenticated(self):
+        return True
+
+
+class EmployeeSnapshotCache:
+    """Thread-safe TTL + LRU cache of token -> Employee snapshots"""
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, employee = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+        # Hand out a copy so callers can never mutate the cached snapshot
+        return copy.deepcopy(employee)
+
+    def set(self, token, employee, token_exp=None):
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        snapshot = copy.deepcopy(employee)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_employee(self, employee_pk):
+        with self._lock:
+            stale = [token for token, (_, employee) in self._entries.items() if employee.pk == employee_pk]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+employee_cache = EmployeeSnapshotCache(
+    ttl=getattr(settings, 'EMPLOYEE_AUTH_CACHE_TTL', 0),
+    max_entries=getattr(settings, 'EMPLOYEE_AUTH_CACHE_SIZE', 1024),
+)
+
+
+class EmployeeRefreshToken(RefreshToken):
+    """Refresh token whose claims (copied into its access tokens) describe the employee"""
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['company_id'] = user.company_id
+        token['is_admin'] = user.is_admin
+        token['ver'] = user.auth_version
+        return token
+
+
+class AuthVersionCache:
+    """Current Employee.auth_version per employee, kept in JWT_CLAIMS_CACHE_ALIAS"""
+    key_prefix = 'employee-auth-version'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'JWT_CLAIMS_CACHE_ALIAS', 'default')]
+
+    def get(self, employee_pk):
+        return self.cache.get(f'{self.key_prefix}:{employee_pk}')
+
+    def set(self, employee_pk, version):
+        self.cache.set(f'{self.key_prefix}:{employee_pk}', version,
+                       getattr(settings, 'JWT_CLAIMS_VERSION_TTL', 60))
+
+    def delete(self, employee_pk):
+        self.cache.delete(f'{self.key_prefix}:{employee_pk}')
+
+
+auth_versions = AuthVersionCache()
+CLAIM_FIELDS = ('company_id', 'is_admin', 'ver')
+
+
+def employee_from_claims(user_id, claims):
+    """
+    An Employee built from token claims, if they are current
+
+    Only id, company_id, is_admin and auth_version are set. Reading any
+    other field loads the whole row, with company, in one query (see
+    Employee.refresh_from_db), so views that only check company and role
+    save the query and the rest cost no more than the normal path.
+
+    Returns:
+        Employee or None: None when the token lacks the claims or its
+        version is stale
+    """
+    from .models import Employee
+    if any(claims.get(name) is None for name in CLAIM_FIELDS):
+        return None
+    # simplejwt stores the user id claim as a string
+    user_id = Employee._meta.pk.to_python(user_id)
+    version = auth_versions.get(user_id)
+    if version is None:
+        version = Employee.objects.filter(pk=user_id).values_list('auth_version', flat=True).first()
+        if version is None:
+            return None
+        auth_versions.set(user_id, version)
+    if version != claims['ver']:
+        return None
+    employee = Employee.from_db(
+        router.db_for_read(Employee),
+        ['id', 'company_id', 'is_admin', 'auth_version'],
+        [user_id, claims['company_id'], claims['is_admin'], version]
+    )
+    employee._from_claims = True
+    return employee
+
+# Attribute on the underlying HttpRequest holding the resolved (user, token) pair
+_REQUEST_AUTH_ATTR = '_employee_auth'
+_UNRESOLVED = object()
+
+
+class EmployeeJWTAuthentication:
+    """Custom JWT authentication that works with Employee model"""
+    def authenticate(self, request):
+        # DRF wraps the HttpRequest; cache on the inner request so the result
+        # survives across authentication and permission checks
+        http_request = getattr(request, '_request', request)
+        cached = getattr(http_request, _REQUEST_AUTH_ATTR, _UNRESOLVED)
+        if cached is not _UNRESOLVED:
+            return cached
+
+        result = self._resolve(request)
+        setattr(http_request, _REQUEST_AUTH_ATTR, result)
+        return result
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+    def _resolve(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION')
+
+        if header is None:
+            return None
+
+        try:
+            # Extract token from header (format: 'Bearer <token>')
+            scheme, token = header.split(' ')
+            if scheme.lower() != 'bearer':
+                return None
+        except ValueError:
+            return None
+
+        try:
+            # Decode the JWT token
+            decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+            user_id = decoded_token.get('user_id')
+
+            if user_id is None:
+                return None
+
+            # Checked before the snapshot cache so a revoked token is refused even if cached
+            from .token_revocation import revocations
+            jti = decoded_token.get('jti')
+            if jti and revocations.is_revoked(jti):
+                return None
+
+            if employee_cache.enabled:
+                employee = employee_cache.get(token)
+                if employee is not None:
+                    return (EmployeeUserWrapper(employee), token)
+
+            if getattr(settings, 'JWT_CLAIMS_FAST_PATH', False) and request.method in SAFE_METHODS:
+                employee = employee_from_claims(user_id, decoded_token)
+                if employee is not None:
+                    return (EmployeeUserWrapper(employee), token)
+
+            # Get the employee (and company, which almost every view reads)
+            from .models import Employee
+            try:
+                employee = Employee.objects.select_related('company').get(pk=user_id)
+            except Employee.DoesNotExist:
+                return None
+
+            if employee_cache.enabled:
+                employee_cache.set(token, employee, decoded_token.get('exp'))
+            return (EmployeeUserWrapper(employee), token)
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
@@ -0,0 +1,187 @@
+"""
+Synthetic data and result handling for the API benchmarks
+`manage.py seed_benchmark` fills the database with companies built by
+seed_company(); `manage.py run_benchmarks` drives the views against one of
+them and writes summarize() results to a JSON baseline, which
+compare_results() diffs against an earlier run.
+
+Seeded employees all share BENCHMARK_PASSWORD. Each company's first employee
+is its admin; leaves never overlap each other, and attendance is only marked
+on weekdays up to today that aren't covered by a leave.
+"""
+import math
+import secrets
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance_service import rebuild_monthly_summaries
+from .id_allocation import allocate_employee_ids
+from .leave_ledger import LEAVE_TYPES, grant_annual_entitlements, rebuild_leave_balances
+from .models import Attendance, Company, Employee, InvitedEmployee, Leave
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_COMPANY_PREFIX = 'Benchmark Company'
+DEPARTMENTS = ['Engineering', 'Sales', 'Support', 'Finance', 'Operations']
+# (status, weight)
+LEAVE_STATUSES = [('Approved', 7), ('Pending', 2), ('Rejected', 1)]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def benchmark_email(company_index, employee_index):
+    if employee_index == 0:
+        return f'admin@company{company_index}.benchmark.test'
+    return f'employee{employee_index}@company{company_index}.benchmark.test'
+
+
+def _leave_spans(rng, first_day, last_day, count):
+    """`count` non-overlapping (start, end) spans, one per equal slice of the range"""
+    slot = (last_day - first_day).days // max(count, 1)
+    spans = []
+    for index in range(count):
+        if slot < 4:
+            break
+        slot_start = first_day + timedelta(days=index * slot)
+        length = rng.randint(0, 2)
+        start = slot_start + timedelta(days=rng.randint(0, slot - length - 1))
+        spans.append((start, start + timedelta(days=length)))
+    return spans
+
+
+def seed_company(index, rng, employees=200, years=1, leaves_per_year=6, invitations=50,
+                 password_hash='!', batch_size=5000):
+    """
+    Create one benchmark company with bulk inserts, then build its rollups
+
+    Args:
+        index: number used in the company name and email domain
+        rng: random.Random driving every choice, so a seed reproduces the data
+        employees: employees in the company, the first one an admin
+        years: calendar years of history, ending with the current one
+        leaves_per_year: leaves per employee and year
+        invitations: InvitedEmployee rows
+        password_hash: hashed password stored on every employee
+
+    Returns:
+        dict: rows created per table
+    """
+    today = date.today()
+    first_day = date(today.year - years + 1, 1, 1)
+    with transaction.atomic():
+        company = Company.objects.create(name=f'{BENCHMARK_COMPANY_PREFIX} {index}')
+        employee_ids = allocate_employee_ids(company, employees)
+        staff = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_id=employee_id, full_name=f'Employee {i}',
+                email=benchmark_email(index, i), password=password_hash,
+                department=rng.choice(DEPARTMENTS), position='Benchmark', is_admin=(i == 0)
+            )
+            for i, employee_id in enumerate(employee_ids)
+        ], batch_size=batch_size)
+
+        leaves = []
+        attendance = []
+        attendance_count = 0
+        for employee in staff:
+            on_leave = set()
+            for year in range(first_day.year, today.year + 1):
+                for start, end in _leave_spans(rng, date(year, 1, 1), date(year, 12, 31), leaves_per_year):
+                    status = rng.choices([s for s, _ in LEAVE_STATUSES], [w for _, w in LEAVE_STATUSES])[0]
+                    leaves.append(Leave(
+                        employee=employee, leave_type=rng.choice(LEAVE_TYPES), start_date=start,
+                        end_date=end, reason='Benchmark', status=status
+                    ))
+                    if status != 'Rejected':
+                        on_leave.update(start + timedelta(days=d) for d in range((end - start).days + 1))
+
+            day = first_day
+            while day <= today:
+                if day.weekday() < 5 and day not in on_leave:
+                    attendance.append(Attendance(
+                        employee=employee, date=day, status='Present' if rng.random() < 0.93 else 'Absent'
+                    ))
+                day += timedelta(days=1)
+            # Flush as we go; years of attendance for a large company don't fit in memory
+            if len(attendance) >= batch_size:
+                Attendance.objects.bulk_create(attendance, batch_size=batch_size)
+                attendance_count += len(attendance)
+                attendance = []
+        Attendance.objects.bulk_create(attendance, batch_size=batch_size)
+        attendance_count += len(attendance)
+        Leave.objects.bulk_create(leaves, batch_size=batch_size)
+
+        now = timezone.now()
+        InvitedEmployee.objects.bulk_create([
+            InvitedEmployee(
+                email=f'invitee{i}@company{index}.benchmark.test', company=company, invited_by=staff[0],
+                created_date=now - timedelta(hours=rng.randint(0, 24 * 30)),
+                is_accepted=rng.random() < 0.3, invitation_token=secrets.token_urlsafe(32)
+            )
+            for i in range(invitations)
+        ], batch_size=batch_size)
+
+        # bulk_create skips the signals that keep these up to date
+        rebuild_monthly_summaries(company)
+        for year in range(first_day.year, today.year + 1):
+            grant_annual_entitlements(year, Employee.objects.filter(company=company))
+        rebuild_leave_balances(company)
+
+    return {
+        'employees': len(staff),
+        'attendance': attendance_count,
+        'leaves': len(leaves),
+        'invitations': invitations,
+    }
+
+
+def summarize(latencies, queries, elapsed):
+    """
+    Args:
+        latencies: seconds per request
+        queries: query count per request
+        elapsed: wall time of the whole run
+
+    Returns:
+        dict: the per-scenario record stored in the baseline
+    """
+    ordered = sorted(latency * 1000 for latency in latencies)
+    return {
+        'requests': len(ordered),
+        'throughput_rps': round(len(ordered) / elapsed, 1),
+        'mean_ms': round(sum(ordered) / len(ordered), 2),
+        'p50_ms': round(percentile(ordered, 0.50), 2),
+        'p99_ms': round(percentile(ordered, 0.99), 2),
+        'queries': max(queries),
+    }
+
+
+def compare_results(baseline, current, tolerance=0.25):
+    """
+    Diff two benchmark runs scenario by scenario
+
+    Args:
+        baseline, current: results as written by run_benchmarks
+        tolerance: relative p50 slowdown still accepted
+
+    Returns:
+        list: (scenario, baseline record, current record, regressions) for
+        scenarios present in both runs; regressions is a list of strings
+    """
+    rows = []
+    for name, now in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        regressions = []
+        if now['queries'] > before['queries']:
+            regressions.append(f"queries {before['queries']} -> {now['queries']}")
+        if now['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"p50 {before['p50_ms']} -> {now['p50_ms']} ms")
+        rows.append((name, before, now, regressions))
+    return rows
@@ -0,0 +1,37 @@
+"""
+Django cache backends that report evictions to the response cache stats
+
+Drop-in subclasses of the local-memory and file-based backends; everything
+except culling behaves exactly like the stock classes.
+"""
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .response_cache import stats
+
+
+class CountingLocMemCache(LocMemCache):
+    def _cull(self):
+        # Called with the backend lock held
+        before = len(self._cache)
+        super()._cull()
+        evicted = before - len(self._cache)
+        if evicted:
+            stats.incr('evictions', evicted)
+
+
+class CountingFileBasedCache(FileBasedCache):
+    _culling = False
+
+    def _cull(self):
+        self._culling = True
+        try:
+            super()._cull()
+        finally:
+            self._culling = False
+
+    def _delete(self, fname):
+        deleted = super()._delete(fname)
+        if deleted and self._culling:
+            stats.incr('evictions')
+        return deleted
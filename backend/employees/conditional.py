@@ -0,0 +1,127 @@
+"""
+Conditional GET for read endpoints
+
+A response's ETag is derived from the data versions of the resources it
+depends on (see data_versions), the requesting employee and the full URL, so
+a matching If-None-Match is answered with 304 Not Modified after a single
+lookup in the versions table. Last-Modified is the newest of those versions'
+timestamps and supports If-Modified-Since the same way.
+
+Endpoints that opt in with a cache endpoint name also serve the full
+response from the response cache, keyed by the same versions.
+"""
+from datetime import date
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .data_versions import get_versions, version_token
+from .response_cache import cache_enabled, cache_key, cached_response
+
+
+def request_etag(request, versions):
+    """Compute the ETag for a request given the versions of the resources it reads"""
+    employee = request.employee
+    return quote_etag(version_token(
+        employee.company_id, versions,
+        employee.pk, employee.is_admin,
+        request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+        # Views default to the current month when none is given
+        date.today()
+    ))
+
+
+def response_cache_key(request, endpoint, versions):
+    """
+    Cache key for a company-wide response, shared by all admins of the company
+    """
+    employee = request.employee
+    token = version_token(
+        employee.company_id, versions,
+        sorted(request.query_params.lists()),
+        # Pagination links are absolute
+        request.build_absolute_uri('/'),
+        date.today()
+    )
+    return cache_key(employee.company_id, endpoint, token)
+
+
+def conditional_response(request, resources, build, cache_endpoint=None):
+    """
+    Answer a GET from its validators, calling build() only when needed
+
+    Args:
+        request: DRF request with request.employee set
+        resources: resource names the response depends on
+        build: callable returning the full response
+        cache_endpoint: name to cache admins' full responses under, or None
+
+    Returns:
+        Response: 304 when the client's copy is current, else build()'s
+            response with ETag/Last-Modified set
+    """
+    if request.method not in ('GET', 'HEAD') or not resources:
+        return build()
+
+    versions, last_modified = get_versions(request.employee.company_id, resources)
+    etag = request_etag(request, versions)
+    last_modified = last_modified.timestamp() if last_modified else None
+    # Only admins read company-wide data; other employees' views are narrow and cheap
+    if cache_endpoint and request.employee.is_admin and cache_enabled():
+        key = response_cache_key(request, cache_endpoint, versions)
+        build_uncached = build
+        build = lambda: cached_response(key, build_uncached)
+
+    not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+    if not_modified is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    else:
+        response = not_modified
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the body but revalidate on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_get(*resources, cache=None):
+    """
+    Decorator for @api_view functions and APIView handlers; see conditional_response
+
+    Pass cache='<endpoint name>' to also serve the response from the response cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # APIView handlers receive (self, request), function views (request)
+            request = args[1] if hasattr(args[0], 'dispatch') else args[0]
+            return conditional_response(request, resources, lambda: view(*args, **kwargs), cache)
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified handling to a viewset's list and retrieve
+
+    Set cache_list = True to also serve list responses from the response cache.
+    """
+    etag_resources = ()
+    cache_list = False
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.etag_resources, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            f'{self.basename}.list' if self.cache_list else None
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.etag_resources, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,91 @@
+"""
+Per-company data versions
+
+Every write to a tracked model bumps a counter for (company, resource) in the
+CompanyDataVersion table. Read endpoints use the counters they depend on as a
+cheap validator: one indexed lookup tells whether anything they serve can
+have changed, without touching the main tables.
+
+Bumps are deferred to transaction commit, so a version is never visible
+before the data it describes, and are coalesced so a transaction writing
+many rows of one resource bumps it once.
+"""
+import hashlib
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CompanyDataVersion
+
+EMPLOYEES = 'employees'
+ATTENDANCE = 'attendance'
+LEAVES = 'leaves'
+INVITATIONS = 'invitations'
+
+
+def _apply_bump(company_id, resource):
+    now = timezone.now()
+    rows = CompanyDataVersion.objects.filter(company_id=company_id, resource=resource)
+    if rows.update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            CompanyDataVersion.objects.create(company_id=company_id, resource=resource, version=1, updated_at=now)
+    except IntegrityError:
+        # Created concurrently, or the company itself was just deleted
+        rows.update(version=F('version') + 1, updated_at=now)
+
+
+def _bump_queued(key):
+    return any(getattr(entry[1], 'data_version_key', None) == key for entry in connection.run_on_commit)
+
+
+def bump_version(company_id, *resources):
+    """
+    Mark resources of a company as changed once the current transaction commits
+
+    Args:
+        company_id: Company primary key
+        *resources: resource names (EMPLOYEES, ATTENDANCE, LEAVES, INVITATIONS)
+    """
+    if company_id is None:
+        return
+    for resource in resources:
+        key = (company_id, resource)
+        if connection.in_atomic_block and _bump_queued(key):
+            continue
+
+        def apply(company_id=company_id, resource=resource):
+            _apply_bump(company_id, resource)
+        apply.data_version_key = key
+        transaction.on_commit(apply)
+
+
+def get_versions(company_id, resources):
+    """
+    Read the current versions of some resources of a company (one query)
+
+    Returns:
+        tuple: (versions: dict resource -> int, last_modified: datetime or None)
+    """
+    versions = dict.fromkeys(resources, 0)
+    last_modified = None
+    rows = CompanyDataVersion.objects.filter(
+        company_id=company_id, resource__in=resources
+    ).values_list('resource', 'version', 'updated_at')
+    for resource, version, updated_at in rows:
+        versions[resource] = version
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def version_token(company_id, versions, *parts):
+    """Stable digest of a company's resource versions plus request-specific parts"""
+    raw = '|'.join(
+        [str(company_id)]
+        + [f'{resource}={versions[resource]}' for resource in sorted(versions)]
+        + [str(part) for part in parts]
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -0,0 +1,132 @@
+"""
+Durable outbox for transactional email
+
+Views call enqueue_email() inside the request and return immediately; the
+process_email_outbox management command drains due messages with a pooled
+requests.Session and a thread pool, retrying transient failures with
+exponential backoff.
+
+A claimed message has its next_attempt_at pushed out by the lease period, so
+if a worker dies mid-send the message becomes due again instead of getting
+stuck. Every message carries an idempotency key, which is unique in the table
+and is also passed to Brevo so a retried send is not delivered twice.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .email_service import build_payload, post_to_brevo
+from .models import EmailOutbox
+
+
+def outbox_enabled():
+    return getattr(settings, 'EMAIL_OUTBOX_ENABLED', False)
+
+
+def enqueue_email(idempotency_key, to_email, subject, html_content, to_name=''):
+    """
+    Queue an email for delivery (no-op if the key was already queued)
+
+    Returns:
+        EmailOutbox: the queued message
+    """
+    message, _ = EmailOutbox.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={
+            'to_email': to_email,
+            'to_name': to_name or '',
+            'subject': subject,
+            'html_content': html_content,
+        }
+    )
+    return message
+
+
+def backoff_delay(attempts):
+    """Exponential backoff: base * 2^(attempts-1), capped"""
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_BASE', 30)
+    cap = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_MAX', 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+def claim_batch(batch_size, lease_seconds=120):
+    """
+    Claim up to batch_size due messages for this worker
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it so
+    several workers can drain the table concurrently.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if messages:
+            EmailOutbox.objects.filter(pk__in=[m.pk for m in messages]).update(
+                next_attempt_at=now + timedelta(seconds=lease_seconds)
+            )
+    return messages
+
+
+def _deliver(message, session, timeout):
+    payload = build_payload(
+        message.to_email,
+        message.subject,
+        message.html_content,
+        to_name=message.to_name or None,
+        idempotency_key=message.idempotency_key
+    )
+    return post_to_brevo(payload, session=session, timeout=timeout)
+
+
+def process_batch(messages, session, concurrency=8, timeout=10):
+    """
+    Send claimed messages concurrently and record the outcome of each
+
+    Returns:
+        dict: counts of sent, retrying and failed messages
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+    if not messages:
+        return counts
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda m: _deliver(m, session, timeout), messages))
+
+    # Database writes stay on this thread
+    now = timezone.now()
+    for message, (success, detail, retryable) in zip(messages, outcomes):
+        message.attempts += 1
+        if success:
+            message.status = 'Sent'
+            message.sent_at = now
+            message.last_error = ''
+            counts['sent'] += 1
+        elif retryable and message.attempts < max_attempts:
+            message.next_attempt_at = now + backoff_delay(message.attempts)
+            message.last_error = detail
+            counts['retrying'] += 1
+        else:
+            message.status = 'Failed'
+            message.last_error = detail
+            counts['failed'] += 1
+    EmailOutbox.objects.bulk_update(
+        messages, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return counts
+
+
+def make_session(pool_size):
+    """requests.Session whose connection pool matches the worker concurrency"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
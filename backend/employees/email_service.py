@@ -3,55 +3,56 @@ Email Service using Brevo API (Production Safe)
 No SMTP connection issues on Render
 Uses existing environment variable names:
   EMAIL_HOST_PASSWORD as Brevo API key
+
+Messages are normally queued in the EmailOutbox table (see email_outbox.py)
+and delivered by the process_email_outbox worker; send_otp_email and
+send_invitation_email remain as the synchronous path. The a-prefixed
+variants do the same over httpx for the async views (see async_views.py).
 """
+import asyncio
+import os
+import weakref
+
+import httpx
 import requests
 from django.conf import settings
 
 BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
 
-def send_otp_email(to_email, otp, user_name=None):
+
+def get_brevo_api_url():
+    """Brevo endpoint, overridable via settings.BREVO_API_URL (e.g. a local fake server)"""
+    return getattr(settings, 'BREVO_API_URL', None) or BREVO_API_URL
+
+
+def build_invitation_link(token):
+    """Frontend URL where an invitation token is accepted"""
+    frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+    return f"{frontend_url}/accept-invitation?token={token}"
+
+
+def build_otp_email(otp, user_name=None, company_name=None):
     """
-    Send OTP email using Brevo API
+    Build the password reset OTP email
     
     Args:
-        to_email: Recipient email address
         otp: OTP code to send
         user_name: Optional user name
+        company_name: Optional company the account belongs to, named when
+            the email has accounts in several companies
         
     Returns:
-        tuple: (success: bool, message: str)
+        tuple: (subject: str, html_content: str)
     """
-    try:
-        # Get API key from EMAIL_HOST_PASSWORD (existing variable)
-        api_key = getattr(settings, 'EMAIL_HOST_PASSWORD', None)
-        if not api_key:
-            print("⚠️ EMAIL_HOST_PASSWORD (Brevo API key) not configured")
-            return False, "Email service not configured"
-        
-        # Get sender email from DEFAULT_FROM_EMAIL (existing variable)
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@hrms.com')
-        
-        # Prepare headers
-        headers = {
-            "accept": "application/json",
-            "api-key": api_key,
-            "content-type": "application/json"
-        }
-        
-        # Prepare recipient name
-        name = user_name or "User"
-        
-        # Prepare email payload
-        payload = {
-            "sender": {
-                "name": "HRMS Lite",
-                "email": from_email
-            },
-            "to": [
-                {"email": to_email, "name": name}
-            ],
-            "subject": "HRMS Lite - Password Reset OTP",
-            "htmlContent": f"""
+    # Prepare recipient name
+    name = user_name or "User"
+    
+    subject = "HRMS Lite - Password Reset OTP"
+    account = "your HRMS Lite account"
+    if company_name:
+        subject += f" ({company_name})"
+        account += f" at {company_name}"
+    html_content = f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -72,7 +73,7 @@ def send_otp_email(to_email, otp, user_name=None):
         </div>
         <div class="content">
             <h2>Hello {name},</h2>
-            <p>You requested to reset your password for your HRMS Lite account.</p>
+            <p>You requested to reset your password for {account}.</p>
             <p>Your One-Time Password (OTP) is:</p>
             <div class="otp-box">
                 <div class="otp-code">{otp}</div>
@@ -88,76 +89,23 @@ def send_otp_email(to_email, otp, user_name=None):
 </body>
 </html>
 """
-        }
-        
-        # Log email attempt
-        print(f"📧 Sending OTP email via Brevo API")
-        print(f"   To: {to_email}")
-        print(f"   Name: {name}")
-        print(f"   OTP: {otp}")
-        print(f"   From: {from_email}")
-        
-        # Send email via Brevo API
-        response = requests.post(BREVO_API_URL, json=payload, headers=headers, timeout=10)
-        
-        # Check response
-        if response.status_code in [200, 201]:
-            print(f"✓ Email sent successfully via Brevo API")
-            print(f"   Response: {response.text}")
-            return True, "Email sent successfully"
-        else:
-            error_msg = f"Brevo API error: {response.status_code} - {response.text}"
-            print(f"⚠️ {error_msg}")
-            return False, error_msg
-            
-    except requests.exceptions.Timeout:
-        error_msg = "Email service timeout"
-        print(f"⚠️ {error_msg}")
-        return False, error_msg
-    except Exception as e:
-        error_msg = f"Email error: {type(e).__name__}: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        return False, error_msg
+    return subject, html_content
 
 
-def send_invitation_email(to_email, invitation_link, company_name, inviter_name):
-    """Send invitation email using Brevo API
+def build_invitation_email(invitation_link, company_name, inviter_name):
+    """
+    Build the company invitation email
     
     Args:
-        to_email: Recipient email address
         invitation_link: Full invitation URL
         company_name: Name of the company
         inviter_name: Name of person who sent invitation
     
     Returns:
-        tuple: (success: bool, message: str)
+        tuple: (subject: str, html_content: str)
     """
-    try:
-        # Get API key from EMAIL_HOST_PASSWORD
-        api_key = getattr(settings, 'EMAIL_HOST_PASSWORD', None)
-        if not api_key:
-            print("⚠️ EMAIL_HOST_PASSWORD (Brevo API key) not configured")
-            return False, "Email service not configured"
-        
-        # Get sender email
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@hrms.com')
-        
-        # Prepare headers
-        headers = {
-            "accept": "application/json",
-            "api-key": api_key,
-            "content-type": "application/json"
-        }
-        
-        # Prepare email payload
-        payload = {
-            "sender": {
-                "name": "HRMS Lite",
-                "email": from_email
-            },
-            "to": [{"email": to_email}],
-            "subject": f"Invitation to join {company_name}",
-            "htmlContent": f"""
+    subject = f"Invitation to join {company_name}"
+    html_content = f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -196,31 +144,259 @@ body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
 </body>
 </html>
 """
-        }
-        
-        # Log email attempt
-        print(f"📧 Sending invitation email via Brevo API")
-        print(f"   To: {to_email}")
-        print(f"   Company: {company_name}")
-        print(f"   From: {from_email}")
-        
-        # Send email via Brevo API
-        response = requests.post(BREVO_API_URL, json=payload, headers=headers, timeout=10)
-        
-        # Check response
-        if response.status_code in [200, 201]:
-            print(f"✓ Invitation email sent successfully")
-            return True, "Invitation email sent successfully"
-        else:
-            error_msg = f"Brevo API error: {response.status_code} - {response.text}"
-            print(f"⚠️ {error_msg}")
-            return False, error_msg
+    return subject, html_content
+
+
+def build_payload(to_email, subject, html_content, to_name=None, idempotency_key=None):
+    """
+    Build a Brevo transactional email payload
+    
+    Returns:
+        dict: JSON body for the Brevo smtp/email endpoint
+    """
+    # Get sender email from DEFAULT_FROM_EMAIL (existing variable)
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@hrms.com')
+    
+    recipient = {"email": to_email}
+    if to_name:
+        recipient["name"] = to_name
+    
+    payload = {
+        "sender": {
+            "name": "HRMS Lite",
+            "email": from_email
+        },
+        "to": [recipient],
+        "subject": subject,
+        "htmlContent": html_content
+    }
+    if idempotency_key:
+        # Brevo drops repeated sends carrying the same key
+        payload["headers"] = {"idempotencyKey": idempotency_key}
+    return payload
+
+
+def build_batch_payload(subject, html_content, message_versions, idempotency_key=None):
+    """
+    Build a Brevo batch payload (one request, many recipients)
+    
+    Args:
+        subject: Shared subject line
+        html_content: Shared body; may reference {{ params.<name> }}
+        message_versions: list of {"to": [...], "params": {...}} dicts
+        idempotency_key: Optional key so a retried batch is not sent twice
+    
+    Returns:
+        dict: JSON body for the Brevo smtp/email endpoint
+    """
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@hrms.com')
+    
+    payload = {
+        "sender": {
+            "name": "HRMS Lite",
+            "email": from_email
+        },
+        "subject": subject,
+        "htmlContent": html_content,
+        "messageVersions": message_versions
+    }
+    if idempotency_key:
+        payload["headers"] = {"idempotencyKey": idempotency_key}
+    return payload
+
+
+def brevo_headers():
+    """Request headers for Brevo, or None when no API key is configured"""
+    # Get API key from EMAIL_HOST_PASSWORD (existing variable)
+    api_key = getattr(settings, 'EMAIL_HOST_PASSWORD', None)
+    if not api_key:
+        return None
+    return {
+        "accept": "application/json",
+        "api-key": api_key,
+        "content-type": "application/json"
+    }
+
+
+def brevo_result(status_code, text):
+    """
+    Interpret a Brevo response
+    
+    Returns:
+        tuple: (success: bool, message: str, retryable: bool)
+    """
+    if status_code in [200, 201, 202]:
+        return True, text or "Email sent successfully", False
+    
+    error_msg = f"Brevo API error: {status_code} - {text}"
+    # Throttling and provider errors are worth retrying; other 4xx are not
+    retryable = status_code == 429 or status_code >= 500
+    return False, error_msg, retryable
+
+
+def post_to_brevo(payload, session=None, timeout=10):
+    """
+    POST a payload to Brevo
+    
+    Args:
+        payload: dict built by build_payload (or a batch payload)
+        session: Optional requests.Session to reuse pooled connections
+        timeout: Request timeout in seconds
+    
+    Returns:
+        tuple: (success: bool, message: str, retryable: bool)
+    """
+    headers = brevo_headers()
+    if headers is None:
+        print("⚠️ EMAIL_HOST_PASSWORD (Brevo API key) not configured")
+        return False, "Email service not configured", False
+    
+    try:
+        http = session or requests
+        response = http.post(get_brevo_api_url(), json=payload, headers=headers, timeout=timeout)
+        return brevo_result(response.status_code, response.text)
     
     except requests.exceptions.Timeout:
-        error_msg = "Email service timeout"
-        print(f"⚠️ {error_msg}")
-        return False, error_msg
+        return False, "Email service timeout", True
+    except requests.exceptions.RequestException as e:
+        return False, f"Email error: {type(e).__name__}: {str(e)}", True
+    except Exception as e:
+        return False, f"Email error: {type(e).__name__}: {str(e)}", False
+
+
+def send_otp_email(to_email, otp, user_name=None, company_name=None):
+    """
+    Send OTP email using Brevo API
+    
+    Args:
+        to_email: Recipient email address
+        otp: OTP code to send
+        user_name: Optional user name
+        company_name: Optional company the account belongs to
+        
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    subject, html_content = build_otp_email(otp, user_name, company_name)
+    payload = build_payload(to_email, subject, html_content, to_name=user_name or "User")
+    
+    # Log email attempt
+    print(f"📧 Sending OTP email via Brevo API")
+    print(f"   To: {to_email}")
+    print(f"   Name: {user_name or 'User'}")
+    print(f"   From: {payload['sender']['email']}")
+    
+    # Send email via Brevo API
+    success, message, _ = post_to_brevo(payload)
+    
+    if success:
+        print(f"✓ Email sent successfully via Brevo API")
+        print(f"   Response: {message}")
+        return True, "Email sent successfully"
+    print(f"⚠️ {message}")
+    return False, message
+
+
+def send_invitation_email(to_email, invitation_link, company_name, inviter_name):
+    """Send invitation email using Brevo API
+    
+    Args:
+        to_email: Recipient email address
+        invitation_link: Full invitation URL
+        company_name: Name of the company
+        inviter_name: Name of person who sent invitation
+    
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    subject, html_content = build_invitation_email(invitation_link, company_name, inviter_name)
+    payload = build_payload(to_email, subject, html_content)
+    
+    # Log email attempt
+    print(f"📧 Sending invitation email via Brevo API")
+    print(f"   To: {to_email}")
+    print(f"   Company: {company_name}")
+    print(f"   From: {payload['sender']['email']}")
+    
+    # Send email via Brevo API
+    success, message, _ = post_to_brevo(payload)
+    
+    if success:
+        print(f"✓ Invitation email sent successfully")
+        return True, "Invitation email sent successfully"
+    print(f"⚠️ {message}")
+    return False, message
+
+
+# One pooled AsyncClient per event loop; a client can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """httpx.AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=getattr(settings, 'BREVO_MAX_CONNECTIONS', 200))
+        client = _async_clients[loop] = httpx.AsyncClient(limits=limits)
+    return client
+
+
+async def apost_to_brevo(payload, timeout=10):
+    """
+    Async post_to_brevo; the event loop keeps serving while Brevo answers
+    
+    Returns:
+        tuple: (success: bool, message: str, retryable: bool)
+    """
+    headers = brevo_headers()
+    if headers is None:
+        print("⚠️ EMAIL_HOST_PASSWORD (Brevo API key) not configured")
+        return False, "Email service not configured", False
+    
+    try:
+        response = await get_async_client().post(
+            get_brevo_api_url(), json=payload, headers=headers, timeout=timeout
+        )
+        return brevo_result(response.status_code, response.text)
+    
+    except httpx.TimeoutException:
+        return False, "Email service timeout", True
+    except httpx.HTTPError as e:
+        return False, f"Email error: {type(e).__name__}: {str(e)}", True
     except Exception as e:
-        error_msg = f"Email error: {type(e).__name__}: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        return False, error_msg
+        return False, f"Email error: {type(e).__name__}: {str(e)}", False
+
+
+async def asend_otp_email(to_email, otp, user_name=None, company_name=None):
+    """
+    Async send_otp_email
+    
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    subject, html_content = build_otp_email(otp, user_name, company_name)
+    payload = build_payload(to_email, subject, html_content, to_name=user_name or "User")
+    
+    success, message, _ = await apost_to_brevo(payload)
+    if success:
+        return True, "Email sent successfully"
+    print(f"⚠️ {message}")
+    return False, message
+
+
+async def asend_invitation_email(to_email, invitation_link, company_name, inviter_name):
+    """
+    Async send_invitation_email
+    
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    subject, html_content = build_invitation_email(invitation_link, company_name, inviter_name)
+    payload = build_payload(to_email, subject, html_content)
+    
+    success, message, _ = await apost_to_brevo(payload)
+    if success:
+        return True, "Invitation email sent successfully"
+    print(f"⚠️ {message}")
+    return False, message
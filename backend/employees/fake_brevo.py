@@ -0,0 +1,92 @@
+"""
+Local stand-in for the Brevo transactional email API
+
+Accepts POST /v3/smtp/email, records what it receives and answers like Brevo.
+Delay and failure rate are configurable to simulate a slow or flaky provider.
+Point the app at it with BREVO_API_URL=http://127.0.0.1:<port>/v3/smtp/email
+(and any non-empty EMAIL_HOST_PASSWORD).
+
+    server = FakeBrevoServer(port=0, delay=0.5)
+    server.start()            # background thread
+    ... server.url, server.received ...
+    server.stop()
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _FakeBrevoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._reply(400, {'code': 'invalid_parameter', 'message': 'Invalid JSON'})
+
+        if server.delay:
+            time.sleep(server.delay)
+        if not self.headers.get('api-key'):
+            return self._reply(401, {'code': 'unauthorized', 'message': 'Key not found'})
+        if server.fail_rate and random.random() < server.fail_rate:
+            return self._reply(server.fail_status, {'code': 'internal_error', 'message': 'Simulated failure'})
+
+        with server.lock:
+            if 'messageVersions' in payload:
+                message_ids = [f'<{uuid.uuid4()}@fake-brevo>' for _ in payload['messageVersions']]
+                server.received.append(payload)
+                return self._reply(201, {'messageIds': message_ids})
+
+            key = (payload.get('headers') or {}).get('idempotencyKey')
+            if key and key in server.idempotency_keys:
+                return self._reply(201, {'messageId': server.idempotency_keys[key]})
+            message_id = f'<{uuid.uuid4()}@fake-brevo>'
+            if key:
+                server.idempotency_keys[key] = message_id
+            server.received.append(payload)
+        return self._reply(201, {'messageId': message_id})
+
+    def _reply(self, status_code, body):
+        data = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeBrevoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, fail_rate=0.0, fail_status=500, verbose=False):
+        super().__init__((host, port), _FakeBrevoHandler)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.verbose = verbose
+        self.received = []
+        self.idempotency_keys = {}
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v3/smtp/email'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
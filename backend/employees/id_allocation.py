@@ -0,0 +1,49 @@
+"""
+Employee ID allocation
+
+Each company keeps the last EMPnnnn number it issued in
+Company.last_employee_number. Allocating locks that row (SELECT ... FOR UPDATE),
+bumps it by the number of IDs needed and hands out the range, so allocation is
+constant-time and concurrent requests can never get the same ID. Call these
+inside the transaction that inserts the employees so a failed insert also
+returns its numbers.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Company
+
+EMPLOYEE_ID_PREFIX = 'EMP'
+
+
+def format_employee_id(number):
+    return f"{EMPLOYEE_ID_PREFIX}{str(number).zfill(4)}"
+
+
+def allocate_employee_ids(company, count=1):
+    """
+    Reserve a block of consecutive employee IDs for a company
+
+    Args:
+        company: Company instance or primary key
+        count: how many IDs to reserve
+
+    Returns:
+        list: employee ID strings, e.g. ['EMP0007', 'EMP0008']
+    """
+    company_pk = getattr(company, 'pk', company)
+    with transaction.atomic():
+        last = (
+            Company.objects.select_for_update()
+            .values_list('last_employee_number', flat=True)
+            .get(pk=company_pk)
+        )
+        Company.objects.filter(pk=company_pk).update(
+            last_employee_number=F('last_employee_number') + count
+        )
+    return [format_employee_id(number) for number in range(last + 1, last + count + 1)]
+
+
+def next_employee_id(company):
+    """Reserve a single employee ID"""
+    return allocate_employee_ids(company, 1)[0]
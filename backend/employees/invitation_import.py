@@ -0,0 +1,234 @@
+"""
+Bulk invitation import
+
+An admin uploads a CSV/JSON list of addresses. create_import_job() validates
+it, drops addresses that already belong to an employee or a live invitation
+(one set-based query each), bulk-creates the invitations, reissues expired
+ones in place with a new token, and records an InvitationImportJob. dispatch_import_job() then sends the emails through
+Brevo's batch API (messageVersions), one request per chunk, and updates the
+job's progress counters after each chunk so clients can poll it.
+
+Pending jobs are picked up by the process_email_outbox worker. When the
+outbox is disabled they are dispatched on a background thread instead.
+"""
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .data_versions import INVITATIONS, bump_version
+from .email_outbox import outbox_enabled
+from .email_service import build_batch_payload, build_invitation_email, build_invitation_link, post_to_brevo
+from .models import Employee, InvitedEmployee, InvitationImportJob
+
+
+def extract_emails(data):
+    """
+    Pull email addresses out of a parsed request body
+
+    Accepts a list of strings, a list of row dicts with an 'email' key
+    (CSV or JSON), or a dict with an 'emails' list.
+    """
+    if isinstance(data, dict):
+        data = data.get('emails', [])
+    if not isinstance(data, list):
+        return None
+    emails = []
+    for item in data:
+        if isinstance(item, dict):
+            item = item.get('email', '')
+        emails.append(str(item or '').strip())
+    return emails
+
+
+def create_import_job(inviter, emails):
+    """
+    Create the invitations for a bulk import and the job tracking their emails
+
+    Args:
+        inviter: admin Employee sending the invitations
+        emails: list of email addresses (may contain duplicates/invalid rows)
+
+    Returns:
+        InvitationImportJob
+    """
+    company = inviter.company
+    skipped = []
+    candidates = []
+    seen = set()
+    for email in emails:
+        key = email.lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            skipped.append({'email': email, 'reason': 'Invalid email'})
+            continue
+        if key in seen:
+            skipped.append({'email': email, 'reason': 'Duplicate in upload'})
+            continue
+        seen.add(key)
+        candidates.append(email)
+
+    existing_employees = set(
+        Employee.objects.filter(company=company, email__in=candidates).values_list('email', flat=True)
+    )
+    existing_invitations = {}
+    for invitation in InvitedEmployee.objects.filter(company=company, email__in=candidates):
+        existing_invitations[invitation.email] = invitation
+
+    to_invite = []
+    to_reissue = []
+    for email in candidates:
+        invitation = existing_invitations.get(email)
+        if email in existing_employees:
+            skipped.append({'email': email, 'reason': 'Employee with this email already exists'})
+        elif invitation is None:
+            to_invite.append(email)
+        elif invitation.is_expired:
+            # (email, company) is unique, so an expired invitation is reissued instead
+            to_reissue.append(invitation)
+        else:
+            skipped.append({'email': email, 'reason': 'Invitation already sent to this email'})
+
+    with transaction.atomic():
+        job = InvitationImportJob.objects.create(
+            company=company,
+            created_by=inviter,
+            total_rows=len(emails),
+            invited_count=len(to_invite) + len(to_reissue),
+            skipped=skipped,
+            status='Pending' if to_invite or to_reissue else 'Completed',
+            finished_at=None if to_invite or to_reissue else timezone.now()
+        )
+        InvitedEmployee.objects.bulk_create(
+            [
+                InvitedEmployee(
+                    email=email,
+                    company=company,
+                    invited_by=inviter,
+                    invitation_token=secrets.token_urlsafe(32),
+                    import_job=job
+                )
+                for email in to_invite
+            ],
+            batch_size=1000
+        )
+        now = timezone.now()
+        for invitation in to_reissue:
+            invitation.invited_by = inviter
+            invitation.invitation_token = secrets.token_urlsafe(32)
+            invitation.created_date = now
+            invitation.is_expired = False
+            invitation.import_job = job
+        InvitedEmployee.objects.bulk_update(
+            to_reissue, ['invited_by', 'invitation_token', 'created_date', 'is_expired', 'import_job'],
+            batch_size=1000
+        )
+        bump_version(company.pk, INVITATIONS)
+        if (to_invite or to_reissue) and not outbox_enabled():
+            transaction.on_commit(lambda: _dispatch_in_background(job.pk))
+    return job
+
+
+def claim_import_job(lease_seconds=300):
+    """
+    Claim one pending job, or a running job whose worker stopped updating it
+
+    Returns:
+        InvitationImportJob or None
+    """
+    stale = timezone.now() - timedelta(seconds=lease_seconds)
+    with transaction.atomic():
+        job = (
+            InvitationImportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='Pending') | Q(status='Running', updated_at__lt=stale))
+            .order_by('created_at')
+            .first()
+        )
+        if job is not None:
+            job.status = 'Running'
+            job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def _send_chunk(payload, session, timeout, attempts=3):
+    success, detail = False, ''
+    for attempt in range(attempts):
+        success, detail, retryable = post_to_brevo(payload, session=session, timeout=timeout)
+        if success or not retryable:
+            break
+        time.sleep(2 ** attempt)
+    return success, detail
+
+
+def dispatch_import_job(job, session=None, chunk_size=None, timeout=30):
+    """
+    Send the invitation emails for a job in Brevo batch requests
+
+    Progress (emails_sent/emails_failed/last_invitation_id) is saved after each
+    chunk, so polling clients see it advance and a restarted worker resumes
+    after the last completed chunk.
+    """
+    chunk_size = chunk_size or getattr(settings, 'INVITATION_EMAIL_BATCH_SIZE', 100)
+    company = job.company
+    subject, html_content = build_invitation_email(
+        invitation_link='{{ params.invitation_link }}',
+        company_name=company.name,
+        inviter_name=job.created_by.full_name
+    )
+
+    try:
+        while True:
+            chunk = list(
+                job.invitations.filter(pk__gt=job.last_invitation_id)
+                .order_by('pk')
+                .values_list('pk', 'email', 'invitation_token')[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            versions = [
+                {'to': [{'email': email}], 'params': {'invitation_link': build_invitation_link(token)}}
+                for _, email, token in chunk
+            ]
+            payload = build_batch_payload(
+                subject, html_content, versions,
+                idempotency_key=f'invitation-job:{job.pk}:{chunk[0][0]}'
+            )
+            success, detail = _send_chunk(payload, session, timeout)
+
+            if success:
+                job.emails_sent += len(chunk)
+            else:
+                job.emails_failed += len(chunk)
+                job.error = detail
+            job.last_invitation_id = chunk[-1][0]
+            job.save(update_fields=['emails_sent', 'emails_failed', 'error', 'last_invitation_id', 'updated_at'])
+
+        job.status = 'Completed' if job.emails_failed == 0 else 'Failed'
+    except Exception as e:
+        job.status = 'Failed'
+        job.error = f'{type(e).__name__}: {e}'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def _dispatch_in_background(job_pk):
+    def run():
+        try:
+            job = InvitationImportJob.objects.select_related('company', 'created_by').get(pk=job_pk)
+            job.status = 'Running'
+            job.save(update_fields=['status', 'updated_at'])
+            dispatch_import_job(job)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=run, daemon=True).start()
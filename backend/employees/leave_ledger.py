@@ -0,0 +1,290 @@
+"""
+Leave ledger
+Every change to a leave balance is a LeaveLedgerEntry, and LeaveBalance holds
+their running totals per employee, leave type and year, so a balance is one
+row instead of a scan over the employee's leaves. Entries and the balance
+update are written in one transaction.
+
+- LEAVE_ANNUAL_ENTITLEMENTS are granted once per employee and year: to new
+  employees when they are created, to everyone else by
+  `manage.py grant_leave_entitlements`.
+- An approved leave is posted as usage. When it stops being approved, or its
+  dates or type change, or it is deleted, the difference is posted.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q, Sum
+from django.utils import timezone
+
+from .data_versions import LEAVES, bump_version
+from .leave_overlap import ensure_no_conflict, lock_employee
+from .models import Company, Employee, Leave, LeaveBalance, LeaveLedgerEntry
+
+LEAVE_TYPES = [choice for choice, _ in Leave.LEAVE_TYPES]
+ENTITLEMENT_ENTRIES = (LeaveLedgerEntry.ACCRUAL, LeaveLedgerEntry.ADJUSTMENT)
+USAGE_ENTRIES = (LeaveLedgerEntry.USAGE, LeaveLedgerEntry.REVERSAL)
+
+
+def days_by_year(start_date, end_date):
+    """
+    Calendar days covered by a leave, split at year boundaries
+
+    Returns:
+        dict: {year: days}
+    """
+    days = {}
+    current = start_date
+    while current <= end_date:
+        year_end = min(end_date, date(current.year, 12, 31))
+        days[current.year] = (year_end - current).days + 1
+        current = year_end + timedelta(days=1)
+    return days
+
+
+def post_entries(entries):
+    """
+    Save ledger entries and apply them to the balance rows in one transaction
+
+    Args:
+        entries: list of unsaved LeaveLedgerEntry
+
+    Returns:
+        list: the saved entries
+    """
+    if not entries:
+        return []
+    # (employee, type, year) -> [entitled delta, used delta]
+    deltas = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for entry in entries:
+        key = (entry.employee_id, entry.leave_type, entry.year)
+        if entry.entry_type in ENTITLEMENT_ENTRIES:
+            deltas[key][0] += Decimal(entry.days)
+        else:
+            deltas[key][1] -= Decimal(entry.days)
+
+    with transaction.atomic():
+        saved = LeaveLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+        LeaveBalance.objects.bulk_create(
+            [LeaveBalance(employee_id=emp_pk, leave_type=leave_type, year=year)
+             for emp_pk, leave_type, year in deltas],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        now = timezone.now()
+        for (emp_pk, leave_type, year), (entitled, used) in deltas.items():
+            # Increment in SQL so concurrent postings don't overwrite each other
+            LeaveBalance.objects.filter(employee_id=emp_pk, leave_type=leave_type, year=year).update(
+                entitled_days=F('entitled_days') + entitled,
+                used_days=F('used_days') + used,
+                updated_at=now
+            )
+    return saved
+
+
+def sync_leave_usage(leave, deleted=False):
+    """
+    Post the usage entries that bring the ledger in line with a leave
+
+    An approved leave should have used its days and any other leave none.
+    Comparing that with what the ledger already holds for the leave makes
+    this idempotent, and covers approval, rejection, edits and deletion.
+
+    Args:
+        leave: Leave instance
+        deleted: the leave is being deleted, so all its usage is given back
+
+    Returns:
+        list: the entries posted
+    """
+    wanted = defaultdict(Decimal)
+    if leave.status == 'Approved' and not deleted:
+        for year, days in days_by_year(leave.start_date, leave.end_date).items():
+            wanted[(leave.leave_type, year)] = Decimal(days)
+
+    posted = defaultdict(Decimal)
+    for row in LeaveLedgerEntry.objects.filter(leave=leave, entry_type__in=USAGE_ENTRIES).values(
+        'leave_type', 'year'
+    ).annotate(days=Sum('days')).order_by():
+        posted[(row['leave_type'], row['year'])] = -row['days']
+
+    entries = []
+    for leave_type, year in set(wanted) | set(posted):
+        extra = wanted[(leave_type, year)] - posted[(leave_type, year)]
+        if extra:
+            entries.append(LeaveLedgerEntry(
+                employee_id=leave.employee_id, leave_type=leave_type, year=year,
+                entry_type=LeaveLedgerEntry.USAGE if extra > 0 else LeaveLedgerEntry.REVERSAL,
+                days=-extra,
+                # The row is about to disappear; entries outlive it unlinked
+                leave=None if deleted else leave
+            ))
+    return post_entries(entries)
+
+
+def set_leave_status(leave, new_status):
+    """
+    Approve or reject a leave and post its usage in the same transaction
+
+    Returns:
+        Leave: the updated leave
+
+    Raises:
+        LeaveConflict: reviving a rejected leave whose dates are now taken
+    """
+    with transaction.atomic():
+        # Lock the row so concurrent approve/reject calls post usage once
+        leave = Leave.objects.select_for_update().get(pk=leave.pk)
+        if leave.status == 'Rejected' and new_status != 'Rejected':
+            lock_employee(leave.employee_id)
+            ensure_no_conflict(leave.employee_id, leave.start_date, leave.end_date, exclude_pk=leave.pk)
+        leave.status = new_status
+        leave.save()
+    return leave
+
+
+def grant_annual_entitlements(year, employees=None):
+    """
+    Grant LEAVE_ANNUAL_ENTITLEMENTS for a year to employees who haven't had them
+
+    Args:
+        year: Calendar year
+        employees: optional Employee queryset (default: everyone)
+
+    Returns:
+        int: ledger entries written
+    """
+    entitlements = getattr(settings, 'LEAVE_ANNUAL_ENTITLEMENTS', {})
+    if employees is None:
+        employees = Employee.objects.all()
+    reference = f'annual:{year}'
+    granted = set(LeaveLedgerEntry.objects.filter(
+        reference=reference, employee__in=employees
+    ).values_list('employee_id', 'leave_type'))
+
+    entries = []
+    companies = set()
+    for emp_pk, company_id in employees.values_list('pk', 'company_id').iterator():
+        for leave_type, days in entitlements.items():
+            if (emp_pk, leave_type) not in granted:
+                entries.append(LeaveLedgerEntry(
+                    employee_id=emp_pk, leave_type=leave_type, year=year,
+                    entry_type=LeaveLedgerEntry.ACCRUAL, days=days, reference=reference
+                ))
+                companies.add(company_id)
+    post_entries(entries)
+    for company_id in companies:
+        bump_version(company_id, LEAVES)
+    return len(entries)
+
+
+def rebuild_leave_balances(company=None, batch_size=2000):
+    """
+    Post usage for approved leaves that have none, then rebuild LeaveBalance
+    from the ledger with one GROUP BY query
+
+    Args:
+        company: optional Company (instance or pk) to limit the rebuild to
+
+    Bumps the LEAVES version of every company rebuilt.
+
+    Returns:
+        tuple: (usage entries backfilled, balance rows written)
+    """
+    leaves = Leave.objects.filter(status='Approved', ledger_entries__isnull=True)
+    entries = LeaveLedgerEntry.objects.all()
+    balances = LeaveBalance.objects.all()
+    if company is not None:
+        leaves = leaves.filter(employee__company=company)
+        entries = entries.filter(employee__company=company)
+        balances = balances.filter(employee__company=company)
+
+    with transaction.atomic():
+        backfill = [
+            LeaveLedgerEntry(
+                employee_id=leave.employee_id, leave_type=leave.leave_type, year=year,
+                entry_type=LeaveLedgerEntry.USAGE, days=-days, leave=leave
+            )
+            for leave in leaves.only('employee_id', 'leave_type', 'start_date', 'end_date').iterator()
+            for year, days in days_by_year(leave.start_date, leave.end_date).items()
+        ]
+        LeaveLedgerEntry.objects.bulk_create(backfill, batch_size=batch_size)
+
+        grouped = entries.values('employee', 'leave_type', 'year').annotate(
+            entitled=Sum('days', filter=Q(entry_type__in=ENTITLEMENT_ENTRIES), default=Decimal(0)),
+            used=Sum('days', filter=Q(entry_type__in=USAGE_ENTRIES), default=Decimal(0))
+        ).order_by()
+
+        written = 0
+        balances.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(LeaveBalance(
+                employee_id=row['employee'], leave_type=row['leave_type'], year=row['year'],
+                entitled_days=row['entitled'], used_days=-row['used']
+            ))
+            if len(batch) >= batch_size:
+                LeaveBalance.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            LeaveBalance.objects.bulk_create(batch)
+            written += len(batch)
+
+        # leaves/balances responses are cached and ETagged by the LEAVES version
+        company_ids = [getattr(company, 'pk', company)] if company is not None else (
+            Company.objects.values_list('pk', flat=True)
+        )
+        for company_id in company_ids:
+            bump_version(company_id, LEAVES)
+    return len(backfill), written
+
+
+def company_leave_balances(company_id, year, employee=None):
+    """
+    Entitled, used and remaining days per employee and leave type (one query)
+
+    Args:
+        company_id: Company primary key
+        year: Calendar year
+        employee: optional Employee to limit the result to
+
+    Returns:
+        list: one dict per employee, including employees without balance rows
+    """
+    employees = Employee.objects.filter(company_id=company_id)
+    if employee is not None:
+        employees = employees.filter(pk=employee.pk)
+
+    totals = {}
+    for leave_type in LEAVE_TYPES:
+        of_type = Q(year_balances__leave_type=leave_type)
+        totals[f'{leave_type}_entitled'] = Sum('year_balances__entitled_days', filter=of_type, default=Decimal(0))
+        totals[f'{leave_type}_used'] = Sum('year_balances__used_days', filter=of_type, default=Decimal(0))
+
+    rows = employees.annotate(
+        year_balances=FilteredRelation('leave_balances', condition=Q(leave_balances__year=year))
+    ).values('id', 'employee_id', 'full_name', 'department').annotate(**totals).order_by('employee_id')
+
+    response_data = []
+    for row in rows:
+        balances = {}
+        for leave_type in LEAVE_TYPES:
+            entitled = row[f'{leave_type}_entitled']
+            used = row[f'{leave_type}_used']
+            balances[leave_type] = {
+                'entitled': float(entitled),
+                'used': float(used),
+                'remaining': float(entitled - used)
+            }
+        response_data.append({
+            'id': row['id'],
+            'employee_id': row['employee_id'],
+            'employee_name': row['full_name'],
+            'department': row['department'],
+            'balances': balances
+        })
+    return response_data
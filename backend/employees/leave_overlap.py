@@ -0,0 +1,92 @@
+"""
+Conflict checks for leave requests
+A leave may not overlap another leave of the same employee that isn't
+rejected, nor a day the employee is marked Present. Each check is one
+indexed query:
+
+- PostgreSQL: the GiST index on (employee_id, daterange(start_date, end_date))
+  from migration 0013 answers `&&` directly.
+- Other databases: a range scan of leave_active_end_idx, (employee,
+  end_date, start_date) over active leaves, from `start` upwards, keeping
+  rows with start_date <= `end`. It only reads the employee's leaves ending
+  on or after the requested start, which for current and future dates is
+  a handful however long the history is. It doesn't assume active leaves
+  are disjoint: admin edits and bulk imports skip this check, and older
+  data may already overlap.
+
+Callers lock the employee row first (lock_employee) so two concurrent
+requests can't both pass the check.
+"""
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from .models import Attendance, Employee, Leave
+
+CONFLICT_FIELDS = ('id', 'leave_type', 'start_date', 'end_date', 'status')
+
+
+class LeaveConflict(Exception):
+    """The requested dates clash with another leave or with attendance"""
+
+
+def lock_employee(employee_id):
+    """Serialize leave writes for one employee until the transaction ends"""
+    list(Employee.objects.select_for_update().filter(pk=employee_id).values_list('pk', flat=True))
+
+
+def find_overlapping_leave(employee_id, start_date, end_date, exclude_pk=None):
+    """
+    An active (not rejected) leave of the employee overlapping the dates
+
+    Args:
+        employee_id: Employee primary key
+        start_date, end_date: inclusive date range
+        exclude_pk: Leave being edited, which can't conflict with itself
+
+    Returns:
+        dict or None: CONFLICT_FIELDS of one overlapping leave
+    """
+    leaves = Leave.objects.filter(employee_id=employee_id).exclude(status='Rejected')
+    if exclude_pk is not None:
+        leaves = leaves.exclude(pk=exclude_pk)
+
+    if connection.vendor == 'postgresql':
+        overlaps = RawSQL(
+            "daterange(start_date, end_date, '[]') && daterange(%s::date, %s::date, '[]')",
+            (start_date, end_date),
+            output_field=BooleanField()
+        )
+        return next(iter(leaves.filter(overlaps).order_by().values(*CONFLICT_FIELDS)[:1]), None)
+
+    return next(iter(
+        leaves.filter(end_date__gte=start_date, start_date__lte=end_date)
+        .order_by('end_date').values(*CONFLICT_FIELDS)[:1]
+    ), None)
+
+
+def find_present_day(employee_id, start_date, end_date):
+    """First day in the range the employee is marked Present, or None"""
+    return Attendance.objects.filter(
+        employee_id=employee_id, date__range=(start_date, end_date), status='Present'
+    ).order_by('date').values_list('date', flat=True).first()
+
+
+def ensure_no_conflict(employee_id, start_date, end_date, exclude_pk=None):
+    """
+    Raise LeaveConflict if the dates can't be taken as leave
+
+    Raises:
+        LeaveConflict: with a message naming the clash
+    """
+    if end_date < start_date:
+        raise LeaveConflict('End date must be on or after start date')
+    overlapping = find_overlapping_leave(employee_id, start_date, end_date, exclude_pk)
+    if overlapping:
+        raise LeaveConflict(
+            f"Overlaps {overlapping['status'].lower()} {overlapping['leave_type']} leave "
+            f"from {overlapping['start_date']} to {overlapping['end_date']}"
+        )
+    present = find_present_day(employee_id, start_date, end_date)
+    if present:
+        raise LeaveConflict(f'Attendance is marked Present on {present}')
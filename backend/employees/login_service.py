@@ -0,0 +1,117 @@
+"""
+Credential checks for login and password reset
+
+An email can belong to employees of several companies, so login looks up
+every account for the email (optionally narrowed to one company) in a single
+indexed query that also joins the company, and verifies the password against
+each. Hashes made with an older or weaker hasher (see PASSWORD_HASHER in
+settings) are replaced with the preferred one on the first successful login.
+
+Password reset sends each of those accounts its own OTP, so the code that
+comes back identifies the account without revealing which companies the
+email belongs to.
+"""
+import random
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from .models import Employee, PasswordResetOTP
+
+
+class AmbiguousLogin(Exception):
+    """The credentials match accounts in more than one company"""
+    def __init__(self, employees):
+        super().__init__('Credentials match more than one company')
+        self.companies = [{'id': emp.company_id, 'name': emp.company.name} for emp in employees]
+
+
+def _rehash_setter(employee):
+    def setter(raw_password):
+        employee.password = make_password(raw_password)
+        # Plain UPDATE: the hash is never served, so no signals are needed
+        Employee.objects.filter(pk=employee.pk).update(password=employee.password)
+    return setter
+
+
+def accounts_for_email(email, company_id=None):
+    """
+    Employees with this email, with company loaded, oldest first
+
+    Args:
+        email: Login email
+        company_id: optional Company primary key to narrow to one account
+
+    Returns:
+        QuerySet: at most LOGIN_MAX_ACCOUNTS_PER_EMAIL employees
+    """
+    accounts = Employee.objects.select_related('company').filter(email=email)
+    if company_id is not None:
+        accounts = accounts.filter(company_id=company_id)
+    return accounts.order_by('id')[:getattr(settings, 'LOGIN_MAX_ACCOUNTS_PER_EMAIL', 5)]
+
+
+def create_reset_otps(accounts):
+    """
+    Create a password reset OTP for each account, no two with the same code
+
+    Returns:
+        list: (employee, PasswordResetOTP) pairs
+    """
+    codes = set()
+    while len(codes) < len(accounts):
+        codes.add(str(random.randint(100000, 999999)))
+    return [
+        (employee, PasswordResetOTP.objects.create(employee=employee, otp=otp))
+        for employee, otp in zip(accounts, codes)
+    ]
+
+
+def find_reset_otp(email, otp, company_id=None):
+    """
+    The latest unused OTP with this code sent to an account with this email
+
+    Returns:
+        PasswordResetOTP or None: with employee loaded
+    """
+    records = PasswordResetOTP.objects.select_related('employee').filter(
+        employee__email=email, otp=otp, is_used=False
+    )
+    if company_id is not None:
+        records = records.filter(employee__company_id=company_id)
+    return records.order_by('-created_at').first()
+
+
+def authenticate_employee(email, password, company_id=None):
+    """
+    Find the employee matching an email and password
+
+    Runs one query, plus one UPDATE when a stored hash is upgraded. Hashing
+    work is bounded by LOGIN_MAX_ACCOUNTS_PER_EMAIL, and an unknown email
+    still costs one hash so it cannot be told apart by timing.
+
+    Args:
+        email: Login email
+        password: Raw password
+        company_id: optional Company primary key to pick one account
+
+    Returns:
+        Employee or None: the matching employee, with company loaded
+
+    Raises:
+        AmbiguousLogin: the password matches accounts in several companies
+            and no company_id was given
+    """
+    candidates = list(accounts_for_email(email, company_id))
+
+    if not candidates:
+        make_password(password)
+        return None
+
+    matches = [
+        employee for employee in candidates
+        if check_password(password, employee.password, _rehash_setter(employee))
+    ]
+    if len(matches) > 1:
+        raise AmbiguousLogin(matches)
+    return matches[0] if matches else None
@@ -0,0 +1,153 @@
+"""
+Housekeeping for tables that only ever grow
+
+- PasswordResetOTP: rows that are used, or expired for longer than
+  OTP_RETENTION_HOURS, can never verify again and are deleted.
+- InvitedEmployee: pending invitations older than INVITATION_EXPIRY_DAYS
+  are marked is_expired, which verify/accept already refuse.
+- RevokedToken: rows whose token has expired are refused by the JWT
+  signature check anyway and are deleted.
+
+Work is done in primary-key batches so no statement holds locks for long.
+Run it with `manage.py purge_expired`, or set MAINTENANCE_INTERVAL to have
+each web process run it in a background thread.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .data_versions import INVITATIONS, bump_version
+from .models import PasswordResetOTP, InvitedEmployee, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_in_batches(queryset, batch_size, dry_run):
+    if dry_run:
+        return queryset.count()
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
+
+
+def purge_password_resets(now=None, batch_size=1000, dry_run=False):
+    """
+    Delete OTPs that can no longer be used
+
+    Returns:
+        int: rows deleted (or that would be, with dry_run)
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=getattr(settings, 'OTP_RETENTION_HOURS', 24))
+    # Two passes so each predicate can use its own index
+    deleted = _delete_in_batches(PasswordResetOTP.objects.filter(expires_at__lt=cutoff), batch_size, dry_run)
+    deleted += _delete_in_batches(
+        PasswordResetOTP.objects.filter(is_used=True, expires_at__gte=cutoff), batch_size, dry_run
+    )
+    return deleted
+
+
+def expire_stale_invitations(now=None, batch_size=1000, dry_run=False):
+    """
+    Mark pending invitations past INVITATION_EXPIRY_DAYS as expired
+
+    Returns:
+        int: invitations marked expired (or that would be, with dry_run)
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'INVITATION_EXPIRY_DAYS', 7))
+    stale = InvitedEmployee.objects.filter(is_accepted=False, is_expired=False, created_date__lt=cutoff)
+    if dry_run:
+        return stale.count()
+
+    expired = 0
+    while True:
+        batch = list(stale.values_list('pk', 'company_id')[:batch_size])
+        if not batch:
+            return expired
+        expired += InvitedEmployee.objects.filter(pk__in=[pk for pk, _ in batch]).update(is_expired=True)
+        # update() sends no signals
+        for company_id in {company_id for _, company_id in batch}:
+            bump_version(company_id, INVITATIONS)
+
+
+def purge_revoked_tokens(now=None, batch_size=1000, dry_run=False):
+    """
+    Delete revocations of tokens that have expired
+
+    Returns:
+        int: rows deleted (or that would be, with dry_run)
+    """
+    now = now or timezone.now()
+    return _delete_in_batches(RevokedToken.objects.filter(expires_at__lte=now), batch_size, dry_run)
+
+
+def compact_tables():
+    """Return freed pages to the database after large purges"""
+    tables = [PasswordResetOTP._meta.db_table, InvitedEmployee._meta.db_table, RevokedToken._meta.db_table]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in tables:
+                cursor.execute(f'VACUUM (ANALYZE) {connection.ops.quote_name(table)}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+
+
+def run_maintenance(batch_size=1000, dry_run=False, compact=False):
+    """
+    Run every maintenance task once
+
+    Returns:
+        dict: counts per task
+    """
+    now = timezone.now()
+    report = {
+        'otps_deleted': purge_password_resets(now, batch_size, dry_run),
+        'invitations_expired': expire_stale_invitations(now, batch_size, dry_run),
+        'revoked_tokens_deleted': purge_revoked_tokens(now, batch_size, dry_run),
+    }
+    if compact and not dry_run:
+        compact_tables()
+    return report
+
+
+_scheduler_lock = threading.Lock()
+_scheduler_started = False
+
+
+def start_scheduler(interval=None):
+    """Start the background maintenance thread once per process"""
+    global _scheduler_started
+    if _scheduler_started:
+        return False
+    interval = interval if interval is not None else getattr(settings, 'MAINTENANCE_INTERVAL', 0)
+    if interval <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler_started:
+            return False
+        _scheduler_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                report = run_maintenance()
+                if any(report.values()):
+                    logger.info('Maintenance: %s', report)
+            except Exception:
+                logger.exception('Maintenance run failed')
+            finally:
+                # The thread sleeps between runs; don't hold a connection open
+                connection.close()
+
+    threading.Thread(target=loop, name='hrms-maintenance', daemon=True).start()
+    return True
@@ -0,0 +1,146 @@
+"""
+Measure the leave overlap check against a naive range scan. Seeds employees
+with thousands of historical leaves, plus some long ones covering others
+(as admin edits can leave behind), inside a transaction that is always
+rolled back. Then times both checks for random date windows on one
+employee, and the probe alone for windows in the last month, and confirms
+they agree. Also prints the probe's query plan and posts one conflicting
+leave through the API.
+
+Usage:
+    python manage.py benchmark_leave_overlap
+    python manage.py benchmark_leave_overlap --employees 20 --leaves 5000 --checks 1000
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from employees.authentication import EmployeeUserWrapper
+from employees.leave_overlap import find_overlapping_leave
+from employees.models import Company, Employee, Leave
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time the indexed leave overlap probe against a naive range scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=5, help='Employees to seed (default: 5)')
+        parser.add_argument('--leaves', type=int, default=5000,
+                            help='Historical leaves per employee (default: 5000)')
+        parser.add_argument('--checks', type=int, default=500, help='Windows to check (default: 500)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, num_employees, num_leaves):
+        company = Company.objects.create(name='Overlap Benchmark')
+        employees = Employee.objects.bulk_create([
+            Employee(company=company, employee_id=f'OB{i:04d}', full_name=f'Employee {i}',
+                     email=f'overlap-{i}@example.com', password='!', department='QA', is_admin=(i == 0))
+            for i in range(num_employees)
+        ])
+        rng = random.Random(0)
+        start = date.today() - timedelta(days=num_leaves * 5)
+        leaves = []
+        for employee in employees:
+            day = start
+            for _ in range(num_leaves):
+                day += timedelta(days=rng.randint(1, 3))
+                length = rng.randint(0, 2)
+                leaves.append(Leave(
+                    employee=employee, leave_type='Casual', start_date=day,
+                    end_date=day + timedelta(days=length), reason='History',
+                    status=rng.choice(['Approved', 'Approved', 'Approved', 'Rejected'])
+                ))
+                day += timedelta(days=length)
+            # Long approved leaves overlapping the history around them
+            for offset in range(100, (day - start).days, 1000):
+                leaves.append(Leave(
+                    employee=employee, leave_type='Sick', start_date=start + timedelta(days=offset),
+                    end_date=start + timedelta(days=offset + 30), reason='Overlapping', status='Approved'
+                ))
+        Leave.objects.bulk_create(leaves, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return employees, start, day
+
+    def _run(self, options):
+        self.stdout.write(f"Seeding {options['employees']} employees x {options['leaves']} leaves...")
+        employees, first_day, last_day = self._seed(options['employees'], options['leaves'])
+        employee = employees[0]
+        span = (last_day - first_day).days
+
+        rng = random.Random(1)
+        windows = []
+        for _ in range(options['checks']):
+            start = first_day + timedelta(days=rng.randint(0, span))
+            windows.append((start, start + timedelta(days=rng.randint(0, 4))))
+
+        def naive(start, end):
+            return Leave.objects.filter(
+                employee=employee, start_date__lte=end, end_date__gte=start
+            ).exclude(status='Rejected').exists()
+
+        def probe(start, end):
+            return find_overlapping_leave(employee.pk, start, end) is not None
+
+        results = {}
+        self.stdout.write(f"{'check':<8} {'us/check':>10} {'conflicts':>10}")
+        for label, check in (('naive', naive), ('probe', probe)):
+            started = time.perf_counter()
+            results[label] = [check(start, end) for start, end in windows]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<8} {elapsed / len(windows) * 1e6:>10.0f} {sum(results[label]):>10}"
+            )
+        if results['naive'] != results['probe']:
+            raise CommandError('Probe and naive scan disagree')
+
+        recent = []
+        for _ in range(options['checks']):
+            start = last_day - timedelta(days=rng.randint(0, 30))
+            recent.append((start, start + timedelta(days=rng.randint(0, 4))))
+        started = time.perf_counter()
+        conflicts = sum(probe(start, end) for start, end in recent)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{'recent':<8} {elapsed / len(recent) * 1e6:>10.0f} {conflicts:>10}")
+        self.stdout.write(self.style.SUCCESS('Probe matches the naive scan on every window'))
+
+        start, end = windows[0]
+        with CaptureQueriesContext(connection) as captured:
+            find_overlapping_leave(employee.pk, start, end)
+        self.stdout.write(f"\nProbe SQL: {captured.captured_queries[-1]['sql']}")
+        with connection.cursor() as cursor:
+            prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            cursor.execute(prefix + captured.captured_queries[-1]['sql'])
+            for row in cursor.fetchall():
+                self.stdout.write(f'  {row[-1]}')
+
+        # An overlapping request through the API is refused
+        taken = Leave.objects.filter(employee=employee).exclude(status='Rejected').order_by('-start_date').first()
+        token = str(RefreshToken.for_user(EmployeeUserWrapper(employee)).access_token)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post('/api/leaves/', {
+                'employee': employee.pk, 'leave_type': 'Sick', 'reason': 'Overlap',
+                'start_date': taken.end_date.isoformat(), 'end_date': (taken.end_date + timedelta(days=1)).isoformat()
+            }, content_type='application/json')
+        self.stdout.write(
+            f'\nPOST overlapping leave: HTTP {response.status_code} in {len(captured)} queries: '
+            f'{response.json()}'
+        )
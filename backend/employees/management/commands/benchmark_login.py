@@ -0,0 +1,91 @@
+"""
+Measure login throughput per password hasher. Seeds a throwaway employee
+inside a transaction that is always rolled back, posts to /api/auth/login/
+from a single thread (so the rate is per core) and reports logins per second
+and queries per login. Also checks that a hash made with another hasher is
+upgraded on the first login.
+
+Usage:
+    python manage.py benchmark_login
+    python manage.py benchmark_login --logins 50 --hashers scrypt,pbkdf2
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from employees.models import Company, Employee
+
+PASSWORD = 'benchmark-password'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Report logins per second per core for each password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20,
+                            help='Logins to time per hasher (default: 20)')
+        parser.add_argument('--hashers', default=','.join(settings._PASSWORD_HASHER_CLASSES),
+                            help='Comma-separated hasher names (default: all)')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['hashers'].split(',') if name.strip()]
+        unknown = set(names) - set(settings._PASSWORD_HASHER_CLASSES)
+        if unknown:
+            raise CommandError(f"Unknown hashers: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f"{'hasher':<8} {'ms/login':>9} {'logins/s/core':>14} {'queries':>8}  upgrade")
+        for name in names:
+            hashers = [settings._PASSWORD_HASHER_CLASSES[name]] + [
+                path for other, path in settings._PASSWORD_HASHER_CLASSES.items() if other != name
+            ]
+            try:
+                with override_settings(PASSWORD_HASHERS=hashers, THROTTLE_ENABLED=False), transaction.atomic():
+                    row = self._measure(name, options['logins'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+            except ValueError as e:
+                # Argon2 without argon2-cffi installed
+                self.stdout.write(f"{name:<8} skipped: {e}")
+                continue
+            self.stdout.write(row)
+
+    def _measure(self, name, logins):
+        company = Company.objects.create(name='Login Benchmark')
+        employee = Employee.objects.create(
+            company=company, employee_id='LB0001', full_name='Login Benchmark',
+            email='login-benchmark@example.com', password=make_password(PASSWORD), department='QA'
+        )
+        client = Client()
+        body = {'email': employee.email, 'password': PASSWORD}
+
+        queries = None
+        started = time.perf_counter()
+        for _ in range(logins):
+            with CaptureQueriesContext(connection) as captured:
+                response = client.post('/api/auth/login/', body, content_type='application/json')
+            if response.status_code != 200:
+                raise CommandError(f'{name}: login returned HTTP {response.status_code}')
+            queries = len(captured) if queries is None else max(queries, len(captured))
+        elapsed = time.perf_counter() - started
+
+        # A hash from another hasher is replaced on the next successful login
+        other = next(algo for algo in ('pbkdf2_sha256', 'scrypt') if algo != identify_hasher(employee.password).algorithm)
+        legacy = make_password(PASSWORD, hasher=other)
+        Employee.objects.filter(pk=employee.pk).update(password=legacy)
+        client.post('/api/auth/login/', body, content_type='application/json')
+        employee.refresh_from_db()
+        upgraded = identify_hasher(employee.password).algorithm
+        upgrade = f'{other} -> {upgraded}'
+
+        per_login = elapsed / logins
+        return f"{name:<8} {per_login * 1000:>9.1f} {1 / per_login:>14.1f} {queries:>8}  {upgrade}"
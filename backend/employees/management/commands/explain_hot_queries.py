@@ -0,0 +1,133 @@
+"""
+Print EXPLAIN plans for the hot attendance/leave/invitation/login queries,
+before and after the hot-path indexes and sargable date-range predicates.
+
+Seeds a synthetic company inside a transaction, drops the indexes added in
+0005_hot_path_indexes to capture the "before" plans (using the old
+EXTRACT(year/month) predicates), recreates them for the "after" plans, and
+rolls everything back.
+
+Usage:
+    python manage.py explain_hot_queries
+    python manage.py explain_hot_queries --employees 1000 --days 365 --analyze
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from employees.attendance_service import month_bounds
+from employees.models import Company, Employee, Attendance, Leave, InvitedEmployee
+
+HOT_PATH_INDEXES = [
+    (Employee, 'employee_email_idx'),
+    (Attendance, 'attendance_date_employee_idx'),
+    (Leave, 'leave_employee_status_idx'),
+    (Leave, 'leave_pending_idx'),
+    (InvitedEmployee, 'invite_company_status_idx'),
+    (InvitedEmployee, 'invite_pending_idx'),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for hot queries before and after the hot-path indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200, help='Employees to seed (default: 200)')
+        parser.add_argument('--days', type=int, default=120, help='Days of attendance per employee (default: 120)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Run EXPLAIN (ANALYZE, BUFFERS) on PostgreSQL')
+
+    def handle(self, *args, **options):
+        try:
+            # SQLite only allows schema changes in a transaction with FK checks off
+            with connection.constraint_checks_disabled(), transaction.atomic():
+                company, probe_email, year, month = self._seed(options['employees'], options['days'])
+                self._refresh_statistics()
+
+                with connection.schema_editor() as editor:
+                    for model, name in HOT_PATH_INDEXES:
+                        editor.remove_index(model, self._index(model, name))
+                self._explain_all('BEFORE', self._legacy_queries(company, probe_email, year, month), options)
+
+                with connection.schema_editor() as editor:
+                    for model, name in HOT_PATH_INDEXES:
+                        editor.add_index(model, self._index(model, name))
+                self._refresh_statistics()
+                self._explain_all('AFTER', self._queries(company, probe_email, year, month), options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _index(self, model, name):
+        return next(index for index in model._meta.indexes if index.name == name)
+
+    def _seed(self, num_employees, num_days):
+        self.stdout.write(f'Seeding {num_employees} employees x {num_days} days...')
+        # A second company so company filters are actually selective
+        companies = [Company.objects.create(name=f'Explain Co {i}') for i in range(2)]
+        employees = Employee.objects.bulk_create([
+            Employee(company=companies[i % 2], employee_id=f'EX{i:05d}', full_name=f'Employee {i}',
+                     email=f'explain-{i}@example.com', password='!', department=f'Dept {i % 5}',
+                     is_admin=(i < 2))
+            for i in range(num_employees)
+        ])
+        end = date.today()
+        start = end - timedelta(days=num_days - 1)
+        Attendance.objects.bulk_create(
+            (Attendance(employee=emp, date=start + timedelta(days=d),
+                        status='Present' if (emp.pk + d) % 7 else 'Absent')
+             for emp in employees for d in range(num_days)),
+            batch_size=2000
+        )
+        Leave.objects.bulk_create(
+            (Leave(employee=emp, leave_type='Casual', start_date=start + timedelta(days=n * 30),
+                   end_date=start + timedelta(days=n * 30 + 1), reason='Explain',
+                   status='Pending' if n == 0 else 'Approved')
+             for emp in employees for n in range(max(1, num_days // 30))),
+            batch_size=2000
+        )
+        InvitedEmployee.objects.bulk_create(
+            (InvitedEmployee(email=f'explain-invite-{i}@example.com', company=companies[i % 2],
+                             invited_by=employees[i % 2], is_accepted=bool(i % 3),
+                             invitation_token=f'explain-token-{i}')
+             for i in range(num_employees)),
+            batch_size=2000
+        )
+        return companies[0], employees[num_employees // 2].email, end.year, end.month
+
+    def _refresh_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _legacy_queries(self, company, email, year, month):
+        return [
+            ('login lookup', Employee.objects.filter(email=email)),
+            ('company attendance month', Attendance.objects.filter(
+                employee__company=company, date__year=year, date__month=month)),
+            ('pending leaves', Leave.objects.filter(employee__company=company, status='Pending')),
+            ('pending invitations', InvitedEmployee.objects.filter(company=company, is_accepted=False)),
+        ]
+
+    def _queries(self, company, email, year, month):
+        first_day, last_day = month_bounds(year, month)
+        return [
+            ('login lookup', Employee.objects.filter(email=email)),
+            ('company attendance month', Attendance.objects.filter(
+                employee__company=company, date__range=(first_day, last_day))),
+            ('pending leaves', Leave.objects.filter(employee__company=company, status='Pending')),
+            ('pending invitations', InvitedEmployee.objects.filter(company=company, is_accepted=False)),
+        ]
+
+    def _explain_all(self, phase, queries, options):
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n===== {phase} ====='))
+        for label, queryset in queries:
+            self.stdout.write(self.style.SUCCESS(f'\n-- {label}'))
+            self.stdout.write(queryset.explain(**explain_options))
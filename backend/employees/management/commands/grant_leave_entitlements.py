@@ -0,0 +1,33 @@
+"""
+Grant the yearly LEAVE_ANNUAL_ENTITLEMENTS to every employee
+
+Safe to re-run: employees who already received a year's grant are skipped.
+New employees are granted the current year automatically when created, so
+this is for the start of each year and for employees that existed before
+the leave ledger.
+
+Usage:
+    python manage.py grant_leave_entitlements
+    python manage.py grant_leave_entitlements --year 2027 --company 3
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from employees.leave_ledger import grant_annual_entitlements
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Grant annual leave entitlements for a year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Year to grant (default: current year)')
+        parser.add_argument('--company', type=int, help='Only grant to this company id')
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.localdate().year
+        employees = Employee.objects.all()
+        if options['company']:
+            employees = employees.filter(company_id=options['company'])
+        written = grant_annual_entitlements(year, employees)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} entitlement entries for {year}'))
@@ -0,0 +1,165 @@
+"""
+Compare WSGI and ASGI latency while the email provider is slow. Starts the
+fake Brevo server with a response delay, then for each server in turn
+(gunicorn running the sync views, uvicorn running the async views with
+ASYNC_VIEWS=True) fires concurrent forgot-password requests and reports
+p50/p95/p99 latency and throughput. The servers deliver mail directly
+(EMAIL_OUTBOX_ENABLED=False) so every request waits on the provider, and
+throttling is off. A throwaway company and employee are committed for the
+run (the servers are separate processes) and deleted afterwards.
+
+Needs gunicorn and uvicorn installed, and a database both server processes
+can reach (the configured DATABASE_URL is passed through).
+
+Usage:
+    python manage.py load_test_async
+    python manage.py load_test_async --requests 500 --concurrency 200 --delay 1
+    python manage.py load_test_async --servers asgi --asgi-workers 2
+"""
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.benchmarking import percentile
+from employees.fake_brevo import FakeBrevoServer
+from employees.models import Company, Employee
+
+EMAIL = 'async-load-test@example.com'
+SERVERS = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = 'Load-test forgot-password under WSGI (sync views) and ASGI (async views) with a slow provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per server (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Requests in flight at once (default: 100)')
+        parser.add_argument('--delay', type=float, default=0.5,
+                            help='Fake Brevo response delay in seconds (default: 0.5)')
+        parser.add_argument('--servers', default=','.join(SERVERS), help='Comma-separated: wsgi,asgi')
+        parser.add_argument('--wsgi-workers', type=int, default=2, help='gunicorn sync workers (default: 2)')
+        parser.add_argument('--asgi-workers', type=int, default=1, help='uvicorn workers (default: 1)')
+        parser.add_argument('--port', type=int, default=8101, help='Port the servers listen on (default: 8101)')
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}")
+        for name, module in (('wsgi', 'gunicorn'), ('asgi', 'uvicorn')):
+            if name in servers and importlib.util.find_spec(module) is None:
+                raise CommandError(f'{module} is not installed')
+
+        brevo = FakeBrevoServer(delay=options['delay']).start()
+        company = Company.objects.create(name='Async Load Test')
+        Employee.objects.create(
+            company=company, employee_id='ALT0001', full_name='Async Load Test',
+            email=EMAIL, password=make_password(None), department='QA'
+        )
+        try:
+            self.stdout.write(
+                f"{options['requests']} requests, concurrency {options['concurrency']}, "
+                f"provider delay {options['delay'] * 1000:.0f} ms"
+            )
+            self.stdout.write(
+                f"{'server':<28} {'ok':>5} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}"
+            )
+            for name in servers:
+                self.stdout.write(self._run(name, brevo.url, options))
+        finally:
+            company.delete()
+            brevo.stop()
+
+    def _spawn(self, name, brevo_url, options):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'hrms_lite.settings'),
+            BREVO_API_URL=brevo_url,
+            EMAIL_HOST_PASSWORD=settings.EMAIL_HOST_PASSWORD or 'load-test',
+            EMAIL_OUTBOX_ENABLED='False',
+            THROTTLE_ENABLED='False',
+            DEBUG='False',
+            ASYNC_VIEWS='True' if name == 'asgi' else 'False',
+        )
+        bind = f"127.0.0.1:{options['port']}"
+        if name == 'wsgi':
+            workers = options['wsgi_workers']
+            command = [sys.executable, '-m', 'gunicorn', 'hrms_lite.wsgi:application',
+                       '--bind', bind, '--workers', str(workers), '--timeout', '300']
+            label = f'wsgi gunicorn x{workers}'
+        else:
+            workers = options['asgi_workers']
+            command = [sys.executable, '-m', 'uvicorn', 'hrms_lite.asgi:application',
+                       '--host', '127.0.0.1', '--port', str(options['port']),
+                       '--workers', str(workers), '--log-level', 'warning']
+            label = f'asgi uvicorn x{workers}'
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return process, label, f'http://{bind}'
+
+    def _wait_ready(self, process, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with code {process.returncode}')
+            try:
+                requests.get(f'{base_url}/api/invitations/verify/', timeout=1)
+                return
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        raise CommandError(f'Server did not start within {timeout}s')
+
+    def _run(self, name, brevo_url, options):
+        process, label, base_url = self._spawn(name, brevo_url, options)
+        try:
+            self._wait_ready(process, base_url)
+            url = f'{base_url}/api/auth/forgot-password/'
+            local = threading.local()
+
+            def fire(_):
+                session = getattr(local, 'session', None)
+                if session is None:
+                    session = local.session = requests.Session()
+                started = time.perf_counter()
+                try:
+                    ok = session.post(url, json={'email': EMAIL}, timeout=300).status_code == 200
+                except requests.exceptions.RequestException:
+                    ok = False
+                return ok, time.perf_counter() - started
+
+            # Warm up imports and connections outside the measurement
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(fire, range(4)))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(fire, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        latencies = sorted(latency * 1000 for ok, latency in results if ok)
+        errors = len(results) - len(latencies)
+        if not latencies:
+            return f'{label:<28} {0:>5} {errors:>5}  all requests failed'
+        return (
+            f'{label:<28} {len(latencies):>5} {errors:>5} {percentile(latencies, 0.50):>9.0f} '
+            f'{percentile(latencies, 0.95):>9.0f} {percentile(latencies, 0.99):>9.0f} '
+            f'{len(latencies) / elapsed:>8.1f}'
+        )
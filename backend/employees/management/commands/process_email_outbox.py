@@ -0,0 +1,66 @@
+"""
+Drain the EmailOutbox table and pending bulk invitation jobs
+
+Usage:
+    python manage.py process_email_outbox            # run forever
+    python manage.py process_email_outbox --once     # drain what is due and exit
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.email_outbox import claim_batch, process_batch, make_session
+from employees.invitation_import import claim_import_job, dispatch_import_job
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails and bulk invitation batches with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no messages are due')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per round (default: 50)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent sends (default: 8)')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to sleep when nothing is due (default: 2)')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout (default: 10)')
+
+    def handle(self, *args, **options):
+        session = make_session(options['concurrency'])
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+        try:
+            while True:
+                job = claim_import_job()
+                if job is not None:
+                    job = dispatch_import_job(job, session=session, timeout=options['timeout'])
+                    self.stdout.write(
+                        f"Invitation import #{job.pk}: {job.status} "
+                        f"sent={job.emails_sent} failed={job.emails_failed}"
+                    )
+                    continue
+
+                messages = claim_batch(options['batch_size'])
+                if not messages:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                counts = process_batch(
+                    messages, session,
+                    concurrency=options['concurrency'],
+                    timeout=options['timeout']
+                )
+                for key, value in counts.items():
+                    totals[key] += value
+                self.stdout.write(
+                    f"Processed {len(messages)}: sent={counts['sent']} "
+                    f"retrying={counts['retrying']} failed={counts['failed']}"
+                )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: sent={totals['sent']} retrying={totals['retrying']} failed={totals['failed']}"
+        ))
@@ -0,0 +1,58 @@
+"""
+Delete dead password-reset OTPs and revocations of expired tokens, and expire
+stale invitations
+
+Usage:
+    python manage.py purge_expired                 # run once and report
+    python manage.py purge_expired --dry-run       # only count
+    python manage.py purge_expired --compact       # VACUUM afterwards
+    python manage.py purge_expired --loop --interval 3600
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.maintenance import run_maintenance
+from employees.models import PasswordResetOTP, InvitedEmployee
+
+
+class Command(BaseCommand):
+    help = 'Purge expired OTPs and token revocations and mark stale invitations expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count what would change without writing')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per statement (default: 1000)')
+        parser.add_argument('--compact', action='store_true',
+                            help='VACUUM the affected tables after purging')
+        parser.add_argument('--loop', action='store_true', help='Keep running every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600.0,
+                            help='Seconds between runs with --loop (default: 3600)')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self._run_once(options)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _run_once(self, options):
+        started = time.perf_counter()
+        report = run_maintenance(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            compact=options['compact']
+        )
+        elapsed = time.perf_counter() - started
+        prefix = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(
+            f"{prefix}: otps_deleted={report['otps_deleted']} "
+            f"invitations_expired={report['invitations_expired']} "
+            f"revoked_tokens_deleted={report['revoked_tokens_deleted']} in {elapsed:.2f}s"
+        )
+        self.stdout.write(
+            f"Remaining: otps={PasswordResetOTP.objects.count()} "
+            f"pending_invitations={InvitedEmployee.objects.filter(is_accepted=False, is_expired=False).count()}"
+        )
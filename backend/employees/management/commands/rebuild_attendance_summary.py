@@ -0,0 +1,25 @@
+"""
+Rebuild the MonthlyAttendanceSummary rollup from raw attendance rows
+
+The rollup is maintained incrementally on every attendance write; run this
+after loading attendance outside the app (raw SQL, fixtures, restores) or to
+repair drift.
+
+Usage:
+    python manage.py rebuild_attendance_summary
+    python manage.py rebuild_attendance_summary --company 3
+"""
+from django.core.management.base import BaseCommand
+
+from employees.attendance_service import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly attendance totals from raw attendance rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only rebuild this company id')
+
+    def handle(self, *args, **options):
+        written = rebuild_monthly_summaries(company=options['company'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} monthly summary rows'))
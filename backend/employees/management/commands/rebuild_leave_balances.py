@@ -0,0 +1,27 @@
+"""
+Rebuild LeaveBalance from the leave ledger
+
+Balances are maintained on every ledger posting; run this after upgrading
+(it first posts usage for approved leaves that predate the ledger), after
+editing ledger rows by hand, or to repair drift.
+
+Usage:
+    python manage.py rebuild_leave_balances
+    python manage.py rebuild_leave_balances --company 3
+"""
+from django.core.management.base import BaseCommand
+
+from employees.leave_ledger import rebuild_leave_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild leave balances from ledger entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only rebuild this company id')
+
+    def handle(self, *args, **options):
+        backfilled, written = rebuild_leave_balances(company=options['company'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {backfilled} usage entries, wrote {written} balance rows'
+        ))
@@ -0,0 +1,207 @@
+"""
+Benchmark the main API views against a company created by `seed_benchmark`.
+Each scenario sends requests through the in-process test client, so the full
+middleware, authentication and DRF stack runs but no network or server does.
+Reports throughput, p50/p99 latency and queries per request, and can write
+them to a JSON baseline and diff against an earlier one to catch regressions
+between commits. Everything runs in a transaction that is rolled back, so
+the seeded data (the pending leaves it approves) is reusable.
+
+The response cache is off unless --cache is given, throttling is off, and the
+token revocation filter is loaded once up front.
+
+Usage:
+    python manage.py run_benchmarks
+    python manage.py run_benchmarks --requests 200 --output benchmarks/baseline.json
+    python manage.py run_benchmarks --compare benchmarks/baseline.json --tolerance 0.3
+"""
+import json
+import platform
+import subprocess
+import time
+from datetime import date, timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from employees.authentication import EmployeeRefreshToken, EmployeeUserWrapper
+from employees.benchmarking import (
+    BENCHMARK_COMPANY_PREFIX, BENCHMARK_PASSWORD, compare_results, summarize
+)
+from employees.models import Attendance, Company, Employee, InvitedEmployee, Leave
+from employees.token_revocation import revocations
+
+SCENARIOS = ('login', 'employee list', 'attendance month', 'company attendance', 'leave approve')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login, employee list, attendance and leave approval against seeded data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help=f'Company name (default: the first "{BENCHMARK_COMPANY_PREFIX}")')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario (default: 50)')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Unmeasured requests per scenario (default: 5)')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios')
+        parser.add_argument('--cache', action='store_true', help='Leave the response cache on')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON file to diff against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='p50 slowdown accepted by --compare, as a fraction (default: 0.25)')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            company = companies.filter(name=options['company']).first()
+        else:
+            company = companies.filter(name__startswith=BENCHMARK_COMPANY_PREFIX).first()
+        if company is None:
+            raise CommandError('No benchmark company found; run `manage.py seed_benchmark` first')
+
+        # The revocation filter's periodic refresh would land on a random request
+        overrides = {'THROTTLE_ENABLED': False, 'TOKEN_REVOCATION_REFRESH_INTERVAL': float('inf')}
+        revocations.refresh(full=True)
+        if not options['cache']:
+            overrides['RESPONSE_CACHE_TTL'] = 0
+        try:
+            with override_settings(**overrides), transaction.atomic():
+                results = self._run(company, names, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'scenario':<20} {'req/s':>8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, row in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<20} {row['throughput_rps']:>8.1f} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} "
+                f"{row['p99_ms']:>9.2f} {row['queries']:>8}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            self._compare(options['compare'], results, options['tolerance'])
+
+    def _run(self, company, names, options):
+        employees = Employee.objects.filter(company=company)
+        admin = employees.filter(is_admin=True).order_by('pk').first()
+        member = employees.filter(is_admin=False).order_by('pk').first()
+        if admin is None or member is None:
+            raise CommandError(f'{company.name} needs an admin and another employee')
+
+        def client_for(employee):
+            token = str(EmployeeRefreshToken.for_user(EmployeeUserWrapper(employee)).access_token)
+            return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        admin_client = client_for(admin)
+        member_client = client_for(member)
+        # The last complete month
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+        month = f'?month={last_month.month}&year={last_month.year}'
+
+        pending = list(
+            Leave.objects.filter(employee__company=company, status='Pending').order_by('pk').values_list('pk', flat=True)
+        )
+        total = options['warmup'] + options['requests']
+        if 'leave approve' in names and len(pending) < total:
+            raise CommandError(
+                f'leave approve needs {total} pending leaves, {company.name} has {len(pending)}; '
+                f'seed more with --leaves or lower --requests'
+            )
+        pending = iter(pending)
+
+        # name -> callable sending one request
+        scenarios = {
+            'login': lambda: Client().post('/api/auth/login/', {
+                'email': admin.email, 'password': BENCHMARK_PASSWORD, 'company': company.pk
+            }, content_type='application/json'),
+            'employee list': lambda: admin_client.get('/api/employees/'),
+            'attendance month': lambda: member_client.get(f'/api/attendance/my_attendance/{month}'),
+            'company attendance': lambda: admin_client.get(f'/api/attendance/my-attendance/{month}'),
+            'leave approve': lambda: admin_client.post(f'/api/leaves/{next(pending)}/approve/'),
+        }
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'company': company.name,
+            'dataset': {
+                'employees': employees.count(),
+                'attendance': Attendance.objects.filter(employee__company=company).count(),
+                'leaves': Leave.objects.filter(employee__company=company).count(),
+                'invitations': InvitedEmployee.objects.filter(company=company).count(),
+            },
+            'response_cache': bool(options['cache']),
+            'scenarios': {},
+        }
+        for name in names:
+            send = scenarios[name]
+            for _ in range(options['warmup']):
+                send()
+            latencies, queries = [], []
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    response = send()
+                    latencies.append(time.perf_counter() - request_started)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} returned HTTP {response.status_code}')
+                queries.append(len(captured))
+            results['scenarios'][name] = summarize(latencies, queries, time.perf_counter() - started)
+        return results
+
+    def _compare(self, path, results, tolerance):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read baseline {path}: {e}')
+
+        self.stdout.write(f"\nAgainst {path} (commit {baseline.get('commit') or 'unknown'}):")
+        self.stdout.write(f"{'scenario':<20} {'p50 ms':>17} {'p99 ms':>17} {'queries':>9}")
+        failures = []
+        for name, before, now, regressions in compare_results(baseline, results, tolerance):
+            change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            marker = f"  <-- {'; '.join(regressions)}" if regressions else ''
+            self.stdout.write(
+                f"{name:<20} {before['p50_ms']:>7.2f} -> {now['p50_ms']:>7.2f} "
+                f"{before['p99_ms']:>7.2f} -> {now['p99_ms']:>7.2f} "
+                f"{before['queries']:>3} -> {now['queries']:<3} {change:+.0f}%{marker}"
+            )
+            if regressions:
+                failures.append(name)
+        if failures:
+            raise CommandError(f"Regressed against the baseline: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
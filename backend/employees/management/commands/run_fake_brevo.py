@@ -0,0 +1,32 @@
+"""
+Run a local fake Brevo API for development and tests
+
+Usage:
+    python manage.py run_fake_brevo --port 8025 --delay 2 --fail-rate 0.1
+"""
+from django.core.management.base import BaseCommand
+
+from employees.fake_brevo import FakeBrevoServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake Brevo transactional email API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8025)
+        parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before each response')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+
+    def handle(self, *args, **options):
+        server = FakeBrevoServer(
+            host=options['host'], port=options['port'],
+            delay=options['delay'], fail_rate=options['fail_rate'], verbose=True
+        )
+        self.stdout.write(f'Fake Brevo listening on {server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,58 @@
+"""
+Print the slowest query fingerprints recorded by the slow-query log
+(employees/query_log.py): calls, total/mean/max time, the view and stack
+frame that last ran each one, and with --plans the last sampled EXPLAIN.
+
+Usage:
+    python manage.py slow_queries
+    python manage.py slow_queries --order max --limit 10 --plans
+    python manage.py slow_queries --reset
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from employees.models import SlowQueryFingerprint
+from employees.query_log import flush_slow_queries
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'calls': '-calls',
+    'mean': (F('total_ms') / F('calls')).desc(),
+}
+
+
+class Command(BaseCommand):
+    help = 'Show the slowest normalized queries recorded by the slow-query log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Fingerprints to show (default: 20)')
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='total',
+                            help='Sort by total, mean or max time, or calls (default: total)')
+        parser.add_argument('--plans', action='store_true', help='Print the last sampled EXPLAIN output')
+        parser.add_argument('--reset', action='store_true', help='Delete all recorded fingerprints')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQueryFingerprint.objects.all().delete()
+            self.stdout.write(f'Deleted {deleted} fingerprints')
+            return
+
+        # Include anything this process recorded itself
+        flush_slow_queries()
+        rows = SlowQueryFingerprint.objects.order_by(ORDERINGS[options['order']])[:options['limit']]
+        if not rows:
+            self.stdout.write('No slow queries recorded')
+            return
+
+        for rank, row in enumerate(rows, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank} {row.fingerprint[:12]}  {row.calls} calls, {row.total_ms:.0f} ms total, '
+                f'{row.total_ms / max(row.calls, 1):.0f} ms mean, {row.max_ms:.0f} ms max'
+            ))
+            self.stdout.write(f'  last seen {row.last_seen:%Y-%m-%d %H:%M:%S} in {row.last_view or "-"} '
+                              f'at {row.last_frame or "-"}')
+            self.stdout.write(f'  {row.sql}')
+            if options['plans'] and row.plan:
+                for line in row.plan.splitlines():
+                    self.stdout.write(f'    {line}')
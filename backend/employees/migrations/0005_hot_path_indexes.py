@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_invitedemployee'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'employee'], name='attendance_date_employee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['email'], name='employee_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitedemployee',
+            index=models.Index(fields=['company', 'is_accepted', '-created_date'], name='invite_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitedemployee',
+            index=models.Index(condition=models.Q(('is_accepted', False)), fields=['company', '-created_date'], name='invite_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['employee', 'status', '-created_at'], name='leave_employee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['-created_at'], name='leave_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-17 06:10
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_employee_counters(apps, schema_editor):
+    """Start each company's counter above every EMPnnnn ID already issued"""
+    Company = apps.get_model('employees', 'Company')
+    Employee = apps.get_model('employees', 'Employee')
+    pattern = re.compile(r'^EMP(\d+)$')
+
+    highest = {}
+    for company_id, employee_id in Employee.objects.values_list('company_id', 'employee_id').iterator():
+        match = pattern.match(employee_id)
+        number = int(match.group(1)) if match else 0
+        highest[company_id] = max(highest.get(company_id, 0), number)
+
+    counts = {}
+    for company_id in Employee.objects.values_list('company_id', flat=True).iterator():
+        counts[company_id] = counts.get(company_id, 0) + 1
+
+    for company_id, number in highest.items():
+        Company.objects.filter(pk=company_id).update(
+            last_employee_number=max(number, counts.get(company_id, 0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_invitationimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='last_employee_number',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(seed_employee_counters, migrations.RunPython.noop),
+    ]
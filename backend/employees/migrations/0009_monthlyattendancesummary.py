@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-17 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_summaries(apps, schema_editor):
+    Attendance = apps.get_model('employees', 'Attendance')
+    MonthlyAttendanceSummary = apps.get_model('employees', 'MonthlyAttendanceSummary')
+    grouped = (
+        Attendance.objects
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('employee', 'year', 'month')
+        .annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent'))
+        )
+        .order_by()
+    )
+    MonthlyAttendanceSummary.objects.bulk_create(
+        (
+            MonthlyAttendanceSummary(
+                employee_id=row['employee'], year=row['year'], month=row['month'],
+                present_days=row['present'], absent_days=row['absent']
+            )
+            for row in grouped.iterator(chunk_size=2000)
+        ),
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_company_last_employee_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present_days', models.PositiveSmallIntegerField(default=0)),
+                ('absent_days', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance', to='employees.employee')),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'indexes': [models.Index(fields=['year', 'month', 'employee'], name='attendance_summary_month_idx')],
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+RANGE_INDEX = 'leave_active_range_gist'
+
+
+def create_range_index(apps, schema_editor):
+    """GiST index answering `daterange && daterange` per employee (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # btree_gist lets the integer employee_id share the GiST index with the range
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {RANGE_INDEX} ON employees_leave "
+        f"USING gist (employee_id, daterange(start_date, end_date, '[]')) "
+        f"WHERE NOT (status = 'Rejected')"
+    )
+
+
+def drop_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {RANGE_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0012_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(condition=models.Q(('status', 'Rejected'), _negated=True), fields=['employee', 'start_date'], name='leave_active_start_idx'),
+        ),
+        migrations.RunPython(create_range_index, drop_range_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0014_slow_query_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='auth_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
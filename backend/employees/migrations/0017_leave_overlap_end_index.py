@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0016_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='leave',
+            name='leave_active_start_idx',
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(condition=models.Q(('status', 'Rejected'), _negated=True), fields=['employee', 'end_date', 'start_date'], name='leave_active_end_idx'),
+        ),
+    ]
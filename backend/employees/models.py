@@ -6,6 +6,8 @@ from datetime import timedelta
 class Company(models.Model):
     name = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Highest EMPnnnn number handed out; see id_allocation.allocate_employee_ids
+    last_employee_number = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name_plural = 'Companies'
@@ -14,6 +16,19 @@ class Company(models.Model):
     def __str__(self):
         return self.name
 
+class CompanyDataVersion(models.Model):
+    """Per-company write counter for one resource; see data_versions"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='data_versions')
+    resource = models.CharField(max_length=20)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ['company', 'resource']
+
+    def __str__(self):
+        return f"{self.company_id}/{self.resource} v{self.version}"
+
 class Employee(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employees')
     employee_id = models.CharField(max_length=50)
@@ -25,11 +40,36 @@ class Employee(models.Model):
     position = models.CharField(max_length=100, blank=True)
     profile_picture = models.URLField(max_length=500, blank=True, null=True)
     is_admin = models.BooleanField(default=False)
+    # Bumped when company or is_admin change, which access tokens carry as claims
+    auth_version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
         unique_together = [['company', 'employee_id'], ['company', 'email']]
+        indexes = [
+            # Login looks employees up by email alone
+            models.Index(fields=['email'], name='employee_email_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored claims so a save that changes them bumps auth_version
+        loaded = (instance.__dict__.get('company_id'), instance.__dict__.get('is_admin'))
+        instance._loaded_auth_claims = None if None in loaded else loaded
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # An employee built from token claims (authentication.employee_from_claims)
+        # loads the rest of its row, with company, the first time a deferred
+        # field is read, instead of one query per field
+        if fields is not None and getattr(self, '_from_claims', False):
+            self._from_claims = False
+            fields = {*fields, *self.get_deferred_fields(), 'company'}
+            if from_queryset is None:
+                from_queryset = Employee._base_manager.select_related('company')
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
 
     def __str__(self):
         return f"{self.employee_id} - {self.full_name}"
@@ -43,6 +83,10 @@ class PasswordResetOTP(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # maintenance.purge_password_resets deletes by expiry
+            models.Index(fields=['expires_at'], name='otp_expires_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.expires_at:
@@ -70,10 +114,40 @@ class Attendance(models.Model):
     class Meta:
         ordering = ['-date']
         unique_together = ['employee', 'date']
+        indexes = [
+            # Company-wide month ranges; (employee, date) is already covered by unique_together
+            models.Index(fields=['date', 'employee'], name='attendance_date_employee_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored date so a move to another month can refresh both rollups
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
 
     def __str__(self):
         return f"{self.employee.employee_id} - {self.date} - {self.status}"
 
+class MonthlyAttendanceSummary(models.Model):
+    """Per-employee monthly attendance totals, kept in step with Attendance"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='monthly_attendance')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present_days = models.PositiveSmallIntegerField(default=0)
+    absent_days = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        unique_together = ['employee', 'year', 'month']
+        indexes = [
+            models.Index(fields=['year', 'month', 'employee'], name='attendance_summary_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.employee_id} - {self.year}/{self.month}: {self.present_days}P {self.absent_days}A"
+
 class Leave(models.Model):
     LEAVE_TYPES = [
         ('Sick', 'Sick Leave'),
@@ -98,10 +172,82 @@ class Leave(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'status', '-created_at'], name='leave_employee_status_idx'),
+            # Approval queue: only pending requests are polled
+            models.Index(fields=['-created_at'], condition=models.Q(status='Pending'), name='leave_pending_idx'),
+            # Overlap range scan (see leave_overlap.py); PostgreSQL also gets a GiST range index
+            models.Index(fields=['employee', 'end_date', 'start_date'], condition=~models.Q(status='Rejected'),
+                         name='leave_active_end_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so saves that never touch an approval skip the ledger
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
     def __str__(self):
         return f"{self.employee.full_name} - {self.leave_type} ({self.start_date} to {self.end_date})"
 
+class LeaveLedgerEntry(models.Model):
+    """
+    One movement in an employee's leave balance for a type and year
+
+    days is signed from the balance's point of view: accruals and positive
+    adjustments add days, usage takes them away and reversals give them back.
+    """
+    ACCRUAL = 'Accrual'
+    ADJUSTMENT = 'Adjustment'
+    USAGE = 'Usage'
+    REVERSAL = 'Reversal'
+    ENTRY_TYPES = [
+        (ACCRUAL, 'Accrual'),
+        (ADJUSTMENT, 'Adjustment'),
+        (USAGE, 'Usage'),
+        (REVERSAL, 'Reversal'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPES)
+    year = models.PositiveSmallIntegerField()
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    days = models.DecimalField(max_digits=6, decimal_places=2)
+    leave = models.ForeignKey(Leave, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    # Identifies grants that must only happen once, e.g. 'annual:2026'
+    reference = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'year', 'leave_type'], name='leave_ledger_balance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.leave_type} {self.year}: {self.entry_type} {self.days}"
+
+class LeaveBalance(models.Model):
+    """Running totals of LeaveLedgerEntry per employee, type and year"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPES)
+    year = models.PositiveSmallIntegerField()
+    entitled_days = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    used_days = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-year', 'leave_type']
+        unique_together = ['employee', 'leave_type', 'year']
+
+    @property
+    def remaining_days(self):
+        return self.entitled_days - self.used_days
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.leave_type} {self.year}: {self.remaining_days}/{self.entitled_days}"
+
 class InvitedEmployee(models.Model):
     email = models.EmailField()
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='invited_employees')
@@ -111,10 +257,17 @@ class InvitedEmployee(models.Model):
     accepted_date = models.DateTimeField(null=True, blank=True)
     is_expired = models.BooleanField(default=False)
     invitation_token = models.CharField(max_length=100, unique=True)
+    import_job = models.ForeignKey('InvitationImportJob', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='invitations')
 
     class Meta:
         ordering = ['-created_date']
         unique_together = ['email', 'company']
+        indexes = [
+            models.Index(fields=['company', 'is_accepted', '-created_date'], name='invite_company_status_idx'),
+            models.Index(fields=['company', '-created_date'], condition=models.Q(is_accepted=False),
+                         name='invite_pending_idx'),
+        ]
 
     def accept_invitation(self):
         self.is_accepted = True
@@ -123,3 +276,101 @@ class InvitedEmployee(models.Model):
 
     def __str__(self):
         return f"Invitation to {self.email} (Accepted: {self.is_accepted})"
+
+class InvitationImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='invitation_import_jobs')
+    created_by = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='invitation_import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    invited_count = models.PositiveIntegerField(default=0)
+    skipped = models.JSONField(default=list, blank=True)
+    emails_sent = models.PositiveIntegerField(default=0)
+    emails_failed = models.PositiveIntegerField(default=0)
+    # Highest invitation id already dispatched, so an interrupted job resumes where it stopped
+    last_invitation_id = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Invitation import #{self.pk} for {self.company.name} ({self.status})"
+
+class EmailOutbox(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    to_email = models.EmailField()
+    to_name = models.CharField(max_length=200, blank=True)
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            # Worker claims due messages in next_attempt_at order
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='Pending'),
+                         name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class SlowQueryFingerprint(models.Model):
+    """Totals per normalized query that went over SLOW_QUERY_THRESHOLD_MS (see query_log.py)"""
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_view = models.CharField(max_length=200, blank=True)
+    last_frame = models.CharField(max_length=300, blank=True)
+    plan = models.TextField(blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_ms']
+
+    def __str__(self):
+        return f"{self.fingerprint}: {self.calls} calls, {self.total_ms:.0f} ms"
+
+
+class RevokedToken(models.Model):
+    """A JWT that must no longer authenticate, until it expires (see token_revocation.py)"""
+    jti = models.CharField(max_length=64, unique=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='revoked_tokens')
+    token_type = models.CharField(max_length=10)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Purging expired rows
+            models.Index(fields=['expires_at'], name='revoked_token_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token_type} {self.jti} (employee {self.employee_id})"
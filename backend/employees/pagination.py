@@ -0,0 +1,141 @@
+"""
+Pagination for list endpoints
+
+Page-number pagination stays the default (it is what the frontend uses), with
+a client-selectable ?page_size= capped at MAX_PAGE_SIZE. Clients can opt in to
+keyset pagination with ?pagination=cursor: pages are then fetched with a
+WHERE on the ordering columns (plus an id tiebreaker) instead of COUNT(*) +
+OFFSET, so deep pages cost the same as the first one.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+MAX_PAGE_SIZE = getattr(settings, 'MAX_PAGE_SIZE', 100)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a unique ordering
+
+    The ordering must end with a unique column (the id tiebreaker); the cursor
+    is the ordering values of the last row on the page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        self.ordering = tuple(ordering) if ordering else ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        model = queryset.model
+        fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            values = self.decode_cursor(encoded, fields)
+            queryset = queryset.filter(self.after(values))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_position = None
+        if self.has_next and self.page:
+            last = self.page[-1]
+            self.next_position = [field.value_to_string(last) for field in fields]
+        return self.page
+
+    def after(self, values):
+        """WHERE clause selecting rows strictly after the cursor in self.ordering"""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            branch = Q(**{f'{field}__{lookup}': values[index]})
+            for prev_index in range(index):
+                branch &= Q(**{self.ordering[prev_index].lstrip('-'): values[prev_index]})
+            condition |= branch
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def decode_cursor(self, encoded, fields):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(force_str(encoded).encode()))
+            if not isinstance(position, list) or len(position) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, position)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Page-number pagination with ?page_size=, or keyset pagination when the
+    client sends ?pagination=cursor (or follows a ?cursor= link)
+
+    The keyset ordering comes from the view's keyset_ordering attribute, or
+    the ordering passed to the constructor for function-based views.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def __init__(self, ordering=None):
+        self.ordering = ordering
+        self.keyset = None
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get('pagination') == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.ordering or getattr(view, 'keyset_ordering', None)
+        if ordering and self.wants_keyset(request):
+            self.keyset = KeysetPagination(ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
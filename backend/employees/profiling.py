@@ -0,0 +1,321 @@
+"""
+Per-endpoint request profiling
+
+ProfilingMiddleware (off unless PROFILING_ENABLED=True) records, for every
+request and keyed by the resolved URL name and method:
+
+- wall time
+- DB query count and time, from an execute wrapper on the connection (it is
+  installed on every connection as it is created, so the async ORM's worker
+  threads are covered too)
+- time spent in DRF serializers (BaseSerializer.data is wrapped once)
+- response size in bytes
+
+Values go into fixed-bucket histograms held in this process, rendered in
+Prometheus text format by render_prometheus() for /api/internal/metrics/.
+Each worker process has its own numbers.
+
+For successful GET responses that carry a list (a page of results, a
+company grid) the (rows, queries) pair is also sampled. Once an endpoint has
+PROFILING_GROWTH_MIN_SAMPLES samples over at least GROWTH_MIN_SIZES distinct
+row counts, it is flagged while its least-squares slope exceeds
+PROFILING_GROWTH_THRESHOLD queries per row, which is how an N+1 shows up in
+production traffic. The flag clears again once the slope drops back.
+"""
+import contextvars
+import copy
+import logging
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from .response_cache import stats as response_cache_stats
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (metric suffix, help text, buckets, RequestProfile attribute)
+HISTOGRAMS = (
+    ('request_duration_seconds', 'Wall time per request', SECONDS_BUCKETS, 'duration'),
+    ('request_queries', 'Database queries per request', QUERY_BUCKETS, 'queries'),
+    ('request_db_seconds', 'Database time per request', SECONDS_BUCKETS, 'db_time'),
+    ('request_serializer_seconds', 'DRF serializer time per request', SECONDS_BUCKETS, 'serializer_time'),
+    ('response_bytes', 'Response body size', BYTES_BUCKETS, 'response_bytes'),
+)
+
+# Distinct row counts needed before a slope is fitted
+GROWTH_MIN_SIZES = 3
+
+# Method label values; anything else is counted as 'other' so a client cannot
+# create new series by sending made-up methods
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+current_profile = contextvars.ContextVar('hrms_request_profile', default=None)
+
+
+class RequestProfile:
+    """Counters for the request being served"""
+    __slots__ = ('request', 'queries', 'db_time', 'serializer_time', 'in_serializer', 'duration', 'response_bytes')
+
+    def __init__(self, request=None):
+        self.request = request
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.in_serializer = False
+        self.duration = 0.0
+        self.response_bytes = None
+
+
+def current_route():
+    """URL name of the view serving the current request, or None"""
+    profile = current_profile.get()
+    match = getattr(profile and profile.request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def profile_queries(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's profile"""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_time += time.perf_counter() - started
+
+
+def install_query_wrapper(connection, **kwargs):
+    if profile_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_queries)
+
+
+def install_serializer_timer():
+    """Time BaseSerializer.data, which every DRF serializer's .data goes through"""
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data.fget
+    if getattr(original, 'profiled', False):
+        return
+
+    def data(self):
+        profile = current_profile.get()
+        # Nested serializers run inside the outer one's time
+        if profile is None or profile.in_serializer:
+            return original(self)
+        profile.in_serializer = True
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile.in_serializer = False
+
+    data.profiled = True
+    BaseSerializer.data = property(data)
+
+
+def result_size(response):
+    """Rows in a DRF response: a list body, `results`, or its longest list field"""
+    data = getattr(response, 'data', None)
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        if isinstance(data.get('results'), list):
+            return len(data['results'])
+        sizes = [len(value) for value in data.values() if isinstance(value, list)]
+        if sizes:
+            return max(sizes)
+    return None
+
+
+class Histogram:
+    """Cumulative-bucket histogram in Prometheus' layout"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class EndpointMetrics:
+    def __init__(self, samples, min_samples):
+        self.histograms = {name: Histogram(buckets) for name, _, buckets, _ in HISTOGRAMS}
+        self.statuses = {}
+        # (rows, queries) pairs for the growth check
+        self.growth_samples = deque(maxlen=samples)
+        self.min_samples = min_samples
+        self.flagged = False
+
+    def query_growth(self):
+        """
+        Least-squares slope of queries over rows
+
+        Returns:
+            float or None: None until there are min_samples samples over
+            GROWTH_MIN_SIZES distinct row counts
+        """
+        samples = list(self.growth_samples)
+        if len(samples) < self.min_samples or len({rows for rows, _ in samples}) < GROWTH_MIN_SIZES:
+            return None
+        mean_rows = sum(rows for rows, _ in samples) / len(samples)
+        mean_queries = sum(queries for _, queries in samples) / len(samples)
+        covariance = sum((rows - mean_rows) * (queries - mean_queries) for rows, queries in samples)
+        variance = sum((rows - mean_rows) ** 2 for rows, _ in samples)
+        return covariance / variance
+
+
+class MetricsRegistry:
+    """Thread-safe metrics per (route, method)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, route, method, status_code, profile, rows=None):
+        samples = getattr(settings, 'PROFILING_GROWTH_SAMPLES', 200)
+        min_samples = getattr(settings, 'PROFILING_GROWTH_MIN_SAMPLES', 20)
+        threshold = getattr(settings, 'PROFILING_GROWTH_THRESHOLD', 0.5)
+        if method not in METHODS:
+            method = 'other'
+        with self._lock:
+            metrics = self._endpoints.get((route, method))
+            if metrics is None:
+                metrics = self._endpoints[(route, method)] = EndpointMetrics(samples, min_samples)
+            for name, _, _, attribute in HISTOGRAMS:
+                value = getattr(profile, attribute)
+                if value is not None:
+                    metrics.histograms[name].observe(value)
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+            # Writes change what they touch per row by design; only reads are fitted
+            if rows is None or status_code != 200 or method != 'GET':
+                return
+            metrics.growth_samples.append((rows, profile.queries))
+            slope = metrics.query_growth()
+            was_flagged = metrics.flagged
+            metrics.flagged = slope is not None and slope > threshold
+            newly_flagged = metrics.flagged and not was_flagged
+        if newly_flagged:
+            logger.warning('%s %s: query count grows with result size (%.2f queries per row)',
+                           method, route, slope)
+
+    def snapshot(self):
+        """{(route, method): EndpointMetrics}; copies, safe to read without the lock"""
+        with self._lock:
+            return copy.deepcopy(self._endpoints)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def render_prometheus():
+    """All metrics of this process in Prometheus text exposition format"""
+    endpoints = sorted(registry.snapshot().items())
+    lines = []
+
+    lines += ['# HELP hrms_requests_total Requests served', '# TYPE hrms_requests_total counter']
+    for (route, method), metrics in endpoints:
+        for status_code, count in sorted(metrics.statuses.items()):
+            lines.append(f'hrms_requests_total{{{_labels(route=route, method=method, status=status_code)}}} {count}')
+
+    for name, help_text, buckets, _ in HISTOGRAMS:
+        lines += [f'# HELP hrms_{name} {help_text}', f'# TYPE hrms_{name} histogram']
+        for (route, method), metrics in endpoints:
+            histogram = metrics.histograms[name]
+            labels = _labels(route=route, method=method)
+            for bound, count in zip(buckets, histogram.counts):
+                lines.append(f'hrms_{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'hrms_{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'hrms_{name}_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'hrms_{name}_count{{{labels}}} {histogram.count}')
+
+    lines += ['# HELP hrms_query_growth_per_row Slope of queries over result rows',
+              '# TYPE hrms_query_growth_per_row gauge']
+    flags = []
+    for (route, method), metrics in endpoints:
+        slope = metrics.query_growth()
+        if slope is not None:
+            labels = _labels(route=route, method=method)
+            lines.append(f'hrms_query_growth_per_row{{{labels}}} {slope:.4f}')
+            flags.append(f'hrms_query_growth_flagged{{{labels}}} {int(metrics.flagged)}')
+    lines += ['# HELP hrms_query_growth_flagged 1 if query count grows with result size',
+              '# TYPE hrms_query_growth_flagged gauge'] + flags
+
+    for field, count in response_cache_stats.snapshot().items():
+        lines += [f'# TYPE hrms_response_cache_{field}_total counter', f'hrms_response_cache_{field}_total {count}']
+    return '\n'.join(lines) + '\n'
+
+
+class ProfilingMiddleware:
+    """Record per-endpoint timings; enabled with PROFILING_ENABLED=True"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_serializer_timer()
+        connection_created.connect(install_query_wrapper, dispatch_uid='hrms_profile_queries')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile(request)
+        # This thread's connection may predate the middleware
+        install_query_wrapper(connection)
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self._record(request, response, profile, started)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile(request)
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self._record(request, response, profile, started)
+        return response
+
+    def _record(self, request, response, profile, started):
+        profile.duration = time.perf_counter() - started
+        if not response.streaming:
+            profile.response_bytes = len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unresolved'
+        registry.record(route, request.method, response.status_code, profile, result_size(response))
@@ -0,0 +1,241 @@
+"""
+Slow-query log
+When SLOW_QUERY_LOG_ENABLED is set, an execute wrapper, installed on every
+connection as it is created, times each query. Queries over SLOW_QUERY_THRESHOLD_MS are:
+
+- logged (logger `employees.query_log`), including queries that raise such
+  as statement timeouts, with the URL name of the view that ran them (with
+  PROFILING_ENABLED) and the innermost project stack frame, e.g.
+  `employees/views.py:612 in get_queryset`
+- explained on a sample (SLOW_QUERY_EXPLAIN_RATE): EXPLAIN (ANALYZE, BUFFERS)
+  on PostgreSQL, EXPLAIN QUERY PLAN on SQLite. Only SELECTs are explained,
+  since ANALYZE runs the statement again.
+- added to a per-process table keyed by fingerprint, the SQL with literals,
+  placeholders and IN/VALUES lists collapsed, so the same query with other
+  parameters is counted together
+
+The table is merged into SlowQueryFingerprint at most every
+SLOW_QUERY_FLUSH_INTERVAL seconds after a request finishes, keeping the
+SLOW_QUERY_TOP_N fingerprints with the most total time;
+`manage.py slow_queries` prints it. Parameters are never stored, only the
+normalized SQL. Recording and flushing never raise: a failure is logged and
+the query's own result or exception reaches the caller unchanged.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .profiling import current_route
+
+logger = logging.getLogger(__name__)
+
+# Queries run by this module (EXPLAIN, flushing) aren't timed themselves
+_suspended = contextvars.ContextVar('hrms_query_log_suspended', default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\((?:\?, )*\?\))(?:, \1)+')
+_WHITESPACE = re.compile(r'\s+')
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def normalize_sql(sql):
+    """SQL with literals and placeholders as ?, IN lists and repeated VALUES rows collapsed"""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _STRING.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _VALUES_ROWS.sub(r'\1, ...', sql)
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def project_frame():
+    """The innermost stack frame in this project's code, as 'path:line in function'"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (filename.startswith(base_dir) and filename != _THIS_FILE
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+def explain(connection, sql, params):
+    """
+    Query plan for a SELECT, run in a savepoint so a failure can't break the
+    caller's transaction
+
+    Returns:
+        str: plan text, or '' if the database couldn't explain it
+    """
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    token = _suspended.set(True)
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as e:
+        logger.debug('EXPLAIN failed: %s', e)
+        return ''
+    finally:
+        _suspended.reset(token)
+
+
+class SlowQueryTable:
+    """Slow queries seen by this process since the last flush, by fingerprint"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, key, sql, elapsed_ms, view, frame, plan, limit):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= limit:
+                    # Make room by dropping the entry with the least total time
+                    smallest = min(self._entries, key=lambda k: self._entries[k]['total_ms'])
+                    del self._entries[smallest]
+                entry = self._entries[key] = {'sql': sql, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'plan': ''}
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['view'] = view
+            entry['frame'] = frame
+            if plan:
+                entry['plan'] = plan
+
+    def drain(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        return entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+slow_queries = SlowQueryTable()
+_last_flush = time.monotonic()
+
+
+def record_slow_query(connection, sql, params, many, elapsed_ms, failed=False):
+    normalized = normalize_sql(sql)
+    view = current_route() or ''
+    frame = project_frame()
+    plan = ''
+    rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 0)
+    # A failed query may have aborted the transaction, so it isn't explained
+    if (not many and not failed and rate and random.random() < rate
+            and sql.lstrip()[:6].upper() == 'SELECT'):
+        plan = explain(connection, sql, params)
+    slow_queries.add(
+        fingerprint(normalized), normalized, elapsed_ms, view, frame, plan,
+        getattr(settings, 'SLOW_QUERY_TOP_N', 50)
+    )
+    logger.warning('%s (%.0f ms) in %s at %s: %s%s', 'Failed slow query' if failed else 'Slow query',
+                   elapsed_ms, view or '-', frame or '-', normalized[:2000], f'\n{plan}' if plan else '')
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper recording queries over SLOW_QUERY_THRESHOLD_MS"""
+    if _suspended.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = execute(sql, params, many, context)
+        failed = False
+        return result
+    finally:
+        # Queries that fail (statement timeouts, lock waits) are often the slowest
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            # Raising here would replace the query's result, or its own exception
+            try:
+                record_slow_query(context['connection'], sql, params, many, elapsed_ms, failed)
+            except Exception:
+                logger.exception('Could not record a slow query')
+
+
+def install_slow_query_log(connection):
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def flush_slow_queries():
+    """
+    Merge this process's slow queries into SlowQueryFingerprint and drop all
+    but the SLOW_QUERY_TOP_N fingerprints with the most total time
+
+    Returns:
+        int: fingerprints written
+    """
+    from .models import SlowQueryFingerprint
+
+    global _last_flush
+    _last_flush = time.monotonic()
+    entries = slow_queries.drain()
+    if not entries:
+        return 0
+
+    token = _suspended.set(True)
+    try:
+        now = timezone.now()
+        with transaction.atomic():
+            SlowQueryFingerprint.objects.bulk_create(
+                [SlowQueryFingerprint(fingerprint=key, sql=entry['sql']) for key, entry in entries.items()],
+                ignore_conflicts=True
+            )
+            for key, entry in entries.items():
+                changes = {
+                    'calls': F('calls') + entry['calls'],
+                    'total_ms': F('total_ms') + entry['total_ms'],
+                    'max_ms': Greatest('max_ms', Value(entry['max_ms'])),
+                    'last_view': entry['view'][:200],
+                    'last_frame': entry['frame'][:300],
+                    'last_seen': now,
+                }
+                if entry['plan']:
+                    changes['plan'] = entry['plan']
+                SlowQueryFingerprint.objects.filter(fingerprint=key).update(**changes)
+
+            keep = list(SlowQueryFingerprint.objects.order_by('-total_ms').values_list('pk', flat=True)[
+                :getattr(settings, 'SLOW_QUERY_TOP_N', 50)
+            ])
+            SlowQueryFingerprint.objects.exclude(pk__in=keep).delete()
+    except Exception:
+        # Runs from request_finished, after the response is built; never fail it
+        logger.exception('Could not save %d slow query fingerprints', len(entries))
+        return 0
+    finally:
+        _suspended.reset(token)
+    return len(entries)
+
+
+def flush_if_due():
+    """Flush when SLOW_QUERY_FLUSH_INTERVAL has passed since the last flush"""
+    if len(slow_queries) and time.monotonic() - _last_flush >= getattr(settings, 'SLOW_QUERY_FLUSH_INTERVAL', 60):
+        flush_slow_queries()
@@ -0,0 +1,83 @@
+"""
+Response cache for company-scoped read endpoints
+
+Responses are stored in the Django cache named by RESPONSE_CACHE_ALIAS under
+a key built from the company, the endpoint, the request's query parameters
+and the company's data versions (see data_versions). A write bumps the
+version of the resource it touches, so only that company's entries for
+endpoints reading that resource stop matching; stale entries are never
+served and age out through the backend's TTL and culling.
+
+Hit, miss, store and eviction counters are kept per process in `stats`.
+Evictions are counted by the backends in cache_backends; other backends
+work but report none.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+class ResponseCacheStats:
+    """Thread-safe counters for the response cache"""
+    FIELDS = ('hits', 'misses', 'stores', 'evictions')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+
+stats = ResponseCacheStats()
+
+
+def cache_enabled():
+    return getattr(settings, 'RESPONSE_CACHE_TTL', 0) > 0
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def cache_key(company_id, endpoint, token):
+    return f'response:{company_id}:{endpoint}:{token}'
+
+
+def cached_response(key, build):
+    """
+    Serve a response from the cache, or build and store it
+
+    Only 200 responses are stored, as their data; the cached copy is
+    re-rendered for each request so content negotiation still applies.
+
+    Args:
+        key: cache key from cache_key()
+        build: callable returning the full response
+
+    Returns:
+        Response: the cached or freshly built response
+    """
+    cache = get_response_cache()
+    data = cache.get(key)
+    if data is not None:
+        stats.incr('hits')
+        return Response(data)
+
+    stats.incr('misses')
+    response = build()
+    if response.status_code == 200 and getattr(response, 'data', None) is not None:
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+        stats.incr('stores')
+    return response
@@ -1,8 +1,31 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from django.conf import settings
 from django.contrib.auth.hashers import make_password, check_password
-from .models import Company, Employee, Attendance, Leave, InvitedEmployee
+from django.db import transaction
+from django.utils import timezone
+from .models import Company, Employee, Attendance, Leave, InvitedEmployee, InvitationImportJob
+from .id_allocation import next_employee_id
+from .authentication import EmployeeRefreshToken
+from .token_revocation import revocations, revoke_token
 import secrets
 
+class EagerLoadingMixin:
+    """Declares the relations a serializer reads so list querysets can join them up front"""
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
 class CompanyRegistrationSerializer(serializers.Serializer):
     company_name = serializers.CharField(max_length=200)
     full_name = serializers.CharField(max_length=200)
@@ -11,15 +34,13 @@ class CompanyRegistrationSerializer(serializers.Serializer):
     department = serializers.CharField(max_length=100)
     phone = serializers.CharField(max_length=20, required=False, allow_blank=True)
 
+    @transaction.atomic
     def create(self, validated_data):
         company_name = validated_data.pop('company_name')
         company = Company.objects.create(name=company_name)
         
         # Auto-generate employee ID
-        employee_count = Employee.objects.filter(company=company).count()
-        employee_id = f"EMP{str(employee_count + 1).zfill(4)}"
-        
-        validated_data['employee_id'] = employee_id
+        validated_data['employee_id'] = next_employee_id(company)
         validated_data['password'] = make_password(validated_data['password'])
         validated_data['is_admin'] = True
         employee = Employee.objects.create(company=company, **validated_data)
@@ -44,12 +65,12 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'password': {'write_only': True, 'required': False}
         }
     
+    @transaction.atomic
     def create(self, validated_data):
         company = self.context['request'].employee.company
         
         # Auto-generate employee ID
-        employee_count = Employee.objects.filter(company=company).count()
-        validated_data['employee_id'] = f"EMP{str(employee_count + 1).zfill(4)}"
+        validated_data['employee_id'] = next_employee_id(company)
         
         if 'password' in validated_data:
             validated_data['password'] = make_password(validated_data['password'])
@@ -64,7 +85,8 @@ class EmployeeSerializer(serializers.ModelSerializer):
             validated_data.pop('password')
         return super().update(instance, validated_data)
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('employee',)
     employee_name = serializers.CharField(source='employee.full_name', read_only=True)
     employee_id = serializers.CharField(source='employee.employee_id', read_only=True)
 
@@ -88,7 +110,16 @@ class AttendanceSerializer(serializers.ModelSerializer):
         
         return data
 
-class LeaveSerializer(serializers.ModelSerializer):
+class BulkAttendanceSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    records = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'ATTENDANCE_BULK_MAX_ROWS', 10000)
+    )
+
+class LeaveSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('employee',)
     employee_name = serializers.CharField(source='employee.full_name', read_only=True)
     employee_id = serializers.CharField(source='employee.employee_id', read_only=True)
 
@@ -97,7 +128,8 @@ class LeaveSerializer(serializers.ModelSerializer):
         fields = ['id', 'employee', 'employee_id', 'employee_name', 'leave_type', 'start_date', 'end_date', 'reason', 'status', 'created_at']
         read_only_fields = ['id', 'created_at', 'employee_name', 'employee_id']
 
-class InvitedEmployeeSerializer(serializers.ModelSerializer):
+class InvitedEmployeeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('invited_by', 'company')
     invited_by_name = serializers.CharField(source='invited_by.full_name', read_only=True)
     company_name = serializers.CharField(source='company.name', read_only=True)
 
@@ -112,3 +144,54 @@ class InvitedEmployeeSerializer(serializers.ModelSerializer):
         # Generate unique invitation token
         validated_data['invitation_token'] = secrets.token_urlsafe(32)
         return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        # Re-inviting reissues an expired invitation in place, since email and
+        # company are unique together: new token, and its age starts over
+        validated_data['invitation_token'] = secrets.token_urlsafe(32)
+        validated_data['created_date'] = timezone.now()
+        validated_data['is_expired'] = False
+        return super().update(instance, validated_data)
+
+class InvitationImportJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = InvitationImportJob
+        fields = ['id', 'status', 'total_rows', 'invited_count', 'skipped', 'emails_sent',
+                  'emails_failed', 'error', 'created_at', 'finished_at']
+        read_only_fields = fields
+
+
+class EmployeeTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Exchanges a refresh token for a new access token
+
+    Unlike simplejwt's serializer this resolves the token's employee rather
+    than a Django user and refuses revoked tokens. With ROTATE_REFRESH_TOKENS
+    the posted token is revoked and a new one returned, so each refresh token
+    can be used once.
+    """
+    token_class = EmployeeRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh.get(api_settings.JTI_CLAIM)
+        if jti and revocations.is_revoked(jti):
+            raise TokenError('Token is revoked')
+
+        employee_id = Employee.objects.filter(
+            pk=refresh.get(api_settings.USER_ID_CLAIM)
+        ).values_list('pk', flat=True).first()
+        if employee_id is None:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # Only one of two concurrent refreshes with the same token gets to revoke it
+            if not revoke_token(refresh, employee_id):
+                raise TokenError('Token is revoked')
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
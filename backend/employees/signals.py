@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Employee, Attendance, Leave, InvitedEmployee
+from .authentication import auth_versions, employee_cache
+from .attendance_service import refresh_monthly_summaries
+from .data_versions import EMPLOYEES, ATTENDANCE, LEAVES, INVITATIONS, bump_version
+from .leave_ledger import grant_annual_entitlements, sync_leave_usage
+from .maintenance import start_scheduler
+from .query_log import flush_if_due, install_slow_query_log
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_employee_auth_cache(sender, instance, **kwargs):
+    """Drop cached auth snapshots so the next request reloads the employee"""
+    if employee_cache.enabled:
+        employee_cache.invalidate_employee(instance.pk)
+
+
+@receiver(pre_save, sender=Employee)
+def bump_auth_version(sender, instance, raw=False, **kwargs):
+    """Tokens carry company_id and is_admin; changing either makes their claims stale"""
+    loaded = getattr(instance, '_loaded_auth_claims', None)
+    if not raw and loaded is not None and loaded != (instance.company_id, instance.is_admin):
+        instance.auth_version += 1
+
+
+@receiver(post_save, sender=Employee)
+def publish_auth_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._loaded_auth_claims = (instance.company_id, instance.is_admin)
+    auth_versions.set(instance.pk, instance.auth_version)
+
+
+@receiver(post_delete, sender=Employee)
+def forget_auth_version(sender, instance, **kwargs):
+    auth_versions.delete(instance.pk)
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_summary_on_save(sender, instance, raw=False, **kwargs):
+    """Keep MonthlyAttendanceSummary in step with single-row writes"""
+    if raw:
+        return
+    refresh_monthly_summaries([instance.employee_id], instance.date.year, instance.date.month)
+    previous = getattr(instance, '_loaded_date', None)
+    if previous and (previous.year, previous.month) != (instance.date.year, instance.date.month):
+        refresh_monthly_summaries([instance.employee_id], previous.year, previous.month)
+    instance._loaded_date = instance.date
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    refresh_monthly_summaries([instance.employee_id], instance.date.year, instance.date.month, create=False)
+
+
+@receiver(post_save, sender=Leave)
+def post_leave_usage_on_save(sender, instance, raw=False, **kwargs):
+    """Keep the leave ledger in step with approvals and edits of approved leaves"""
+    if raw:
+        return
+    if instance.status == 'Approved' or getattr(instance, '_loaded_status', None) == 'Approved':
+        sync_leave_usage(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Leave)
+def reverse_leave_usage_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the employee or company cascades here too; their ledger goes with them
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Leave:
+        sync_leave_usage(instance, deleted=True)
+
+
+@receiver(post_save, sender=Employee)
+def grant_new_employee_leave(sender, instance, created=False, raw=False, **kwargs):
+    """New employees start with this year's entitlements"""
+    if created and not raw:
+        grant_annual_entitlements(timezone.localdate().year, Employee.objects.filter(pk=instance.pk))
+
+
+def _employee_company_id(instance):
+    """Company of the employee an Attendance/Leave row belongs to"""
+    if type(instance).employee.is_cached(instance):
+        return instance.employee.company_id
+    return Employee.objects.filter(pk=instance.employee_id).values_list('company_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def bump_employees_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(instance.company_id, EMPLOYEES)
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def bump_attendance_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(_employee_company_id(instance), ATTENDANCE)
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def bump_leaves_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(_employee_company_id(instance), LEAVES)
+
+
+@receiver([post_save, post_delete], sender=InvitedEmployee)
+def bump_invitations_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(instance.company_id, INVITATIONS)
+
+
+@receiver(request_started)
+def start_maintenance_scheduler(sender, **kwargs):
+    """Start the MAINTENANCE_INTERVAL thread in serving processes only, not in manage.py commands"""
+    start_scheduler()
+
+
+@receiver(connection_created)
+def attach_slow_query_log(sender, connection, **kwargs):
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        install_slow_query_log(connection)
+
+
+@receiver(request_finished)
+def flush_slow_query_log(sender, **kwargs):
+    """Save this process's slow queries every SLOW_QUERY_FLUSH_INTERVAL seconds"""
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        flush_if_due()
@@ -0,0 +1,341 @@
+"""
+Tests for the employees app.
+
+Run with a local database; the test runner creates and drops its own test
+database on the server DATABASE_URL points at:
+    DATABASE_URL=sqlite:///test.sqlite3 python manage.py test employees
+"""
+import json
+from datetime import date, timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import DatabaseError, connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import async_views
+from .authentication import EmployeeRefreshToken, EmployeeUserWrapper
+from .models import Company, Employee, Attendance, Leave, InvitedEmployee, PasswordResetOTP
+from . import query_log
+from .profiling import MetricsRegistry, RequestProfile
+from .throttling import check_rate, store
+from .token_revocation import revocations
+
+# (label, url template); {pk} is replaced with the seeded admin's primary key
+ENDPOINTS = [
+    ('employee list', '/api/employees/'),
+    ('attendance list', '/api/attendance/'),
+    ('leave list', '/api/leaves/'),
+    ('invitation list', '/api/invitations/list/'),
+    ('employee attendance', '/api/employees/{pk}/attendance/'),
+    ('employee leaves', '/api/employees/{pk}/leaves/'),
+    ('company attendance', '/api/attendance/my-attendance/?month=1&year=2026'),
+    ('leave balances', '/api/leaves/balances/?year=2026'),
+]
+# Read-only views that also read the employee's own fields, checked on the fast path too
+FAST_PATH_ENDPOINTS = ENDPOINTS + [
+    ('profile', '/api/employees/profile/'),
+]
+# (rows per table, ?page_size=) combinations: a page smaller than, and one larger
+# than, the data set, for a small and a large data set
+SHAPES = [(2, 5), (2, 50), (30, 5), (30, 50)]
+
+
+# Version bumps only land on commit, so cached responses would mask the seeded rows.
+# The revocation filter is loaded in setUp and not refreshed: that query is periodic,
+# not per request.
+@override_settings(RESPONSE_CACHE_TTL=0, THROTTLE_ENABLED=False,
+                   TOKEN_REVOCATION_REFRESH_INTERVAL=float('inf'))
+class QueryCountTests(TestCase):
+    """List endpoints run a fixed number of queries whatever the row count or page size."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Query Count Check')
+        self.admin = Employee.objects.create(
+            company=self.company, employee_id='QC0000', full_name='Query Admin',
+            email='qc-admin@example.com', password='!', department='QA', is_admin=True
+        )
+        token = str(EmployeeRefreshToken.for_user(EmployeeUserWrapper(self.admin)).access_token)
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.seeded = 0
+        revocations.refresh(full=True)
+
+    def seed(self, rows):
+        """Top every table up to ``rows`` rows for the company."""
+        start, stop = self.seeded, rows
+        employees = Employee.objects.bulk_create([
+            Employee(company=self.company, employee_id=f'QC{i:04d}', full_name=f'Employee {i}',
+                     email=f'qc-{i}@example.com', password='!', department='QA')
+            for i in range(start + 1, stop + 1)
+        ])
+        Attendance.objects.bulk_create(
+            [Attendance(employee=emp, date=date(2026, 1, 1), status='Present') for emp in employees] +
+            [Attendance(employee=self.admin, date=date(2026, 1, 1) + timedelta(days=i), status='Present')
+             for i in range(start, stop)]
+        )
+        Leave.objects.bulk_create(
+            [Leave(employee=emp, leave_type='Casual', start_date=date(2026, 2, 1),
+                   end_date=date(2026, 2, 2), reason='Check') for emp in employees] +
+            [Leave(employee=self.admin, leave_type='Sick', start_date=date(2026, 3, 1) + timedelta(days=i),
+                   end_date=date(2026, 3, 1) + timedelta(days=i), reason='Check') for i in range(start, stop)]
+        )
+        InvitedEmployee.objects.bulk_create([
+            InvitedEmployee(email=f'qc-invite-{i}@example.com', company=self.company, invited_by=self.admin,
+                            invitation_token=f'qc-invite-token-{i}')
+            for i in range(start, stop)
+        ])
+        self.seeded = max(self.seeded, rows)
+
+    def url(self, template, page_size=None):
+        url = template.format(pk=self.admin.pk)
+        if page_size is None:
+            return url
+        return f"{url}{'&' if '?' in url else '?'}page_size={page_size}"
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_rows_or_page_size(self):
+        expected = {}
+        for rows, page_size in SHAPES:
+            self.seed(rows)
+            for label, template in ENDPOINTS:
+                url = self.url(template, page_size)
+                with self.subTest(endpoint=label, rows=rows, page_size=page_size):
+                    if label not in expected:
+                        expected[label] = self.count_queries(url)
+                        continue
+                    with self.assertNumQueries(expected[label]):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_claims_fast_path_never_adds_queries(self):
+        self.seed(5)
+        loaded = {label: self.count_queries(self.url(template)) for label, template in FAST_PATH_ENDPOINTS}
+        with override_settings(JWT_CLAIMS_FAST_PATH=True):
+            # The first request caches the employee's auth_version
+            self.client.get(self.url(FAST_PATH_ENDPOINTS[0][1]))
+            for label, template in FAST_PATH_ENDPOINTS:
+                with self.subTest(endpoint=label):
+                    self.assertLessEqual(self.count_queries(self.url(template)), loaded[label])
+
+
+@override_settings(THROTTLE_ENABLED=False, EMAIL_OUTBOX_ENABLED=True)
+class PasswordResetTests(TestCase):
+    """Password reset for an email with accounts in several companies."""
+
+    EMAIL = 'password-reset-check@example.com'
+    OLD_PASSWORD = 'old-password'
+    NEW_PASSWORD = 'new-password'
+
+    def setUp(self):
+        self.first, self.second = [
+            Employee.objects.create(
+                company=Company.objects.create(name=f'Password Reset Check {i}'), employee_id=f'PR{i:04d}',
+                full_name='Reset Check', email=self.EMAIL, password=make_password(self.OLD_PASSWORD),
+                department='QA'
+            )
+            for i in (1, 2)
+        ]
+
+    def post(self, url, body, expected=200):
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, expected, response.content[:200])
+        return response
+
+    def otps(self, employee):
+        return list(PasswordResetOTP.objects.filter(employee=employee).values_list('otp', flat=True))
+
+    def test_every_account_gets_its_own_code(self):
+        self.post('/api/auth/forgot-password/', {'email': self.EMAIL})
+        first_otps, second_otps = self.otps(self.first), self.otps(self.second)
+        self.assertEqual(len(first_otps), 1)
+        self.assertEqual(len(second_otps), 1)
+        self.assertNotEqual(first_otps, second_otps)
+
+    def test_code_resets_its_own_account_only(self):
+        self.post('/api/auth/forgot-password/', {'email': self.EMAIL})
+        body = {'email': self.EMAIL, 'otp': self.otps(self.second)[0]}
+        self.post('/api/auth/verify-otp/', body)
+        self.post('/api/auth/reset-password/', {**body, 'new_password': self.NEW_PASSWORD})
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertTrue(check_password(self.NEW_PASSWORD, self.second.password))
+        self.assertTrue(check_password(self.OLD_PASSWORD, self.first.password))
+
+    def test_code_is_bound_to_its_company(self):
+        self.post('/api/auth/forgot-password/', {'email': self.EMAIL})
+        self.post('/api/auth/verify-otp/',
+                  {'email': self.EMAIL, 'otp': self.otps(self.first)[0], 'company': self.second.company_id},
+                  expected=400)
+
+    def test_naming_the_company_sends_one_code(self):
+        self.post('/api/auth/forgot-password/', {'email': self.EMAIL, 'company': self.first.company_id})
+        self.assertEqual(len(self.otps(self.first)), 1)
+        self.assertEqual(len(self.otps(self.second)), 0)
+
+    def test_async_forgot_password_sends_one_code_per_account(self):
+        request = RequestFactory().post(
+            '/api/auth/forgot-password/', json.dumps({'email': self.EMAIL}), content_type='application/json'
+        )
+        response = async_to_sync(async_views.forgot_password)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.otps(self.first)), 1)
+        self.assertEqual(len(self.otps(self.second)), 1)
+
+
+@override_settings(THROTTLE_RATES={'login': {'ip': '2/m', 'email': '3/m'}})
+class ThrottleTests(TestCase):
+    """Token buckets per IP and per email."""
+
+    EMAIL = 'throttle-check@example.com'
+
+    def setUp(self):
+        store.clear()
+        self.addCleanup(store.clear)
+
+    def check(self, ip):
+        return check_rate(RequestFactory().post('/api/auth/login/', REMOTE_ADDR=ip), 'login', self.EMAIL)
+
+    def test_ip_bucket_rejects(self):
+        self.assertIsNone(self.check('10.0.0.1'))
+        self.assertIsNone(self.check('10.0.0.1'))
+        self.assertIsNotNone(self.check('10.0.0.1'))
+
+    def test_rejected_ip_does_not_charge_the_email_bucket(self):
+        for _ in range(10):
+            self.check('10.0.0.1')
+        # Only the two requests the IP bucket allowed took an email token
+        self.assertIsNone(self.check('10.0.0.2'))
+        self.assertIsNotNone(self.check('10.0.0.2'))
+
+
+@override_settings(PROFILING_GROWTH_SAMPLES=30, PROFILING_GROWTH_MIN_SAMPLES=20, PROFILING_GROWTH_THRESHOLD=0.5)
+class QueryGrowthTests(TestCase):
+    """N+1 detection from sampled (rows, queries) pairs."""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def record(self, rows, queries, method='GET'):
+        profile = RequestProfile()
+        profile.queries = queries
+        self.registry.record('employee-list', method, 200, profile, rows)
+
+    def metrics(self, method='GET'):
+        return self.registry.snapshot()[('employee-list', method)]
+
+    def test_needs_min_samples_over_three_sizes(self):
+        for rows in [1, 10] * 15:
+            self.record(rows, rows)
+        self.assertIsNone(self.metrics().query_growth())
+        with self.assertLogs('employees.profiling', 'WARNING'):
+            for _ in range(19):
+                self.record(5, 5)
+        self.assertIsNotNone(self.metrics().query_growth())
+
+    def test_flag_clears_when_slope_drops(self):
+        with self.assertLogs('employees.profiling', 'WARNING'):
+            for i in range(30):
+                self.record(i % 5, i % 5)
+        self.assertTrue(self.metrics().flagged)
+        for i in range(30):
+            self.record(i % 5, 3)
+        self.assertFalse(self.metrics().flagged)
+
+    def test_only_get_is_sampled(self):
+        for i in range(30):
+            self.record(i % 5, i % 5, method='POST')
+        self.assertEqual(len(self.metrics('POST').growth_samples), 0)
+
+    def test_unknown_methods_share_one_label(self):
+        self.record(1, 1, method='FOO')
+        self.record(1, 1, method='BAR')
+        self.assertEqual(set(self.registry.snapshot()), {('employee-list', 'other')})
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_RATE=0)
+class SlowQueryLogTests(TestCase):
+    """The slow-query wrapper never changes what the query returns or raises."""
+
+    SQL = 'SELECT 1'
+
+    def setUp(self):
+        query_log.slow_queries.drain()
+        self.addCleanup(query_log.slow_queries.drain)
+
+    def run_query(self, execute):
+        return query_log.log_slow_queries(execute, self.SQL, (), False, {'connection': connection})
+
+    def time_out(self, *args):
+        raise DatabaseError('canceling statement due to statement timeout')
+
+    def test_failed_query_is_recorded_and_reraised(self):
+        with self.assertLogs('employees.query_log', 'WARNING') as logs, self.assertRaises(DatabaseError):
+            self.run_query(self.time_out)
+        self.assertIn('Failed slow query', logs.output[0])
+        self.assertEqual(len(query_log.slow_queries), 1)
+
+    def test_recording_error_does_not_mask_the_query_error(self):
+        with mock.patch.object(query_log.slow_queries, 'add', side_effect=RuntimeError), \
+                self.assertLogs('employees.query_log', 'ERROR'), self.assertRaises(DatabaseError):
+            self.run_query(self.time_out)
+
+    def test_recording_error_does_not_fail_the_query(self):
+        with mock.patch.object(query_log.slow_queries, 'add', side_effect=RuntimeError), \
+                self.assertLogs('employees.query_log', 'ERROR'):
+            self.assertEqual(self.run_query(lambda *args: 'rows'), 'rows')
+
+    def test_flush_error_is_logged(self):
+        with self.assertLogs('employees.query_log', 'WARNING'):
+            self.run_query(lambda *args: 'rows')
+        with mock.patch('employees.models.SlowQueryFingerprint.objects.bulk_create', side_effect=RuntimeError), \
+                self.assertLogs('employees.query_log', 'ERROR'):
+            self.assertEqual(query_log.flush_slow_queries(), 0)
+
+
+@override_settings(THROTTLE_ENABLED=False, TOKEN_REVOCATION_REFRESH_INTERVAL=float('inf'))
+class TokenRefreshTests(TestCase):
+    """POST /api/auth/token/refresh/ for employee tokens."""
+
+    URL = '/api/auth/token/refresh/'
+
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            company=Company.objects.create(name='Token Refresh Check'), employee_id='TR0001',
+            full_name='Refresh Check', email='token-refresh@example.com', password='!', department='QA'
+        )
+        self.refresh = EmployeeRefreshToken.for_user(EmployeeUserWrapper(self.employee))
+        revocations.refresh(full=True)
+
+    def post(self, refresh):
+        return self.client.post(self.URL, {'refresh': str(refresh)}, content_type='application/json')
+
+    def test_refresh_returns_working_tokens(self):
+        response = self.post(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], str(self.refresh))
+        profile = self.client.get('/api/employees/profile/',
+                                  HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(self.post(response.data['refresh']).status_code, 200)
+
+    def test_rotated_token_cannot_be_reused(self):
+        self.assertEqual(self.post(self.refresh).status_code, 200)
+        self.assertEqual(self.post(self.refresh).status_code, 401)
+
+    def test_logged_out_refresh_token_is_refused(self):
+        access = str(self.refresh.access_token)
+        response = self.client.post('/api/auth/logout/', {'refresh_token': str(self.refresh)},
+                                    content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post(self.refresh).status_code, 401)
+
+    def test_deleted_employee_is_refused(self):
+        self.employee.delete()
+        self.assertEqual(self.post(self.refresh).status_code, 401)
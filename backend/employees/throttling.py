@@ -0,0 +1,195 @@
+"""
+Token-bucket rate limiting for unauthenticated endpoints
+
+Each scope (login, OTP, ...) has one bucket per client IP and, where the
+request names an account, one per email. A request takes a token from its
+IP bucket and, only if that allows it, from its email bucket, so a flood from
+one address cannot drain the email bucket and lock the account's owner out;
+buckets refill continuously at capacity/period. The check happens
+before the view touches the database or hashes anything, costs a constant
+amount of work, and a rejected request is answered with 429 and Retry-After.
+
+Buckets live in-process by default (THROTTLE_STORE='local'), which limits
+each worker separately. THROTTLE_STORE='cache' keeps them in the Django cache
+named by THROTTLE_CACHE_ALIAS so all workers share one limit; point that
+alias at a database, file or memcached/redis cache to share across hosts.
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+# Default limits per scope: {'ip': rate, 'email': rate}; override with THROTTLE_RATES
+DEFAULT_RATES = {
+    'login': {'ip': '30/m', 'email': '10/m'},
+    'password_reset': {'ip': '10/m', 'email': '5/h'},
+    'otp': {'ip': '20/m', 'email': '10/10m'},
+    'invitation': {'ip': '20/m', 'email': '10/10m'},
+}
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$')
+
+
+def parse_rate(rate):
+    """
+    Parse 'N/period' ('10/m', '5/15m', '100/d') into (capacity, seconds)
+    """
+    match = _RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f'Invalid rate: {rate!r}')
+    capacity, multiplier, unit = match.groups()
+    return int(capacity), int(multiplier or 1) * _PERIODS[unit]
+
+
+def refill(tokens, updated_at, now, capacity, period):
+    """Tokens in a bucket at `now`, given its last recorded state"""
+    return min(capacity, tokens + (now - updated_at) * capacity / period)
+
+
+class LocalBucketStore:
+    """Buckets in a bounded per-process LRU map"""
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated_at, now, capacity, period)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) * period / capacity
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a shared Django cache
+
+    The read-modify-write is not atomic, so concurrent requests for one key
+    can occasionally both take the last token; the limit holds to within the
+    number of workers.
+    """
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, capacity, period):
+        cache = caches[self.alias]
+        now = time.time()
+        tokens, updated_at = cache.get(key) or (capacity, now)
+        tokens = refill(tokens, updated_at, now, capacity, period)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # A bucket left alone for a full period is full again, so it can expire
+        cache.set(key, (tokens, now), math.ceil(period))
+        return allowed, 0 if allowed else (1 - tokens) * period / capacity
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+def _make_store():
+    if getattr(settings, 'THROTTLE_STORE', 'local') == 'cache':
+        return CacheBucketStore(getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default'))
+    return LocalBucketStore(getattr(settings, 'THROTTLE_LOCAL_MAX_KEYS', 100000))
+
+
+store = _make_store()
+
+
+def get_client_ip(request):
+    """Client IP, trusting THROTTLE_NUM_PROXIES entries of X-Forwarded-For"""
+    num_proxies = getattr(settings, 'THROTTLE_NUM_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_rates(scope):
+    rates = dict(DEFAULT_RATES.get(scope, {}))
+    rates.update(getattr(settings, 'THROTTLE_RATES', {}).get(scope, {}))
+    return rates
+
+
+def check_rate(request, scope, email=None):
+    """
+    Take a token from the request's IP bucket and, if given, its email bucket
+
+    The email bucket is only charged once the IP bucket has allowed the request.
+
+    Returns:
+        float or None: seconds to wait when throttled, else None
+    """
+    rates = get_rates(scope)
+    keys = [('ip', get_client_ip(request))]
+    if email:
+        keys.append(('email', email.strip().lower()))
+
+    for kind, value in keys:
+        if kind not in rates:
+            continue
+        capacity, period = parse_rate(rates[kind])
+        allowed, retry_after = store.take(f'throttle:{scope}:{kind}:{value}', capacity, period)
+        if not allowed:
+            return retry_after
+    return None
+
+
+def throttled_reply(wait):
+    """(body, headers) for a 429 answer to a request that must wait `wait` seconds"""
+    retry_after = max(1, math.ceil(wait))
+    return (
+        {'error': f'Too many attempts. Try again in {retry_after} seconds.'},
+        {'Retry-After': str(retry_after)}
+    )
+
+
+async def acheck_rate(request, scope, email=None):
+    """check_rate for async views; only the shared cache store leaves the event loop"""
+    if isinstance(store, LocalBucketStore):
+        return check_rate(request, scope, email)
+    return await sync_to_async(check_rate)(request, scope, email)
+
+
+def rate_limited(scope, email_field='email'):
+    """
+    Decorator for @api_view functions; see check_rate
+
+    Args:
+        scope: key into DEFAULT_RATES / THROTTLE_RATES
+        email_field: request.data field naming the account, or None
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if getattr(settings, 'THROTTLE_ENABLED', True):
+                email = request.data.get(email_field) if email_field else None
+                wait = check_rate(request, scope, email if isinstance(email, str) else None)
+                if wait is not None:
+                    body, headers = throttled_reply(wait)
+                    return Response(body, status=status.HTTP_429_TOO_MANY_REQUESTS, headers=headers)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+"""
+Revocation of access and refresh tokens before they expire
+
+Revoked tokens are stored by jti in RevokedToken. Each process keeps them in
+a Bloom filter, so checking a token costs one hash and a few bit probes; the
+table is only queried when the filter reports a possible match, which for
+tokens that aren't revoked happens at TOKEN_REVOCATION_ERROR_RATE.
+
+The filter picks up rows added since its last load every
+TOKEN_REVOCATION_REFRESH_INTERVAL seconds (one indexed query), so a token
+revoked by another process is refused there after at most that long; in
+the revoking process it is refused at once. Expired rows are dropped by
+`manage.py purge_expired`, and the filter is rebuilt without them when it
+outgrows its capacity.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings"""
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """This process's view of RevokedToken"""
+    # Re-read a little before the previous load so rows committed late aren't missed
+    overlap = timedelta(seconds=10)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._loaded_since = None
+        self._loaded_at = 0.0
+
+    def _build(self, jtis):
+        jtis = list(jtis)
+        bloom = BloomFilter(max(1024, 2 * len(jtis)), getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', 0.001))
+        for jti in jtis:
+            bloom.add(jti)
+        return bloom
+
+    def refresh(self, full=False):
+        """
+        Add rows revoked since the last load, or reload all unexpired rows
+
+        The lock is held from the query to the swap, so add() can't write to
+        a filter that is about to be replaced.
+        """
+        with self._lock:
+            now = timezone.now()
+            live = RevokedToken.objects.filter(expires_at__gt=now).values_list('jti', flat=True)
+            bloom = self._filter
+            if full or bloom is None:
+                self._filter = self._build(live)
+            else:
+                added = [jti for jti in live.filter(revoked_at__gte=self._loaded_since - self.overlap)
+                         if jti not in bloom]
+                if bloom.count + len(added) > bloom.capacity:
+                    # Outgrown: rebuild larger, leaving expired rows out
+                    self._filter = self._build(live)
+                else:
+                    for jti in added:
+                        bloom.add(jti)
+            self._loaded_since = now
+            self._loaded_at = time.monotonic()
+
+    def _current(self):
+        interval = getattr(settings, 'TOKEN_REVOCATION_REFRESH_INTERVAL', 30)
+        if self._filter is None or time.monotonic() - self._loaded_at >= interval:
+            self.refresh()
+        return self._filter
+
+    def is_revoked(self, jti):
+        """O(1) filter probe; the table is only read on a possible match"""
+        if jti not in self._current():
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jti):
+        """Refuse a jti in this process right away, without waiting for a refresh"""
+        # refresh() holds the lock across its rebuild and swap, so the jti lands
+        # in whichever filter is installed; one built before the row existed
+        # can't replace it afterwards
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+
+revocations = RevocationList()
+
+
+def revoke_token(token, employee_id):
+    """
+    Revoke a token until it expires
+
+    Args:
+        token: simplejwt Token (AccessToken or RefreshToken)
+        employee_id: Employee primary key the token belongs to
+
+    Returns:
+        bool: True if newly revoked, False if it already was or has no jti
+    """
+    jti = token.get('jti')
+    if not jti:
+        return False
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                jti=jti, employee_id=employee_id, token_type=token.get('token_type', ''),
+                expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+            )
+    except IntegrityError:
+        return False
+    revocations.add(jti)
+    return True
@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views, views
 from .views import (
-    register_company, login, logout,
-    forgot_password, verify_otp, reset_password,
-    send_invitation, verify_invitation, accept_invitation, invitation_list,
+    register_company, login, logout, verify_otp, reset_password, EmployeeTokenRefreshView,
+    accept_invitation, invitation_list,
+    bulk_invitation, bulk_invitation_status, cache_stats, metrics,
     CompanyViewSet, EmployeeViewSet, AttendanceViewSet, LeaveViewSet,MyAttendanceAPIView
 )
 
+# Async-native variants for ASGI deployments (see async_views.py)
+_async = getattr(settings, 'ASYNC_VIEWS', False)
+forgot_password_view = async_views.forgot_password if _async else views.forgot_password
+send_invitation_view = async_views.send_invitation if _async else views.send_invitation
+verify_invitation_view = async_views.verify_invitation if _async else views.verify_invitation
+
 router = DefaultRouter()
 router.register(r'companies', CompanyViewSet, basename='company')
 router.register(r'employees', EmployeeViewSet, basename='employee')
@@ -17,13 +25,18 @@ urlpatterns = [
     path('auth/register/', register_company, name='register'),
     path('auth/login/', login, name='login'),
     path('auth/logout/', logout, name='logout'),
-    path('auth/forgot-password/', forgot_password, name='forgot_password'),
+    path('auth/token/refresh/', EmployeeTokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/forgot-password/', forgot_password_view, name='forgot_password'),
     path('auth/verify-otp/', verify_otp, name='verify_otp'),
     path('auth/reset-password/', reset_password, name='reset_password'),
-    path('invitations/send/', send_invitation, name='send_invitation'),
-    path('invitations/verify/', verify_invitation, name='verify_invitation'),
+    path('invitations/send/', send_invitation_view, name='send_invitation'),
+    path('invitations/verify/', verify_invitation_view, name='verify_invitation'),
     path('invitations/accept/', accept_invitation, name='accept_invitation'),
     path('invitations/list/', invitation_list, name='invitation_list'),
+    path('invitations/bulk/', bulk_invitation, name='bulk_invitation'),
+    path('invitations/bulk/<int:job_id>/', bulk_invitation_status, name='bulk_invitation_status'),
     path('attendance/my-attendance/', MyAttendanceAPIView.as_view(), name='my-attendance'),
+    path('internal/cache-stats/', cache_stats, name='cache_stats'),
+    path('internal/metrics/', metrics, name='metrics'),
     path('', include(router.urls)),
 ]
@@ -1,105 +1,67 @@
-from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
+from rest_framework import viewsets, status, permissions, serializers
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes, parser_classes
 from rest_framework.response import Response
-from django.contrib.auth.hashers import check_password, make_password
-from django.db import IntegrityError
-from django.utils import timezone
-from .models import Company, Employee, Attendance, Leave, PasswordResetOTP, InvitedEmployee
+from rest_framework.exceptions import ValidationError
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from .models import Company, Employee, Attendance, Leave, InvitedEmployee, InvitationImportJob
 from .serializers import (
     CompanyRegistrationSerializer, CompanySerializer,
-    EmployeeSerializer, AttendanceSerializer, LeaveSerializer
+    EmployeeSerializer, AttendanceSerializer, BulkAttendanceSerializer, LeaveSerializer,
+    EmployeeTokenRefreshSerializer
 )
 from rest_framework.permissions import IsAuthenticated
-from .email_service import send_otp_email
+from .email_service import send_otp_email, build_otp_email, build_invitation_email, build_invitation_link
+from .email_outbox import outbox_enabled, enqueue_email
+from .invitation_import import extract_emails, create_import_job
+from .id_allocation import next_employee_id
+from .login_service import (
+    AmbiguousLogin, accounts_for_email, authenticate_employee, create_reset_otps, find_reset_otp
+)
+from .leave_ledger import LEAVE_TYPES, company_leave_balances, set_leave_status
+from .leave_overlap import LeaveConflict, ensure_no_conflict, lock_employee
+from .throttling import rate_limited
+from .attendance_service import (
+    company_month_attendance, employee_month_attendance, bulk_mark_attendance,
+    company_month_totals, employee_month_totals,
+    company_month_attendance_compact, employee_month_attendance_compact,
+    month_bounds, COMPACT_STATUS_CODES, COMPACT_NO_RECORD
+)
+from .authentication import EmployeeUserWrapper, EmployeeJWTAuthentication, EmployeeRefreshToken
 import secrets
-import random
-import os
 from datetime import datetime
-from calendar import monthrange
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
+from .parsers import CSVParser
+from .pagination import StandardPagination
+from .exports import EXPORT_FORMATS, parse_date_param, stream_export
+from .conditional import ConditionalGetMixin, conditional_get
+from .data_versions import EMPLOYEES, ATTENDANCE, LEAVES, INVITATIONS
+from .response_cache import stats as response_cache_stats, cache_enabled
+from .profiling import render_prometheus
+from .token_revocation import revoke_token
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.contrib.auth.models import AnonymousUser
-import jwt
+from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf import settings
 
 
 
-class EmployeeUserWrapper:
-    """A wrapper class that makes Employee model compatible with Django's authentication system"""
-    def __init__(self, employee):
-        self.employee = employee
-        self.id = employee.id
-        self.pk = employee.id
-        self.is_active = True
-        
-    def __getattr__(self, attr):
-        # Delegate attribute access to the underlying employee
-        return getattr(self.employee, attr)
-    
-    def has_perm(self, perm):
-        return True  # For simplicity, grant all permissions
-    
-    def is_anonymous(self):
-        return False
-    
-    def is_authenticated(self):
-        return True
-
-
-class EmployeeJWTAuthentication:
-    """Custom JWT authentication that works with Employee model"""
-    def authenticate(self, request):
-        header = request.META.get('HTTP_AUTHORIZATION')
-        
-        if header is None:
-            return None
-            
-        try:
-            # Extract token from header (format: 'Bearer <token>')
-            scheme, token = header.split(' ')
-            if scheme.lower() != 'bearer':
-                return None
-        except ValueError:
-            return None
-        
-        try:
-            # Decode the JWT token
-            decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_id = decoded_token.get('user_id')
-            
-            if user_id is None:
-                return None
-                
-            # Get the employee based on the user_id from the token
-            from .models import Employee
-            try:
-                employee = Employee.objects.get(pk=user_id)
-                employee_wrapper = EmployeeUserWrapper(employee)
-                return (employee_wrapper, token)
-            except Employee.DoesNotExist:
-                return None
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
-            return None
-
-
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         # Override the method to manually create the token
         # Get the user from the validated data
-        from django.contrib.auth import authenticate
         username_field = getattr(Employee, 'USERNAME_FIELD', 'email')
         username = attrs.get(username_field)
         password = attrs.get('password')
         
         # Since we're using email/password, we need to authenticate differently
         try:
-            employee = Employee.objects.get(email=username)
-            if check_password(password, employee.password):
+            employee = authenticate_employee(username, password, attrs.get('company'))
+            if employee is not None:
                 employee_wrapper = EmployeeUserWrapper(employee)
-                refresh = RefreshToken.for_user(employee_wrapper)
+                refresh = EmployeeRefreshToken.for_user(employee_wrapper)
                 
                 data = {
                     'refresh': str(refresh),
@@ -116,13 +78,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 return data
             else:
                 raise serializers.ValidationError('Invalid credentials')
-        except Employee.DoesNotExist:
-            raise serializers.ValidationError('Invalid credentials')
+        except AmbiguousLogin as e:
+            raise serializers.ValidationError({'error': str(e), 'companies': e.companies})
 
 # Simple token storage (in production, use Redis or database)
 active_tokens = {}
-# Simple token storage (in production, use Redis or database)
-active_tokens = {}
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -132,7 +92,7 @@ def register_company(request):
         try:
             employee = serializer.save()
             employee_wrapper = EmployeeUserWrapper(employee)
-            refresh = RefreshToken.for_user(employee_wrapper)
+            refresh = EmployeeRefreshToken.for_user(employee_wrapper)
             
             return Response({
                 'refresh': str(refresh),
@@ -150,8 +110,24 @@ def register_company(request):
             return Response({'error': 'Employee ID or Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _company_param(request):
+    """
+    The optional `company` id posted with an email that may belong to several companies
+
+    Returns:
+        tuple: (company_id or None, error Response or None)
+    """
+    company_id = request.data.get('company')
+    if company_id in (None, ''):
+        return None, None
+    try:
+        return int(company_id), None
+    except (TypeError, ValueError):
+        return None, Response({'error': 'company must be a company id'}, status=status.HTTP_400_BAD_REQUEST)
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@rate_limited('login')
 def login(request):
     email = request.data.get('email')
     password = request.data.get('password')
@@ -159,11 +135,16 @@ def login(request):
     if not email or not password:
         return Response({'error': 'Email and password required'}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Optional: which company to log in to when the email belongs to several
+    company_id, error = _company_param(request)
+    if error:
+        return error
+    
     try:
-        employee = Employee.objects.get(email=email)
-        if check_password(password, employee.password):
+        employee = authenticate_employee(email, password, company_id)
+        if employee is not None:
             employee_wrapper = EmployeeUserWrapper(employee)
-            refresh = RefreshToken.for_user(employee_wrapper)
+            refresh = EmployeeRefreshToken.for_user(employee_wrapper)
             
             return Response({
                 'refresh': str(refresh),
@@ -177,51 +158,59 @@ def login(request):
                     'company': employee.company.name
                 }
             })
-    except Employee.DoesNotExist:
-        pass
+    except AmbiguousLogin as e:
+        return Response({
+            'error': 'This email belongs to several companies; send the company id to log in',
+            'companies': e.companies
+        }, status=status.HTTP_409_CONFLICT)
     
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@rate_limited('password_reset')
 def forgot_password(request):
     email = request.data.get('email')
     
     if not email:
         return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        employee = Employee.objects.get(email=email)
-        
-        # Generate 6-digit OTP
-        otp = str(random.randint(100000, 999999))
-        
-        # Save OTP to database
-        PasswordResetOTP.objects.create(
-            employee=employee,
-            otp=otp
-        )
-        
-        # Send OTP via email
-        success, message = send_otp_email(employee.email, otp, employee.full_name)
-        
-        if success:
-            return Response({
-                'message': 'OTP sent to your email',
-                'email': email
-            })
-        else:
-            return Response({'error': message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-    except Employee.DoesNotExist:
+    company_id, error = _company_param(request)
+    if error:
+        return error
+    
+    accounts = list(accounts_for_email(email, company_id))
+    if not accounts:
         # Don't reveal if email exists or not (security)
         return Response({
             'message': 'If this email exists, an OTP has been sent',
             'email': email
         })
+    
+    # One OTP per account (the email may belong to several companies); the
+    # code sent back to verify-otp/reset-password picks the account
+    for employee, otp_record in create_reset_otps(accounts):
+        company_name = employee.company.name if len(accounts) > 1 else None
+        
+        if outbox_enabled():
+            # Queue the email; the outbox worker delivers it
+            subject, html_content = build_otp_email(otp_record.otp, employee.full_name, company_name)
+            enqueue_email(f'otp:{otp_record.pk}', employee.email, subject, html_content, employee.full_name)
+            continue
+        
+        # Send OTP via email
+        success, message = send_otp_email(employee.email, otp_record.otp, employee.full_name, company_name)
+        if not success:
+            return Response({'error': message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'message': 'OTP sent to your email',
+        'email': email
+    })
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@rate_limited('otp')
 def verify_otp(request):
     email = request.data.get('email')
     otp = request.data.get('otp')
@@ -229,34 +218,31 @@ def verify_otp(request):
     if not email or not otp:
         return Response({'error': 'Email and OTP are required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        employee = Employee.objects.get(email=email)
-        otp_record = PasswordResetOTP.objects.filter(
-            employee=employee,
-            otp=otp,
-            is_used=False
-        ).order_by('-created_at').first()
-        
-        if not otp_record:
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not otp_record.is_valid():
-            return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Generate reset token
-        reset_token = secrets.token_urlsafe(32)
-        
-        return Response({
-            'message': 'OTP verified successfully',
-            'reset_token': reset_token,
-            'email': email
-        })
-        
-    except Employee.DoesNotExist:
-        return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
+    company_id, error = _company_param(request)
+    if error:
+        return error
+    
+    otp_record = find_reset_otp(email, otp, company_id)
+    if not otp_record:
+        if not Employee.objects.filter(email=email).exists():
+            return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not otp_record.is_valid():
+        return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Generate reset token
+    reset_token = secrets.token_urlsafe(32)
+    
+    return Response({
+        'message': 'OTP verified successfully',
+        'reset_token': reset_token,
+        'email': email
+    })
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@rate_limited('otp')
 def reset_password(request):
     email = request.data.get('email')
     otp = request.data.get('otp')
@@ -268,50 +254,57 @@ def reset_password(request):
     if len(new_password) < 6:
         return Response({'error': 'Password must be at least 6 characters'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        employee = Employee.objects.get(email=email)
-        otp_record = PasswordResetOTP.objects.filter(
-            employee=employee,
-            otp=otp,
-            is_used=False
-        ).order_by('-created_at').first()
-        
-        if not otp_record:
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not otp_record.is_valid():
-            return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update password
-        employee.password = make_password(new_password)
-        employee.save()
-        
-        # Mark OTP as used
-        otp_record.is_used = True
-        otp_record.save()
-        
-        return Response({'message': 'Password reset successfully'})
-        
-    except Employee.DoesNotExist:
-        return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
+    company_id, error = _company_param(request)
+    if error:
+        return error
+    
+    otp_record = find_reset_otp(email, otp, company_id)
+    if not otp_record:
+        if not Employee.objects.filter(email=email).exists():
+            return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not otp_record.is_valid():
+        return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Update password of the account the OTP was sent for
+    employee = otp_record.employee
+    employee.password = make_password(new_password)
+    employee.save()
+    
+    # Mark OTP as used
+    otp_record.is_used = True
+    otp_record.save()
+    
+    return Response({'message': 'Password reset successfully'})
 
 @api_view(['POST'])
 @authentication_classes([EmployeeJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def logout(request):
-    from rest_framework_simplejwt.tokens import RefreshToken
-    try:
-        refresh_token = request.data.get('refresh_token')
-        if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-        return Response({'message': 'Logged out successfully'})
-    except Exception as e:
-        return Response({'message': 'Logged out successfully'})
+    """Revoke the access token used for this request and, if posted, the refresh token"""
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+    employee_id = request.user.id
+    for token_class, raw in ((AccessToken, request.auth), (RefreshToken, request.data.get('refresh_token'))):
+        if not raw:
+            continue
+        try:
+            token = token_class(raw)
+        except TokenError:
+            # Expired or not a token of this type; nothing to revoke
+            continue
+        if str(token.get('user_id')) == str(employee_id):
+            revoke_token(token, employee_id)
+    return Response({'message': 'Logged out successfully'})
+
+class EmployeeTokenRefreshView(TokenRefreshView):
+    """Refresh for employee tokens; see EmployeeTokenRefreshSerializer"""
+    serializer_class = EmployeeTokenRefreshSerializer
 
 class IsAuthenticated(permissions.BasePermission):
     def has_permission(self, request, view):
-        # Use custom JWT authentication that works with Employee model
+        # Reuses the employee DRF already resolved for this request, if any
         auth = EmployeeJWTAuthentication()
         result = auth.authenticate(request)
         
@@ -323,21 +316,63 @@ class IsAuthenticated(permissions.BasePermission):
         
         return False
 
+class EagerLoadingViewSetMixin:
+    """Joins the relations declared by the serializer class (see EagerLoadingMixin)"""
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+def wants_daily_grid(request):
+    return request.query_params.get('daily', 'true').lower() != 'false'
+
+def wants_compact_grid(request):
+    return request.query_params.get('format') == 'compact'
+
+def compact_grid_header(year, month):
+    """Top-level fields a client needs to decode a ?format=compact grid"""
+    return {
+        'format': 'compact',
+        'total_days': month_bounds(year, month)[1].day,
+        'status_codes': {
+            **{code: status_name for status_name, code in COMPACT_STATUS_CODES.items()},
+            COMPACT_NO_RECORD: 'No Record'
+        }
+    }
+
+def export_params(request):
+    """Read the shared export query parameters; raises ValueError on bad input"""
+    export_format = request.query_params.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return {
+        'format': export_format,
+        'start_date': parse_date_param(request.query_params.get('start_date'), 'start_date'),
+        'end_date': parse_date_param(request.query_params.get('end_date'), 'end_date'),
+        'department': request.query_params.get('department'),
+        'status': request.query_params.get('status'),
+    }
+
 class CompanyViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CompanySerializer
     authentication_classes = [EmployeeJWTAuthentication]
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Company.objects.filter(id=self.request.employee.company.id)
+        return Company.objects.filter(id=self.request.employee.company_id)
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = EmployeeSerializer
     authentication_classes = [EmployeeJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
+    etag_resources = (EMPLOYEES,)
+    cache_list = True
 
     def get_queryset(self):
-        queryset = Employee.objects.filter(company=self.request.employee.company)
+        queryset = Employee.objects.filter(company_id=self.request.employee.company_id)
         # Non-admin can only see themselves
         if not self.request.employee.is_admin:
             queryset = queryset.filter(id=self.request.employee.id)
@@ -354,16 +389,18 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         serializer.save(company=self.request.employee.company)
 
     @action(detail=True, methods=['get'])
+    @conditional_get(ATTENDANCE, EMPLOYEES)
     def attendance(self, request, pk=None):
         employee = self.get_object()
-        attendance_records = employee.attendance_records.all()
+        attendance_records = AttendanceSerializer.setup_eager_loading(employee.attendance_records.all())
         serializer = AttendanceSerializer(attendance_records, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @conditional_get(LEAVES, EMPLOYEES)
     def leaves(self, request, pk=None):
         employee = self.get_object()
-        leaves = employee.leaves.all()
+        leaves = LeaveSerializer.setup_eager_loading(employee.leaves.all())
         serializer = LeaveSerializer(leaves, many=True)
         return Response(serializer.data)
 
@@ -390,6 +427,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get', 'patch'])
+    @conditional_get(EMPLOYEES)
     def profile(self, request):
         """Get or update current user's profile"""
         employee = request.employee
@@ -411,13 +449,15 @@ class EmployeeViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = AttendanceSerializer
     authentication_classes = [EmployeeJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-date', '-id')
+    etag_resources = (ATTENDANCE, EMPLOYEES)
 
     def get_queryset(self):
-        queryset = Attendance.objects.filter(employee__company=self.request.employee.company)
+        queryset = Attendance.objects.filter(employee__company_id=self.request.employee.company_id)
         # Non-admin can only see their own attendance
         if not self.request.employee.is_admin:
             queryset = queryset.filter(employee=self.request.employee)
@@ -428,91 +468,207 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("Only admins can mark attendance")
         serializer.save()
     
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, CSVParser])
+    def bulk(self, request):
+        """Mark attendance for many employees on one date (JSON or CSV body)"""
+        if not request.employee.is_admin:
+            return Response({'error': 'Only admins can mark attendance'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if isinstance(request.data, list):
+            # CSV body: one row per employee, date comes from the query string
+            payload = {'date': request.query_params.get('date'), 'records': request.data}
+        else:
+            payload = request.data
+        
+        serializer = BulkAttendanceSerializer(data=payload)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        attendance_date = serializer.validated_data['date']
+        results, counts = bulk_mark_attendance(
+            request.employee.company,
+            attendance_date,
+            serializer.validated_data['records']
+        )
+        
+        return Response({
+            'date': attendance_date,
+            **counts,
+            'results': results
+        })
+    
     @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream attendance as CSV or NDJSON, filtered by date range, department and status"""
+        try:
+            params = export_params(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset()
+        if params['start_date']:
+            queryset = queryset.filter(date__gte=params['start_date'])
+        if params['end_date']:
+            queryset = queryset.filter(date__lte=params['end_date'])
+        if params['department']:
+            queryset = queryset.filter(employee__department=params['department'])
+        if params['status']:
+            queryset = queryset.filter(status=params['status'])
+        
+        return stream_export(
+            queryset.order_by('date', 'id'),
+            [
+                ('date', 'date'),
+                ('employee_id', 'employee__employee_id'),
+                ('employee_name', 'employee__full_name'),
+                ('department', 'employee__department'),
+                ('status', 'status'),
+                ('notes', 'notes'),
+            ],
+            params['format'],
+            'attendance'
+        )
+    
+    @action(detail=False, methods=['get'])
+    @conditional_get(ATTENDANCE)
     def my_attendance(self, request):
         """Get current user's attendance for a specific month"""
-        from datetime import datetime
-        from calendar import monthrange
-        
         month = int(request.query_params.get('month', datetime.now().month))
         year = int(request.query_params.get('year', datetime.now().year))
         
-        # Get all days in the month
-        num_days = monthrange(year, month)[1]
-        
-        # Get attendance records for the month
-        attendance_records = Attendance.objects.filter(
-            employee=request.employee,
-            date__year=year,
-            date__month=month
-        )
-        
-        # Create a dictionary for quick lookup
-        attendance_dict = {record.date.day: record for record in attendance_records}
-        
-        # Build response with all days
-        daily_data = []
-        for day in range(1, num_days + 1):
-            date_obj = datetime(year, month, day).date()
-            if day in attendance_dict:
-                record = attendance_dict[day]
-                daily_data.append({
-                    'date': date_obj,
-                    'day': day,
-                    'status': record.status,
-                    'notes': record.notes,
-                    'has_record': True
-                })
-            else:
-                daily_data.append({
-                    'date': date_obj,
-                    'day': day,
-                    'status': 'No Record',
-                    'notes': '',
-                    'has_record': False
-                })
+        # ?daily=false returns just the totals, read from the monthly rollup;
+        # ?format=compact returns the grid as a status string (see compact_grid_header)
+        if not wants_daily_grid(request):
+            attendance = employee_month_totals(request.employee, year, month)
+        elif wants_compact_grid(request):
+            attendance = {
+                **compact_grid_header(year, month),
+                **employee_month_attendance_compact(request.employee, year, month)
+            }
+        else:
+            attendance = employee_month_attendance(request.employee, year, month)
         
         return Response({
             'month': month,
             'year': year,
-            'total_days': num_days,
-            'present_days': len([r for r in attendance_records if r.status == 'Present']),
-            'absent_days': len([r for r in attendance_records if r.status == 'Absent']),
-            'no_record_days': num_days - len(attendance_records),
-            'daily_data': daily_data
+            **attendance
         })
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = LeaveSerializer
     authentication_classes = [EmployeeJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
+    etag_resources = (LEAVES, EMPLOYEES)
 
     def get_queryset(self):
-        queryset = Leave.objects.filter(employee__company=self.request.employee.company)
+        queryset = Leave.objects.filter(employee__company_id=self.request.employee.company_id)
         # Non-admin can only see their own leaves
         if not self.request.employee.is_admin:
             queryset = queryset.filter(employee=self.request.employee)
         return queryset
 
     def perform_create(self, serializer):
+        data = serializer.validated_data
         # Non-admin can only create leave for themselves
-        if not self.request.employee.is_admin:
-            serializer.save(employee=self.request.employee)
-        else:
+        employee = data['employee'] if self.request.employee.is_admin else self.request.employee
+        with transaction.atomic():
+            lock_employee(employee.pk)
+            if data.get('status') != 'Rejected':
+                try:
+                    ensure_no_conflict(employee.pk, data['start_date'], data['end_date'])
+                except LeaveConflict as e:
+                    raise ValidationError({'error': str(e)})
+            if not self.request.employee.is_admin:
+                serializer.save(employee=self.request.employee)
+            else:
+                serializer.save()
+
+    def perform_update(self, serializer):
+        leave = serializer.instance
+        data = serializer.validated_data
+        employee_id = data['employee'].pk if 'employee' in data else leave.employee_id
+        with transaction.atomic():
+            lock_employee(employee_id)
+            if data.get('status', leave.status) != 'Rejected':
+                try:
+                    ensure_no_conflict(
+                        employee_id,
+                        data.get('start_date', leave.start_date),
+                        data.get('end_date', leave.end_date),
+                        exclude_pk=leave.pk
+                    )
+                except LeaveConflict as e:
+                    raise ValidationError({'error': str(e)})
             serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream leaves as CSV or NDJSON, filtered by date range, department and status"""
+        try:
+            params = export_params(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset()
+        # Date range selects leaves overlapping [start_date, end_date]
+        if params['start_date']:
+            queryset = queryset.filter(end_date__gte=params['start_date'])
+        if params['end_date']:
+            queryset = queryset.filter(start_date__lte=params['end_date'])
+        if params['department']:
+            queryset = queryset.filter(employee__department=params['department'])
+        if params['status']:
+            queryset = queryset.filter(status=params['status'])
+        
+        return stream_export(
+            queryset.order_by('start_date', 'id'),
+            [
+                ('employee_id', 'employee__employee_id'),
+                ('employee_name', 'employee__full_name'),
+                ('department', 'employee__department'),
+                ('leave_type', 'leave_type'),
+                ('start_date', 'start_date'),
+                ('end_date', 'end_date'),
+                ('status', 'status'),
+                ('reason', 'reason'),
+                ('created_at', 'created_at'),
+            ],
+            params['format'],
+            'leaves'
+        )
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(LEAVES, EMPLOYEES, cache='leaves.balances')
+    def balances(self, request):
+        """Entitled, used and remaining days per leave type for one year"""
+        try:
+            year = int(request.query_params.get('year', datetime.now().year))
+        except ValueError:
+            return Response({'error': 'year must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Admins get the whole company, employees only themselves
+        employee = None if request.employee.is_admin else request.employee
+        response_data = company_leave_balances(request.employee.company_id, year, employee)
+        return Response({
+            'year': year,
+            'leave_types': LEAVE_TYPES,
+            'total_employees': len(response_data),
+            'employees': response_data
+        })
+
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
-        leave = self.get_object()
-        leave.status = 'Approved'
-        leave.save()
+        # The ledger posts the leave's usage in the same transaction
+        try:
+            set_leave_status(self.get_object(), 'Approved')
+        except LeaveConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'status': 'Leave approved'})
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
-        leave = self.get_object()
-        leave.status = 'Rejected'
-        leave.save()
+        set_leave_status(self.get_object(), 'Rejected')
         return Response({'status': 'Leave rejected'})
 
 # Invitation endpoints
@@ -533,31 +689,44 @@ def send_invitation(request):
     if Employee.objects.filter(company=request.employee.company, email=email).exists():
         return Response({'error': 'Employee with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check if invitation already sent
+    # Check if invitation already sent; an expired one is reissued below
     existing_invitation = InvitedEmployee.objects.filter(
         email=email, 
         company=request.employee.company,
         is_accepted=False
     ).first()
     
-    if existing_invitation:
+    if existing_invitation and not existing_invitation.is_expired:
         return Response({'error': 'Invitation already sent to this email'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Create invitation
+        # Create invitation (or reissue the expired one)
         from .serializers import InvitedEmployeeSerializer
-        serializer = InvitedEmployeeSerializer(data={
+        serializer = InvitedEmployeeSerializer(existing_invitation, data={
             'email': email,
             'company': request.employee.company.id,
             'invited_by': request.employee.id
         })
         
         if serializer.is_valid():
+            if outbox_enabled():
+                with transaction.atomic():
+                    invitation = serializer.save()
+                    subject, html_content = build_invitation_email(
+                        invitation_link=build_invitation_link(invitation.invitation_token),
+                        company_name=request.employee.company.name,
+                        inviter_name=request.employee.full_name
+                    )
+                    enqueue_email(f'invitation:{invitation.pk}', email, subject, html_content)
+                return Response({
+                    'message': 'Invitation sent successfully',
+                    'invitation': serializer.data
+                }, status=status.HTTP_201_CREATED)
+            
             invitation = serializer.save()
             
             # Generate invitation link
-            frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-            invitation_link = f"{frontend_url}/accept-invitation?token={invitation.invitation_token}"
+            invitation_link = build_invitation_link(invitation.invitation_token)
             
             # Send invitation email
             from .email_service import send_invitation_email
@@ -584,6 +753,45 @@ def send_invitation(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@authentication_classes([EmployeeJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, CSVParser])
+def bulk_invitation(request):
+    """Admin can invite many people at once from a CSV or JSON list"""
+    if not request.employee.is_admin:
+        return Response({'error': 'Only admins can send invitations'}, status=status.HTTP_403_FORBIDDEN)
+    
+    emails = extract_emails(request.data)
+    if not emails:
+        return Response({'error': 'A list of emails is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_rows = getattr(settings, 'INVITATION_BULK_MAX_ROWS', 5000)
+    if len(emails) > max_rows:
+        return Response({'error': f'At most {max_rows} invitations per upload'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    from .serializers import InvitationImportJobSerializer
+    job = create_import_job(request.employee, emails)
+    return Response(InvitationImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@authentication_classes([EmployeeJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def bulk_invitation_status(request, job_id):
+    """Poll the progress of a bulk invitation import"""
+    if not request.employee.is_admin:
+        return Response({'error': 'Only admins can view invitations'}, status=status.HTTP_403_FORBIDDEN)
+    
+    from .serializers import InvitationImportJobSerializer
+    try:
+        job = InvitationImportJob.objects.get(pk=job_id, company_id=request.employee.company_id)
+    except InvitationImportJob.DoesNotExist:
+        return Response({'error': 'Import job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(InvitationImportJobSerializer(job).data)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def verify_invitation(request):
@@ -609,6 +817,7 @@ def verify_invitation(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@rate_limited('invitation', email_field='token')
 def accept_invitation(request):
     """Accept invitation and create employee account"""
     token = request.data.get('token')
@@ -632,29 +841,31 @@ def accept_invitation(request):
         if Employee.objects.filter(company=invitation.company, email=invitation.email).exists():
             return Response({'error': 'Employee with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Auto-generate employee ID
-        employee_count = Employee.objects.filter(company=invitation.company).count()
-        employee_id = f"EMP{str(employee_count + 1).zfill(4)}"
-        
-        # Create employee
-        employee = Employee.objects.create(
-            company=invitation.company,
-            employee_id=employee_id,
-            full_name=full_name,
-            email=invitation.email,
-            password=make_password(password),
-            department=department,
-            phone=phone,
-            position=position,
-            is_admin=False
-        )
+        hashed_password = make_password(password)
         
-        # Mark invitation as accepted
-        invitation.accept_invitation()
+        with transaction.atomic():
+            # Auto-generate employee ID
+            employee_id = next_employee_id(invitation.company_id)
+            
+            # Create employee
+            employee = Employee.objects.create(
+                company=invitation.company,
+                employee_id=employee_id,
+                full_name=full_name,
+                email=invitation.email,
+                password=hashed_password,
+                department=department,
+                phone=phone,
+                position=position,
+                is_admin=False
+            )
+            
+            # Mark invitation as accepted
+            invitation.accept_invitation()
         
         # Generate JWT token for auto-login
         employee_wrapper = EmployeeUserWrapper(employee)
-        refresh = RefreshToken.for_user(employee_wrapper)
+        refresh = EmployeeRefreshToken.for_user(employee_wrapper)
         
         return Response({
             'message': 'Account created successfully',
@@ -679,6 +890,7 @@ def accept_invitation(request):
 @api_view(['GET'])
 @authentication_classes([EmployeeJWTAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_get(INVITATIONS, EMPLOYEES, cache='invitations.list')
 def invitation_list(request):
     """Get list of all invitations sent by current company"""
     if not request.employee.is_admin:
@@ -687,14 +899,14 @@ def invitation_list(request):
     try:
         from .models import InvitedEmployee
         from .serializers import InvitedEmployeeSerializer
-        from rest_framework.pagination import PageNumberPagination
         
         # Get all invitations for current company
-        invitations = InvitedEmployee.objects.filter(company=request.employee.company).order_by('-created_date')
+        invitations = InvitedEmployeeSerializer.setup_eager_loading(
+            InvitedEmployee.objects.filter(company_id=request.employee.company_id).order_by('-created_date')
+        )
         
         # Apply pagination
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+        paginator = StandardPagination(ordering=('-created_date', '-id'))
         result_page = paginator.paginate_queryset(invitations, request)
         
         serializer = InvitedEmployeeSerializer(result_page, many=True)
@@ -708,110 +920,76 @@ class MyAttendanceAPIView(APIView):
     authentication_classes = []
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(ATTENDANCE, EMPLOYEES, cache='attendance.month')
     def get(self, request):
         month = int(request.query_params.get('month', datetime.now().month))
         year = int(request.query_params.get('year', datetime.now().year))
 
-        num_days = monthrange(year, month)[1]
+        # ?daily=false skips the per-day grid and reads totals from the monthly rollup;
+        # ?format=compact encodes each grid as a status string plus sparse notes
+        include_daily = wants_daily_grid(request)
+        compact = include_daily and wants_compact_grid(request)
+        header = compact_grid_header(year, month) if compact else {}
 
         # If Admin → All company employees
         if request.employee.is_admin:
-            employees = Employee.objects.filter(company=request.employee.company)
-
-            response_data = []
-
-            for emp in employees:
-                attendance_records = Attendance.objects.filter(
-                    employee=emp,
-                    date__year=year,
-                    date__month=month
-                )
-
-                # Create a dictionary for quick lookup of attendance by day
-                attendance_dict = {record.date.day: record for record in attendance_records}
-
-                # Build daily data for the employee
-                daily_data = []
-                for day in range(1, num_days + 1):
-                    date_obj = datetime(year, month, day).date()
-                    if day in attendance_dict:
-                        record = attendance_dict[day]
-                        daily_data.append({
-                            "date": date_obj,
-                            "day": day,
-                            "status": record.status,
-                            "notes": record.notes,
-                            "has_record": True
-                        })
-                    else:
-                        daily_data.append({
-                            "date": date_obj,
-                            "day": day,
-                            "status": "No Record",
-                            "notes": "",
-                            "has_record": False
-                        })
-
-                present_count = attendance_records.filter(status='Present').count()
-                absent_count = attendance_records.filter(status='Absent').count()
-
-                response_data.append({
-                    "employee_id": emp.employee_id,
-                    "employee_name": emp.full_name,
-                    "department": emp.department,
-                    "total_days": num_days,
-                    "present_days": present_count,
-                    "absent_days": absent_count,
-                    "no_record_days": num_days - attendance_records.count(),
-                    "daily_data": daily_data  # Include daily data for each employee
-                })
+            if compact:
+                response_data = company_month_attendance_compact(request.employee.company_id, year, month)
+            elif include_daily:
+                response_data = company_month_attendance(request.employee.company_id, year, month)
+            else:
+                response_data = company_month_totals(request.employee.company_id, year, month)
 
             return Response({
                 "month": month,
                 "year": year,
-                "total_employees": employees.count(),
+                **header,
+                "total_employees": len(response_data),
                 "employees_attendance": response_data
             })
 
         # 🔹 If Normal Employee → Only Own Attendance
         else:
-            attendance_records = Attendance.objects.filter(
-                employee=request.employee,
-                date__year=year,
-                date__month=month
-            )
-
-            attendance_dict = {record.date.day: record for record in attendance_records}
-
-            daily_data = []
-
-            for day in range(1, num_days + 1):
-                date_obj = datetime(year, month, day).date()
-
-                if day in attendance_dict:
-                    record = attendance_dict[day]
-                    daily_data.append({
-                        "date": date_obj,
-                        "day": day,
-                        "status": record.status,
-                        "notes": record.notes,
-                        "has_record": True
-                    })
-                else:
-                    daily_data.append({
-                        "date": date_obj,
-                        "day": day,
-                        "status": "No Record",
-                        "notes": "",
-                        "has_record": False
-                    })
-
+            if compact:
+                attendance = employee_month_attendance_compact(request.employee, year, month)
+            elif include_daily:
+                attendance = employee_month_attendance(request.employee, year, month)
+            else:
+                attendance = employee_month_totals(request.employee, year, month)
             return Response({
                 "month": month,
                 "year": year,
-                "total_days": num_days,
-                "present_days": attendance_records.filter(status='Present').count(),
-                "absent_days": attendance_records.filter(status='Absent').count(),
-                "no_record_days": num_days - attendance_records.count(),
-                "daily_data": daily_data
-            })
\ No newline at end of file
+                **header,
+                **attendance
+            })
+
+
+def metrics_token_valid(request):
+    """Internal endpoints are only served to callers presenting METRICS_TOKEN"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    return bool(token) and secrets.compare_digest(request.META.get('HTTP_X_METRICS_TOKEN', ''), token)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def cache_stats(request):
+    """Response cache counters for this process"""
+    if not metrics_token_valid(request):
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'enabled': cache_enabled(),
+        'backend': settings.CACHES[settings.RESPONSE_CACHE_ALIAS]['BACKEND'],
+        **response_cache_stats.snapshot()
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([EmployeeJWTAuthentication])
+@permission_classes([permissions.AllowAny])
+def metrics(request):
+    """Per-endpoint profiling histograms for this process, in Prometheus text format"""
+    is_admin = request.user.is_authenticated and request.user.is_admin
+    if not (is_admin or metrics_token_valid(request)):
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'employees.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +66,9 @@ DATABASES = {
         conn_health_checks=True,
     )
 }
+# Server-side cursors (used by the streaming exports) break behind a
+# transaction-mode pooler such as Neon's "-pooler" endpoint
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = os.getenv('DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -119,10 +123,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers by default; ?pagination=cursor switches to keyset pagination
+    # ?format= selects export/response formats in our views, not DRF renderers
+    'URL_FORMAT_OVERRIDE': None,
+    'DEFAULT_PAGINATION_CLASS': 'employees.pagination.StandardPagination',
     'PAGE_SIZE': 10,
 }
 
+# Upper bound for the client-selectable ?page_size= on list endpoints
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -159,3 +169,122 @@ SIMPLE_JWT = {
 # Email Configuration (Brevo API)
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@hrms.com')
+
+# Employee auth snapshot cache (seconds; 0 disables, entries per process)
+EMPLOYEE_AUTH_CACHE_TTL = int(os.getenv('EMPLOYEE_AUTH_CACHE_TTL', '0'))
+EMPLOYEE_AUTH_CACHE_SIZE = int(os.getenv('EMPLOYEE_AUTH_CACHE_SIZE', '1024'))
+
+# Stateless JWT fast path (see employees/authentication.py): GET/HEAD/OPTIONS requests
+# take company_id and is_admin from the access token instead of loading the employee,
+# while its 'ver' claim matches the employee's auth_version. Current versions are cached
+# in JWT_CLAIMS_CACHE_ALIAS for JWT_CLAIMS_VERSION_TTL seconds, which bounds how long
+# another process can serve a demoted admin unless that cache is shared.
+JWT_CLAIMS_FAST_PATH = os.getenv('JWT_CLAIMS_FAST_PATH', 'False') == 'True'
+JWT_CLAIMS_CACHE_ALIAS = os.getenv('JWT_CLAIMS_CACHE_ALIAS', 'default')
+JWT_CLAIMS_VERSION_TTL = int(os.getenv('JWT_CLAIMS_VERSION_TTL', '60'))
+
+# Token revocation (see employees/token_revocation.py): each process keeps revoked jtis in
+# a Bloom filter refreshed every TOKEN_REVOCATION_REFRESH_INTERVAL seconds, which bounds how
+# long another process still accepts a token revoked elsewhere
+TOKEN_REVOCATION_REFRESH_INTERVAL = int(os.getenv('TOKEN_REVOCATION_REFRESH_INTERVAL', '30'))
+TOKEN_REVOCATION_ERROR_RATE = float(os.getenv('TOKEN_REVOCATION_ERROR_RATE', '0.001'))
+
+# Maximum rows accepted by POST /api/attendance/bulk/
+ATTENDANCE_BULK_MAX_ROWS = int(os.getenv('ATTENDANCE_BULK_MAX_ROWS', '10000'))
+
+# Outbound email is sent synchronously inside the request. Set EMAIL_OUTBOX_ENABLED=True
+# to queue it in EmailOutbox instead; only do so where `manage.py process_email_outbox`
+# runs as a worker, or nothing is ever delivered.
+BREVO_API_URL = os.getenv('BREVO_API_URL', 'https://api.brevo.com/v3/smtp/email')
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'False') == 'True'
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_OUTBOX_BACKOFF_BASE = int(os.getenv('EMAIL_OUTBOX_BACKOFF_BASE', '30'))
+EMAIL_OUTBOX_BACKOFF_MAX = int(os.getenv('EMAIL_OUTBOX_BACKOFF_MAX', '3600'))
+
+# Bulk invitation import (POST /api/invitations/bulk/)
+INVITATION_BULK_MAX_ROWS = int(os.getenv('INVITATION_BULK_MAX_ROWS', '5000'))
+INVITATION_EMAIL_BATCH_SIZE = int(os.getenv('INVITATION_EMAIL_BATCH_SIZE', '100'))
+
+# Response cache for company-wide reads (see employees/response_cache.py).
+# RESPONSE_CACHE_BACKEND is 'locmem', 'file' or a dotted cache backend path.
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': {
+            'locmem': 'employees.cache_backends.CountingLocMemCache',
+            'file': 'employees.cache_backends.CountingFileBasedCache',
+        }.get(RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_BACKEND),
+        # Directory for 'file'; just a namespace name for 'locmem'
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', os.path.join(BASE_DIR, 'response_cache')),
+        'TIMEOUT': RESPONSE_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))},
+    },
+}
+
+# Shared secret for internal stats endpoints (X-Metrics-Token header); unset disables them
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Password hashing: PASSWORD_HASHER picks the hasher for new and upgraded hashes
+# ('scrypt', 'pbkdf2' or 'argon2', which needs `pip install argon2-cffi`). Hashes
+# made by the others still verify and are rehashed on the next successful login.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')
+_PASSWORD_HASHER_CLASSES = {
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Accounts checked per login for an email shared by several companies
+LOGIN_MAX_ACCOUNTS_PER_EMAIL = int(os.getenv('LOGIN_MAX_ACCOUNTS_PER_EMAIL', '5'))
+
+# Rate limits for login, password reset, OTP and invitation endpoints (see employees/throttling.py).
+# THROTTLE_STORE is 'local' (per process) or 'cache' (the THROTTLE_CACHE_ALIAS cache, shared);
+# THROTTLE_RATES overrides the defaults per scope, e.g. {'login': {'ip': '60/m', 'email': '5/m'}}.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'local')
+THROTTLE_CACHE_ALIAS = os.getenv('THROTTLE_CACHE_ALIAS', 'default')
+THROTTLE_NUM_PROXIES = int(os.getenv('THROTTLE_NUM_PROXIES', '0'))
+THROTTLE_LOCAL_MAX_KEYS = int(os.getenv('THROTTLE_LOCAL_MAX_KEYS', '100000'))
+THROTTLE_RATES = {}
+
+# Housekeeping (see employees/maintenance.py and `manage.py purge_expired`)
+OTP_RETENTION_HOURS = int(os.getenv('OTP_RETENTION_HOURS', '24'))
+INVITATION_EXPIRY_DAYS = int(os.getenv('INVITATION_EXPIRY_DAYS', '7'))
+# Seconds between background runs in each web process; 0 leaves it to the command
+MAINTENANCE_INTERVAL = int(os.getenv('MAINTENANCE_INTERVAL', '0'))
+
+# Route forgot-password and invitation send/verify to the async views in
+# employees/async_views.py; only useful when served by an ASGI server (uvicorn)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+BREVO_MAX_CONNECTIONS = int(os.getenv('BREVO_MAX_CONNECTIONS', '200'))
+
+# Leave ledger (see employees/leave_ledger.py): days granted per leave type each year,
+# to new employees on creation and to everyone by `manage.py grant_leave_entitlements`
+LEAVE_ANNUAL_ENTITLEMENTS = {'Sick': 12, 'Casual': 12, 'Earned': 15}
+
+# Per-endpoint profiling (see employees/profiling.py), served at /api/internal/metrics/;
+# off by default like the other diagnostics. An endpoint is flagged while its queries
+# grow by more than PROFILING_GROWTH_THRESHOLD per result row, fitted over its last
+# PROFILING_GROWTH_SAMPLES GET list responses once it has PROFILING_GROWTH_MIN_SAMPLES.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_GROWTH_THRESHOLD = float(os.getenv('PROFILING_GROWTH_THRESHOLD', '0.5'))
+PROFILING_GROWTH_SAMPLES = int(os.getenv('PROFILING_GROWTH_SAMPLES', '200'))
+PROFILING_GROWTH_MIN_SAMPLES = int(os.getenv('PROFILING_GROWTH_MIN_SAMPLES', '20'))
+
+# Slow-query log (see employees/query_log.py and `manage.py slow_queries`): queries over
+# the threshold are logged with their view and stack frame, a fraction of them EXPLAINed
+# (ANALYZE re-runs the SELECT), and the SLOW_QUERY_TOP_N worst fingerprints kept.
+# Off by default like the other diagnostics.
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', '0'))
+SLOW_QUERY_TOP_N = int(os.getenv('SLOW_QUERY_TOP_N', '50'))
+SLOW_QUERY_FLUSH_INTERVAL = int(os.getenv('SLOW_QUERY_FLUSH_INTERVAL', '60'))
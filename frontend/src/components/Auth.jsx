@@ -8,11 +8,14 @@ function Auth() {
   const [showForgotPassword, setShowForgotPassword] = useState(false)
   const [loading, setLoading] = useState(false)
   const [errors, setErrors] = useState({})
+  // Set when the email belongs to several companies and the user must pick one
+  const [loginCompanies, setLoginCompanies] = useState([])
   const { login } = useAuth()
   
   const [loginData, setLoginData] = useState({
     email: '',
-    password: ''
+    password: '',
+    company: ''
   })
 
   const [registerData, setRegisterData] = useState({
@@ -29,7 +32,12 @@ function Auth() {
   }
 
   const handleLoginChange = (e) => {
-    setLoginData({ ...loginData, [e.target.name]: e.target.value })
+    if (e.target.name === 'email') {
+      setLoginCompanies([])
+      setLoginData({ ...loginData, email: e.target.value, company: '' })
+    } else {
+      setLoginData({ ...loginData, [e.target.name]: e.target.value })
+    }
     setErrors({ ...errors, [e.target.name]: '', general: '' })
   }
 
@@ -132,7 +140,11 @@ function Auth() {
       
       if (err.response?.data) {
         const errorData = err.response.data
-        if (errorData.error) {
+        if (err.response.status === 409 && errorData.companies) {
+          setLoginCompanies(errorData.companies)
+          setLoginData({ ...loginData, company: String(errorData.companies[0].id) })
+          errorMessage = 'This email belongs to several companies. Choose one and log in again.'
+        } else if (errorData.error) {
           errorMessage = errorData.error
         } else if (typeof errorData === 'object') {
           setErrors(errorData)
@@ -252,6 +264,21 @@ function Auth() {
               />
               {errors.password && <p className="mt-1 text-sm text-red-600">{errors.password}</p>}
             </div>
+            {loginCompanies.length > 0 && (
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-1">Company *</label>
+                <select
+                  name="company"
+                  value={loginData.company}
+                  onChange={handleLoginChange}
+                  className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-indigo-500 focus:border-transparent"
+                >
+                  {loginCompanies.map((company) => (
+                    <option key={company.id} value={company.id}>{company.name}</option>
+                  ))}
+                </select>
+              </div>
+            )}
             <div className="text-right">
               <button
                 type="button"
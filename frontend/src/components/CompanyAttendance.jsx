@@ -1,5 +1,6 @@
 import { useState, useEffect, useMemo } from 'react';
 import { attendanceAPI } from '../services/api';
+import { decodeCompactAttendance } from '../services/attendanceFormat';
 
 function CompanyAttendance() {
   const [attendanceData, setAttendanceData] = useState(null);
@@ -26,7 +27,7 @@ function CompanyAttendance() {
     setError('');
     try {
       const response = await attendanceAPI.getAllEmployeesAttendance(selectedMonth, selectedYear);
-      setAttendanceData(response.data);
+      setAttendanceData(decodeCompactAttendance(response.data));
       console.log('Attendance Data:', response.data); // For debugging
     } catch (err) {
       console.error('Error fetching attendance:', err);
@@ -38,7 +38,7 @@ export const AuthProvider = ({ children }) => {
     const refreshToken = localStorage.getItem('refreshToken');
     
     try {
-      // Call the backend logout endpoint to blacklist the refresh token
+      // Call the backend logout endpoint to revoke the access and refresh tokens
       await authAPI.logout(refreshToken);
     } catch (error) {
       // If logout API fails, continue with client-side cleanup
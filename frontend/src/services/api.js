@@ -81,11 +81,13 @@ export const authAPI = {
     return axios.post(`${API_BASE_URL}/auth/token/refresh/`, { refresh: refreshToken });
   },
   logout: (refreshToken) => {
-    // Send refresh token to blacklist it on the server
+    // The server revokes the access token sent here and the refresh token, if given
+    const token = localStorage.getItem('token');
+    const config = token ? { headers: { Authorization: `Bearer ${token}` } } : {};
     if (refreshToken) {
-      return apiWithoutInterceptors.post(`${API_BASE_URL}/auth/logout/`, { refresh_token: refreshToken });
+      return apiWithoutInterceptors.post(`${API_BASE_URL}/auth/logout/`, { refresh_token: refreshToken }, config);
     } else {
-      return apiWithoutInterceptors.post(`${API_BASE_URL}/auth/logout/`);
+      return apiWithoutInterceptors.post(`${API_BASE_URL}/auth/logout/`, {}, config);
     }
   },
   forgotPassword: (data) => api.post('/auth/forgot-password/', data),
@@ -117,13 +119,14 @@ export const leaveAPI = {
   create: (data) => api.post('/leaves/', data),
   approve: (id) => api.post(`/leaves/${id}/approve/`),
   reject: (id) => api.post(`/leaves/${id}/reject/`),
+  getBalances: (year) => api.get(`/leaves/balances/${year ? `?year=${year}` : ''}`),
 };
 
 export const attendanceAPI = {
   getAll: (page = 1) => api.get(`/attendance/?page=${page}`),
   create: (data) => api.post('/attendance/', data),
   getMyAttendance: (month, year) => api.get(`/attendance/my-attendance/?month=${month}&year=${year}`),
-  getAllEmployeesAttendance: (month, year) => api.get(`/attendance/my-attendance/?month=${month}&year=${year}`),
+  getAllEmployeesAttendance: (month, year) => api.get(`/attendance/my-attendance/?month=${month}&year=${year}&format=compact`),
   getEmployeeAttendance: (employeeId, month, year) => api.get(`/employees/${employeeId}/attendance/?month=${month}&year=${year}`),
 };
 
@@ -0,0 +1,49 @@
+/**
+ * Decoder for the compact monthly attendance format
+ *
+ * GET /attendance/my-attendance/?format=compact returns each employee-month as
+ *
+ *   { ..., days: "PPA-P...", notes: { "3": "Sick" } }
+ *
+ * where `days` has one character per day of the month (day 1 first) and the
+ * top-level `status_codes` maps each character to a status, e.g.
+ * { "P": "Present", "A": "Absent", "-": "No Record" }. `notes` only holds the
+ * days that have a note.
+ *
+ * decodeCompactAttendance expands such a response back into the full format
+ * (one `daily_data` entry per day), so components can render either one.
+ */
+
+const pad = (n) => String(n).padStart(2, '0');
+
+export function decodeCompactDays(days, notes, statusCodes, year, month) {
+  const dailyData = new Array(days.length);
+  for (let i = 0; i < days.length; i++) {
+    const day = i + 1;
+    const status = statusCodes[days[i]] || 'No Record';
+    dailyData[i] = {
+      date: `${year}-${pad(month)}-${pad(day)}`,
+      day,
+      status,
+      notes: (notes && notes[day]) || '',
+      has_record: status !== 'No Record',
+    };
+  }
+  return dailyData;
+}
+
+export function decodeCompactAttendance(data) {
+  if (!data || data.format !== 'compact') return data;
+
+  const { status_codes: statusCodes, year, month } = data;
+  const expand = ({ days, notes, ...rest }) => ({
+    ...rest,
+    total_days: days.length,
+    daily_data: decodeCompactDays(days, notes, statusCodes, year, month),
+  });
+
+  if (data.employees_attendance) {
+    return { ...data, employees_attendance: data.employees_attendance.map(expand) };
+  }
+  return expand(data);
+}